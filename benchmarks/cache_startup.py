@@ -0,0 +1,54 @@
+"""
+Startup benchmark: csv -> Player_DB -> player pool, uncached (objects and
+columnar), cold cache (parse, score, store) and warm cache (hash the csv,
+memory-map the stored score matrix).
+
+    python benchmarks/cache_startup.py [sample_season] [repeats]
+"""
+
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import time
+import common
+import cache3
+import ingest3 as ingest
+import models3 as fs
+
+def build_pool(path, cache, columnar=True):
+    if columnar:
+        table = cache3.load_player_table(path, common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, common.INJURY_HANDLING, 0, cache)
+        player_db = fs.Player_DB(table, 'table', common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, common.INJURY_HANDLING)
+    else:
+        player_db = fs.Player_DB(ingest.read_stats_csv(path), 'game_logs', common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, common.INJURY_HANDLING)
+    player_db.set_tiers(common.ROSTER_POSITIONS, common.LEAGUE_SIZE, common.MINIMUM_GAMES_PLAYED)
+    return player_db.get_player_pool(common.ROSTER_SLOTS)
+
+def time_build(path, cache, columnar=True):
+    start = time.perf_counter()
+    build_pool(path, cache, columnar)
+    return time.perf_counter() - start
+
+def main(sample_season=2014, repeats=5):
+    path = os.path.join(common.ROOT, '{}_nfl_weekly_stats.csv'.format(sample_season))
+    directory = tempfile.mkdtemp()
+    try:
+        cache = cache3.DataCache(directory)
+        timings = [('uncached objects', min(time_build(path, None, False) for r in range(repeats))),
+                   ('uncached columnar', min(time_build(path, None) for r in range(repeats)))]
+        cold = []
+        for r in range(repeats):
+            cache.clear()
+            cold.append(time_build(path, cache))
+        timings.append(('cold cache', min(cold)))
+        timings.append(('warm cache', min(time_build(path, cache) for r in range(repeats))))
+        print(cache)
+    finally:
+        shutil.rmtree(directory)
+    for label, seconds in timings:
+        print('{:>18s} {:9.2f} ms ({:.1f}x)'.format(label, 1e3*seconds, timings[0][1]/seconds))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
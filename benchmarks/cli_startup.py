@@ -0,0 +1,67 @@
+"""
+CLI startup benchmark: runs simulate3.py in a fresh interpreter and reports
+the wall time of the whole process and the time to its first simulated
+season, without a cache, with a cold cache (parse the csv, store the scored
+players) and with a warm one (memory-map them, pandas never imported), and
+the bundled example3.json batch in one process against one process per run.
+
+    python benchmarks/cli_startup.py [seasons] [repeats]
+"""
+
+from __future__ import print_function
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import common
+
+SCRIPT = os.path.join(common.ROOT, 'simulate3.py')
+CONFIG = os.path.join(common.ROOT, 'example3.json')
+
+def run_cli(args, directory):
+    'Wall time of one simulate3.py process, and its results'
+    path = os.path.join(directory, 'results.json')
+    start = time.perf_counter()
+    subprocess.check_call([sys.executable, '-W', 'ignore', SCRIPT, '--top', '0', '--json', path] + args, stdout=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    with open(path) as f:
+        return elapsed, json.load(f)
+
+def main(seasons=1000, repeats=5):
+    directory = tempfile.mkdtemp(prefix='cli_startup')
+    cache = os.path.join(directory, 'cache')
+    single = ['--seasons', str(seasons), '--seed', '2014']
+    try:
+        print('{:>28s} {:>10s} {:>14s} {:>8s}'.format('', 'process', 'first season', 'pandas'))
+        for label, args, clear in [('no cache', single, False), ('cold cache', single + ['--cache', cache], True), ('warm cache', single + ['--cache', cache], False)]:
+            timings = []
+            for r in range(repeats):
+                if clear:
+                    shutil.rmtree(cache, ignore_errors=True)
+                elapsed, results = run_cli(args, directory)
+                timings.append((elapsed, results[0]['startup_s']))
+            elapsed, first_season = min(timings, key=lambda timing: timing[0])
+            first_season = 'n/a' if first_season is None else '{:.0f} ms'.format(1e3*first_season)
+            print('{:>28s} {:8.0f} ms {:>14s} {:>8s}'.format(label, 1e3*elapsed, first_season, 'yes' if results[0]['pandas_imported'] else 'no'))
+        num_runs = len(json.load(open(CONFIG))['runs'])
+        batch = min(run_cli([CONFIG, '--cache', cache], directory)[0] for r in range(repeats))
+        separate = 0.
+        for i in range(num_runs):
+            with open(CONFIG) as f:
+                data = json.load(f)
+            data['runs'] = [data['runs'][i]]
+            data['defaults']['stats'] = os.path.join(common.ROOT, data['defaults']['stats'])
+            path = os.path.join(directory, 'run{}.json'.format(i))
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            separate += min(run_cli([path, '--cache', cache], directory)[0] for r in range(repeats))
+        print('{:>28s} {:8.0f} ms'.format('example3.json, one process', 1e3*batch))
+        print('{:>28s} {:8.0f} ms'.format('{} processes'.format(num_runs), 1e3*separate))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
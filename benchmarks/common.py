@@ -0,0 +1,65 @@
+"""
+Shared setup for the benchmark scripts: league settings from example3.py
+and a player pool built from the bundled weekly stats.
+"""
+
+from __future__ import print_function
+import os
+import random
+import sys
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import models3 as fs
+
+LEAGUE_SIZE = 12
+MINIMUM_GAMES_PLAYED = 10
+INJURY_HANDLING = 'zeros'
+SEASON_LENGTH = 16
+
+ROSTER_POSITIONS = ['qb', 'rb', 'wr', 'te']
+ROSTER_SLOTS = ['qb1', 'rb1', 'rb2', 'wr1', 'wr2', 'wr3', 'te1']
+DEEP_ROSTER_SLOTS = ['qb1', 'qb2', 'rb1', 'rb2', 'rb3', 'rb4', 'wr1', 'wr2', 'wr3', 'wr4', 'wr5', 'te1', 'te2']
+DEEP_ROSTER_OPENINGS = {'qb':2, 'rb':4, 'wr':5, 'te':2}
+SAMPLE_SEASONS = [2014, 2015]
+STAT_COLUMNS = ['pass_yards', 'pass_tds', 'pass_ints', 'rush_yards', 'rush_tds', 'recs', 'rec_yards', 'rec_tds']
+
+SCORING_CATEGORIES = ['pass_yards', 'pass_tds', 'pass_ints', 'rush_yards', 'rush_tds', 'recs', 'rec_yards', 'rec_tds']
+SCORING_VALUES = [0.04, 4.0, -2.0, 0.1, 6.0, 0.0, 0.1, 6.0]
+
+def read_game_logs(sample_season=2014):
+    gl = pd.read_csv(os.path.join(ROOT, '{}_nfl_weekly_stats.csv'.format(sample_season)))
+    gl['position'] = np.where(gl['position'] == 10.0, 'qb', np.where(gl['position'] == 20.0, 'rb', np.where(gl['position'] == 30.0, 'wr', np.where(gl['position'] == 40.0, 'te', 'other'))))
+    return gl
+
+def read_synthetic_logs(copies=1, seed=0, jitter=.15):
+    '''
+    Both sample seasons stacked copies times, every (season, copy) under its own player names
+    and, after the first copy, with each player's stats scaled by a random factor within +/- jitter,
+    so deep rosters and large leagues have enough distinct players.
+    '''
+    rng = np.random.default_rng(seed)
+    stacked = []
+    for copy in range(copies):
+        for season in SAMPLE_SEASONS:
+            gl = read_game_logs(season)
+            gl['player'] = gl['player'] + ' ({}/{})'.format(season, copy)
+            if copy:
+                factors = pd.Series(rng.uniform(1 - jitter, 1 + jitter, gl['player'].nunique()), index=gl['player'].unique())
+                gl[STAT_COLUMNS] = gl[STAT_COLUMNS].mul(gl['player'].map(factors).to_numpy(), axis=0).round(1)
+            stacked.append(gl)
+    return pd.concat(stacked, ignore_index=True)
+
+def get_player_pool(league_size=LEAGUE_SIZE, roster_slots=ROSTER_SLOTS, sample_season=2014, seed=0, injury_handling=INJURY_HANDLING):
+    'Player_DB -> tiers -> pool, seeded so every benchmark run sees the same players'
+    random.seed(seed)
+    np.random.seed(seed)
+    player_db = fs.Player_DB(read_game_logs(sample_season), 'game_logs', SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, injury_handling)
+    player_db.set_tiers(ROSTER_POSITIONS, league_size, MINIMUM_GAMES_PLAYED)
+    return player_db.get_player_pool(roster_slots)
+
+def get_teams(league_size=LEAGUE_SIZE):
+    return fs.create_teams(league_size, ['Team {}'.format(i+1) for i in range(league_size)])
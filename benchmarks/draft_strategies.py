@@ -0,0 +1,45 @@
+"""
+Draft benchmark: snake drafts per second for run_drafts alone and for a whole
+DraftLeague, then champion_pct by strategy for a few league mixes (one
+clairvoyant or random team against ADP drafters, and an even split).
+
+    python benchmarks/draft_strategies.py [num_seasons]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import common
+import draft3
+import models3 as fs
+
+MIXES = [('1 clairvoyant vs 11 adp', ['clairvoyant'] + ['adp']*11),
+         ('1 random vs 11 adp', ['random'] + ['adp']*11),
+         ('1 utility vs 11 clairvoyant', ['utility'] + ['clairvoyant']*11),
+         ('3 each', ['random', 'clairvoyant', 'utility', 'adp']*3)]
+
+def main(num_seasons=10000, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    projections = pd.read_csv(os.path.join(common.ROOT, 'projections_v1.csv'))
+    rng = np.random.default_rng(seed)
+    strategies = ['random', 'adp']*(len(teams)//2)
+    keys = draft3.get_season_keys(rng, draft3.get_team_keys(players, strategies, projections, common.SCORING_CATEGORIES, common.SCORING_VALUES, rng), strategies, num_seasons)
+    start = time.time()
+    draft3.run_drafts(keys, draft3.get_position_index(players), draft3.get_roster_openings(common.ROSTER_SLOTS), draft3.get_draft_order(rng, num_seasons, len(teams)))
+    elapsed = time.time() - start
+    print('{} drafts of {} players: {:.3f} s, {:.0f} drafts/s'.format(num_seasons, len(players), elapsed, num_seasons/elapsed))
+    for name, strategies in MIXES:
+        start = time.time()
+        league = draft3.DraftLeague(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH,
+                                    strategies, projections, common.SCORING_CATEGORIES, common.SCORING_VALUES, seed=seed, populate=False)
+        elapsed = time.time() - start
+        print()
+        print('{} ({:.2f} s with the season simulation, {:.0f} seasons/s)'.format(name, elapsed, num_seasons/elapsed))
+        print(league.get_strategy_results().to_string(float_format='{:.4f}'.format))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
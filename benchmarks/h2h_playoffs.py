@@ -0,0 +1,52 @@
+"""
+Head-to-head benchmark: seasons per second for ArrayLeague (all-play only)
+and H2HLeague (all-play plus schedule, standings and playoffs), then how
+often the H2H champion is the all-play champion for a few playoff sizes, and
+slot_value under both definitions of champion.
+
+    python benchmarks/h2h_playoffs.py [num_seasons]
+"""
+
+from __future__ import print_function
+import random
+import sys
+import time
+import numpy as np
+import common
+import engine3 as eng
+import models3 as fs
+import schedule3
+
+PLAYOFF_TEAMS = [1, 4, 6, 8]
+
+def run(league_class, players, teams, num_seasons, seed, **kwargs):
+    random.seed(seed)
+    seasons = fs.create_seasons(num_seasons, common.SEASON_LENGTH)
+    start = time.time()
+    league = league_class(players, teams, seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, populate=False, **kwargs)
+    return league, time.time() - start
+
+def main(num_seasons=20000, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    league, elapsed = run(eng.ArrayLeague, players, teams, num_seasons, seed)
+    print('{:>24s} {:8.2f} s {:10.0f} seasons/s'.format('ArrayLeague', elapsed, num_seasons/elapsed))
+    leagues = []
+    for playoff_teams in PLAYOFF_TEAMS:
+        league, elapsed = run(schedule3.H2HLeague, players, teams, num_seasons, seed, playoff_teams=playoff_teams)
+        leagues.append(league)
+        print('{:>24s} {:8.2f} s {:10.0f} seasons/s'.format('H2HLeague ({} playoff)'.format(playoff_teams), elapsed, num_seasons/elapsed))
+    print()
+    for league in leagues:
+        print('{} playoff team(s):'.format(league.playoff_teams))
+        print(league.get_champion_summary().to_string(float_format='{:.3f}'.format))
+    print()
+    print('{:>6s} {:>10s}'.format('slot', 'all-play') + ''.join('{:>10s}'.format('h2h/{}'.format(l.playoff_teams)) for l in leagues))
+    for slot in common.ROSTER_SLOTS:
+        slot_players = [i for i, p in enumerate(players) if p.slot == slot]
+        all_play = np.mean([players[i].champion_pct[-1] for i in slot_players]) - 1./len(teams)
+        h2h = [np.mean([players[i].h2h_champion_pct[k] for i in slot_players]) - 1./len(teams) for k in range(-len(leagues), 0)]
+        print('{:>6s} {:10.4f}'.format(slot, all_play) + ''.join('{:10.4f}'.format(v) for v in h2h))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,52 @@
+"""
+Incremental re-simulation benchmark: ArrayLeague.update_players after one
+player's (or a few players') scoring_array changes, against rebuilding the
+league from scratch with the same random seed (ArrayLeague, and League for
+small season counts), plus a check that both give identical player values.
+
+    python benchmarks/incremental_update.py [num_seasons] [num_changed]
+"""
+
+from __future__ import print_function
+import random
+import sys
+import time
+import numpy as np
+import common
+import engine3 as eng
+import models3 as fs
+
+def get_values(players, index):
+    return np.array([(p.champion_pct[k], p.average_team_ranking[k], p.harmonic_team_ranking[k]) for p, k in zip(players, index)])
+
+def rebuild(league_class, players, teams, num_seasons, seed, **kwargs):
+    random.seed(seed)
+    seasons = fs.create_seasons(num_seasons, common.SEASON_LENGTH)
+    start = time.time()
+    league_class(players, teams, seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, **kwargs)
+    return time.time() - start
+
+def main(num_seasons=10000, num_changed=1, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    random.seed(seed)
+    league = eng.ArrayLeague(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH, populate=False)
+    changed = random.sample(players, num_changed)
+    for p in changed:
+        p.scoring_array = [points*1.25 for points in p.scoring_array]
+    start = time.time()
+    seasons = league.update_players(changed)
+    update = time.time() - start
+    updated = get_values(players, league.value_index)
+    print('{} seasons, {} changed player(s), {} season(s) re-ranked'.format(num_seasons, num_changed, len(seasons)))
+    print('{:>28s} {:10.4f} s'.format('update_players', update))
+    rebuilds = [('ArrayLeague rebuild', eng.ArrayLeague, {'populate': False})]
+    if num_seasons <= 2000:
+        rebuilds.append(('League rebuild', fs.League, {}))
+    for name, league_class, kwargs in rebuilds:
+        elapsed = rebuild(league_class, players, teams, num_seasons, seed, **kwargs)
+        identical = np.array_equal(updated, get_values(players, [len(p.champion_pct) - 1 for p in players]))
+        print('{:>28s} {:10.4f} s {:10.1f}x  identical {}'.format(name, elapsed, elapsed/update, identical))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,30 @@
+"""
+Ingestion benchmark: game logs -> players with season scoring arrays, object
+path (analyze_game_logs + create_players_from_pdb) against the batched
+PlayerTable path, on copies of both sample seasons stacked together.
+
+    python benchmarks/ingestion.py [copies] [injury_handling]
+"""
+
+from __future__ import print_function
+import sys
+import time
+import common
+import models3 as fs
+
+def time_ingestion(game_logs, injury_handling, columnar):
+    start = time.perf_counter()
+    player_db = fs.Player_DB(game_logs.copy(), 'game_logs', common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, injury_handling, columnar=columnar, seed=0)
+    return time.perf_counter() - start, len(player_db.players)
+
+def main(copies=10, injury_handling=common.INJURY_HANDLING):
+    game_logs = common.read_synthetic_logs(copies)
+    print('{} player-weeks, injury_handling={}'.format(len(game_logs), injury_handling))
+    objects, num_players = time_ingestion(game_logs, injury_handling, False)
+    table, _ = time_ingestion(game_logs, injury_handling, True)
+    print('{:>10s} {:10.3f}s'.format('objects', objects))
+    print('{:>10s} {:10.3f}s ({:.1f}x, {} players)'.format('columnar', table, objects/table, num_players))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*([int(a) for a in args[:1]] + args[1:]))
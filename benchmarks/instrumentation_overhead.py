@@ -0,0 +1,41 @@
+"""
+Instrumentation overhead: many small StreamingLeagues with the default NULL
+instrumentation, with an Instrumentation, and with allocation tracing and
+the sampling profiler on as well. Settings are interleaved over several
+rounds and the best round counts. Prints the stage report of the last one.
+
+    python benchmarks/instrumentation_overhead.py [num_leagues] [num_seasons] [rounds]
+"""
+
+from __future__ import print_function
+import sys
+import time
+import common
+import engine3 as eng
+import instrument3 as instrument
+
+def time_leagues(players, teams, num_leagues, num_seasons, make_instrumentation):
+    start = time.perf_counter()
+    for i in range(num_leagues):
+        instrumentation = make_instrumentation()
+        eng.StreamingLeague(players, teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=i, instrumentation=instrumentation)
+    return (time.perf_counter() - start)/num_leagues, instrumentation
+
+def main(num_leagues=200, num_seasons=100, rounds=5):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    settings = [('disabled', lambda: instrument.NULL),
+                ('timers', instrument.Instrumentation),
+                ('allocations+profiler', lambda: instrument.Instrumentation(allocations=True, sample_interval=.001))]
+    best = [float('inf')]*len(settings)
+    for r in range(rounds):
+        for i, (label, make_instrumentation) in enumerate(settings):
+            seconds, instrumentation = time_leagues(players, teams, num_leagues, num_seasons, make_instrumentation)
+            best[i] = min(best[i], seconds)
+    for (label, make_instrumentation), seconds in zip(settings, best):
+        print('{:>22s} {:10.3f} ms per league ({:+.1%})'.format(label, 1e3*seconds, seconds/best[0] - 1))
+    print()
+    instrumentation.print_report()
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
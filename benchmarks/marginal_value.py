@@ -0,0 +1,38 @@
+"""
+Marginal value benchmark: an ArrayLeague run, then championships above
+replacement for every player from swap deltas on its team_scores, timed
+against the simulation itself (one full rerun per player is the
+alternative), and the best players of every slot with their confidence
+intervals.
+
+    python benchmarks/marginal_value.py [num_seasons] [players_per_slot]
+"""
+
+from __future__ import print_function
+import random
+import sys
+import time
+import common
+import engine3 as eng
+import models3 as fs
+
+def main(num_seasons=10000, players_per_slot=3, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    random.seed(seed)
+    start = time.time()
+    league = eng.ArrayLeague(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH, populate=False)
+    simulation = time.time() - start
+    start = time.time()
+    values = league.get_marginal_values()
+    marginal = time.time() - start
+    print('{} seasons: simulation {:.2f} s, marginal values for {} players {:.2f} s ({:.1f}x one simulation, {:.0f} full reruns would take {:.0f} s)'.format(
+        num_seasons, simulation, len(players), marginal, marginal/simulation, len(players), len(players)*simulation))
+    print('{:>5s} {:24s} {:>8s} {:>8s} {:>18s} {:>9s}'.format('slot', 'player', 'seasons', 'CAR', '95% interval', 'rank gain'))
+    for slot in common.ROSTER_SLOTS:
+        slot_values = sorted([v for v in values.values() if v['slot'] == slot], key=lambda v: -v['championships_above_replacement'])
+        for v in slot_values[:players_per_slot]:
+            print('{:>5s} {:24s} {:8d} {:8.4f} [{:7.4f}, {:7.4f}] {:9.3f}'.format(slot, v['name'], v['seasons'], v['championships_above_replacement'], v['car_low'], v['car_high'], v['rank_gain']))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
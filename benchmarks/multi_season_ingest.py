@@ -0,0 +1,71 @@
+"""
+Multi-season ingestion benchmark: writes num_years yearly stats files (the
+bundled 2014 and 2015 logs, relabeled as consecutive seasons) and compares
+time and peak traced memory for concatenating whole read_csv frames into
+read_game_logs against streaming them with read_game_log_history, without
+and with a max_games cap, for a growing number of years. Then builds a
+Player_DB from a recency-weighted history.
+
+    python benchmarks/multi_season_ingest.py [max_years] [chunksize]
+"""
+
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+import common
+import ingest3 as ingest
+import models3 as fs
+
+def write_years(directory, num_years, first_season=2000):
+    paths = []
+    for i in range(num_years):
+        gl = pd.read_csv(os.path.join(common.ROOT, '{}_nfl_weekly_stats.csv'.format(common.SAMPLE_SEASONS[i % 2])))
+        gl['season'] = float(first_season + i)
+        path = os.path.join(directory, '{}_nfl_weekly_stats.csv'.format(first_season + i))
+        gl.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+def read_whole(paths):
+    gl = pd.concat([ingest.read_stats_csv(path) for path in paths], ignore_index=True)
+    return ingest.read_game_logs(gl, common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH)
+
+def measure(f, *args, **kwargs):
+    tracemalloc.start()
+    start = time.time()
+    result = f(*args, **kwargs)
+    elapsed = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak/2.**20
+
+def main(max_years=32, chunksize=20000):
+    directory = tempfile.mkdtemp(prefix='multi_season')
+    try:
+        paths = write_years(directory, max_years)
+        print('{:>6s} {:>22s} {:>22s} {:>22s}'.format('years', 'read_csv + concat', 'streamed', 'streamed, max_games'))
+        num_years = 1
+        while num_years <= max_years:
+            row = []
+            for f, kwargs in [(read_whole, {}), (ingest.read_game_log_history, {'chunksize': chunksize}),
+                              (ingest.read_game_log_history, {'chunksize': chunksize, 'max_games': 3*common.SEASON_LENGTH})]:
+                args = (paths[-num_years:],) if f is read_whole else (paths[-num_years:], common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH)
+                matrix, elapsed, peak = measure(f, *args, **kwargs)
+                row.append('{:7.2f} s {:8.1f} MiB'.format(elapsed, peak))
+            print('{:6d} '.format(num_years) + ' '.join('{:>22s}'.format(r) for r in row))
+            num_years *= 2
+        history = ingest.read_game_log_history(paths[-4:], common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, recency_half_life=1., chunksize=chunksize)
+        print(history)
+        player_db = fs.Player_DB(history, 'history', common.SCORING_CATEGORIES, common.SCORING_VALUES, common.SEASON_LENGTH, common.INJURY_HANDLING, seed=0)
+        player_db.set_tiers(common.ROSTER_POSITIONS, common.LEAGUE_SIZE, common.MINIMUM_GAMES_PLAYED)
+        print('{}, pool of {}'.format(player_db, len(player_db.get_player_pool(common.ROSTER_SLOTS))))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
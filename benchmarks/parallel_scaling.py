@@ -0,0 +1,38 @@
+"""
+Scaling benchmark for ParallelLeague: wall time and speedup for 1..N workers,
+plus a check that every worker count gives identical player values.
+
+    python benchmarks/parallel_scaling.py [num_seasons] [block_size]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import numpy as np
+import common
+import models3 as fs
+import parallel3
+
+def main(num_seasons=100000, block_size=2000, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    seasons = fs.create_seasons(num_seasons, common.SEASON_LENGTH)
+    max_workers = os.cpu_count()
+    worker_counts = sorted(set([1, 2, 4, 8, 16, 32, max_workers]) & set(range(1, max_workers+1)))
+    baseline = None
+    print('{} seasons, block_size {}, {} core(s)'.format(num_seasons, block_size, max_workers))
+    print('{:>8s} {:>10s} {:>10s} {:>12s} {:>10s}'.format('workers', 'seconds', 'speedup', 'seasons/s', 'identical'))
+    for workers in worker_counts:
+        for p in players:
+            p.average_team_ranking, p.harmonic_team_ranking, p.champion_pct = [], [], []
+        start = time.time()
+        parallel3.ParallelLeague(players, teams, seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=seed, workers=workers, block_size=block_size, populate=False)
+        elapsed = time.time() - start
+        values = np.array([(p.champion_pct[0], p.average_team_ranking[0]) for p in players])
+        if baseline is None:
+            baseline = (elapsed, values)
+        print('{:8d} {:10.2f} {:10.2f} {:12.0f} {:>10s}'.format(workers, elapsed, baseline[0]/elapsed, num_seasons/elapsed, str(np.array_equal(values, baseline[1]))))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
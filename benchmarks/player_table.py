@@ -0,0 +1,76 @@
+"""
+PlayerTable benchmark: memory held per player by Player objects against a
+PlayerTable (with and without the PlayerViews a Player_DB hands out), and
+the time to recompute every player's metrics (points_per_gp, utility,
+consistency and the per-position *_normalized / *_excess values), on copies
+of both sample seasons stacked together. Reports both against the targets:
+10x less memory per player and under 1 ms to recompute 5k players.
+
+    python benchmarks/player_table.py [copies] [repeats]
+"""
+
+from __future__ import print_function
+import sys
+import time
+import tracemalloc
+import numpy as np
+import common
+import models3 as fs
+from table3 import PlayerTable
+
+MEMORY_TARGET = 10.
+RECOMPUTE_TARGET_MS = 1.
+
+def get_allocated(build):
+    'Bytes still allocated by what build() returns once it is done'
+    tracemalloc.start()
+    built = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, allocated
+
+def get_median_ms(function, repeats):
+    function()
+    timings = []
+    for r in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return 1e3*np.median(timings)
+
+def recompute_objects(players):
+    for p in players:
+        p.points_per_gp = sum(p.scoring_array)/len(p.scoring_array)
+        p.utility = fs.get_certainty_equivalent(p.scoring_array)
+        p.consistency = p.utility/p.points_per_gp
+    for pos in sorted(set(p.position for p in players)):
+        fs.calculate_position_measurements([p for p in players if p.position == pos])
+
+def recompute_table(table):
+    table.update_metrics()
+    table.calculate_position_measurements()
+
+def main(copies=5, repeats=200):
+    pdb = fs.analyze_game_logs(common.read_synthetic_logs(copies), common.SCORING_CATEGORIES, common.SCORING_VALUES)
+    players, objects = get_allocated(lambda: fs.create_players_from_pdb(pdb, common.SEASON_LENGTH, common.INJURY_HANDLING))
+    table, columns = get_allocated(lambda: PlayerTable.from_pdb(pdb, common.SEASON_LENGTH, common.INJURY_HANDLING))
+    views, view_bytes = get_allocated(table.get_views)
+    num_players = len(players)
+    print('{} players, {} weeks'.format(num_players, common.SEASON_LENGTH))
+    print('{:>22s} {:>12s} {:>10s}'.format('memory', 'bytes/player', 'reduction'))
+    for label, allocated in [('Player objects', objects), ('PlayerTable', columns), ('PlayerTable + views', columns + view_bytes)]:
+        print('{:>22s} {:12.0f} {:9.1f}x'.format(label, allocated/float(num_players), objects/float(allocated)))
+    reduction = objects/float(columns + view_bytes)
+    print('{:>22s} {:>12s}'.format('recompute metrics', 'ms'))
+    object_ms = get_median_ms(lambda: recompute_objects(players), max(repeats//20, 1))
+    update_ms = get_median_ms(table.update_metrics, repeats)
+    measure_ms = get_median_ms(table.calculate_position_measurements, repeats)
+    table_ms = get_median_ms(lambda: recompute_table(table), repeats)
+    for label, elapsed in [('Player objects', object_ms), ('update_metrics', update_ms), ('position measurements', measure_ms), ('PlayerTable', table_ms)]:
+        print('{:>22s} {:12.3f}'.format(label, elapsed))
+    print('memory target ({:.0f}x less with views): {:.1f}x, {}'.format(MEMORY_TARGET, reduction, 'met' if reduction >= MEMORY_TARGET else 'NOT met'))
+    scaled_ms = table_ms*5000./num_players
+    print('recompute target (< {:.0f} ms for 5k players): {:.3f} ms, {}'.format(RECOMPUTE_TARGET_MS, scaled_ms, 'met' if scaled_ms < RECOMPUTE_TARGET_MS else 'NOT met'))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Result cache benchmark: a StreamingLeague run uncached, then read back from
+the in-memory LRU, from the disk tier (a fresh ResultCache on the same
+directory), and topped up by extra seasons, each checked against an
+uncached run of the same size.
+
+    python benchmarks/result_cache.py [num_seasons] [extra_seasons] [block_size]
+"""
+
+from __future__ import print_function
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import common
+import cache3
+import engine3 as eng
+
+def run(players, teams, num_seasons, block_size, result_cache=None, seed=2014):
+    start = time.time()
+    league = eng.StreamingLeague(players, teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=seed, block_size=block_size, result_cache=result_cache)
+    return league, time.time() - start
+
+def is_identical(a, b):
+    a, b = a.accumulator.get_state(), b.accumulator.get_state()
+    return all(np.array_equal(a[name], b[name]) for name in a)
+
+def main(num_seasons=10000, extra_seasons=5000, block_size=1000):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    directory = tempfile.mkdtemp(prefix='result_cache')
+    try:
+        disk = cache3.DataCache(directory)
+        cache = cache3.ResultCache(disk)
+        uncached, elapsed = run(players, teams, num_seasons, block_size)
+        print('{:>36s} {:9.4f} s'.format('{} seasons, uncached'.format(num_seasons), elapsed))
+        for name, result_cache in [('cold cache', cache), ('memory hit', cache), ('disk hit', cache3.ResultCache(disk))]:
+            league, elapsed = run(players, teams, num_seasons, block_size, result_cache)
+            print('{:>36s} {:9.4f} s  identical {}'.format(name, elapsed, is_identical(league, uncached)))
+        total = num_seasons + extra_seasons
+        topped_up, elapsed = run(players, teams, total, block_size, cache)
+        uncached, uncached_elapsed = run(players, teams, total, block_size)
+        print('{:>36s} {:9.4f} s  identical {} (uncached {:.4f} s)'.format('top up to {} seasons'.format(total), elapsed, is_identical(topped_up, uncached), uncached_elapsed))
+        print(cache)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,73 @@
+"""
+Roster assignment benchmark: draws every season's lineups at once with a
+RosterAssignment, position-only and slot-aware, on the standard pool and
+on a deep 13-slot pool with custom roster_openings, for a growing number of
+seasons up to max_seasons, against the per-season shuffle loop League used
+to run (extrapolated from loop_seasons). Checks that slot-aware lineups
+only put each slot's players in that slot's openings, then runs an
+ArrayLeague in both modes.
+
+    python benchmarks/roster_assignment.py [max_seasons] [loop_seasons]
+"""
+
+from __future__ import print_function
+import random
+import sys
+import time
+import numpy as np
+import common
+import engine3 as eng
+import models3 as fs
+
+def shuffle_lineups(roster_assignment, num_seasons):
+    'The old League.set_rosters draw: shuffle every group again for every season'
+    league_size = roster_assignment.league_size
+    lineups = np.full((num_seasons, len(roster_assignment.opening_teams)), -1, dtype=np.intp)
+    for s in range(num_seasons):
+        start = 0
+        for group, n in zip(roster_assignment.groups, roster_assignment.openings):
+            order = list(group)
+            random.shuffle(order)
+            filled = min(len(order), league_size*n)
+            lineups[s, start:start+filled] = order[:filled]
+            start += league_size*n
+    return lineups
+
+def check_slots(players, roster_assignment, lineups):
+    'True if every filled opening holds a player of its slot'
+    slots = np.array([p.slot for p in players] + [''])
+    keys = np.repeat(roster_assignment.keys, [roster_assignment.league_size*n for n in roster_assignment.openings])
+    return bool(np.all((slots[lineups] == keys) | (lineups < 0)))
+
+def main(max_seasons=1000000, loop_seasons=10000, seed=2014):
+    pools = [('standard', common.ROSTER_SLOTS, None), ('deep', common.DEEP_ROSTER_SLOTS, common.DEEP_ROSTER_OPENINGS)]
+    for label, roster_slots, roster_openings in pools:
+        players = common.get_player_pool(roster_slots=roster_slots)
+        for assignment in fs.ASSIGNMENT_MODES:
+            roster_assignment = fs.RosterAssignment(players, roster_slots, common.LEAGUE_SIZE, assignment, roster_openings if assignment == 'position' else None)
+            print('{} pool: {}'.format(label, roster_assignment))
+            start = time.time()
+            shuffle_lineups(roster_assignment, loop_seasons)
+            loop = (time.time() - start)/loop_seasons
+            num_seasons = 1000
+            while num_seasons <= max_seasons:
+                start = time.time()
+                lineups = roster_assignment.draw(np.random.default_rng(seed), num_seasons)
+                elapsed = time.time() - start
+                print('  {:8d} seasons: {:6.3f} s, {:6.2f} us/season, {:7.1f} MiB ({}), per-season loop ~{:8.2f} s'.format(
+                    num_seasons, elapsed, 1e6*elapsed/num_seasons, lineups.nbytes/2.**20, lineups.dtype, loop*num_seasons))
+                num_seasons *= 10
+            if assignment == 'slot':
+                print('  every opening holds a player of its slot: {}'.format(check_slots(players, roster_assignment, lineups)))
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    for assignment in fs.ASSIGNMENT_MODES:
+        random.seed(seed)
+        start = time.time()
+        league = eng.ArrayLeague(players, teams, fs.create_seasons(loop_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH, populate=False, assignment=assignment)
+        elapsed = time.time() - start
+        best = sorted(players, key=lambda p: -p.champion_pct[-1])[:3]
+        print('{} ({} assignment) in {:.2f} s, best champion_pct: {}'.format(league, assignment, elapsed, ', '.join('{} {} {:.3f}'.format(p.name, p.slot, p.champion_pct[-1]) for p in best)))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
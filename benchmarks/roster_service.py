@@ -0,0 +1,81 @@
+"""
+Valuation service benchmark: starts a ValuationService in-process, then
+fires num_requests roster and trade queries from concurrency clients at
+once, with batching and with max_batch=1, and reports throughput and the
+server's p50/p99 latency. Checks a served roster against evaluating it
+directly.
+
+    python benchmarks/roster_service.py [num_seasons] [num_requests] [concurrency]
+"""
+
+from __future__ import print_function
+import asyncio
+import sys
+import time
+import numpy as np
+import common
+import service3
+
+PORT = 8766
+
+def get_requests(valuator, pool, num_requests, seed=0):
+    'Random legal rosters (one pool player per roster slot) and one-for-one trades'
+    rng = np.random.default_rng(seed)
+    slot_names = [[p.name for p in pool if p.slot == slot] for slot in common.ROSTER_SLOTS]
+    requests = []
+    for i in range(num_requests):
+        roster = [names[rng.integers(len(names))] for names in slot_names]
+        if i % 4:
+            requests.append({'type': 'roster', 'players': roster})
+        else:
+            k = rng.integers(len(slot_names))
+            requests.append({'type': 'trade', 'roster': roster, 'give': [roster[k]], 'get': [slot_names[k][rng.integers(len(slot_names[k]))]]})
+    return requests
+
+async def run_clients(requests, concurrency, port):
+    'concurrency persistent connections, each sending its share of the requests one after another'
+    async def client(chunk):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        for request in chunk:
+            writer.write((service3.json.dumps(request) + '\n').encode('utf-8'))
+            await writer.drain()
+            responses.append(service3.json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        return responses
+    results = await asyncio.gather(*[client(requests[i::concurrency]) for i in range(concurrency)])
+    return [r for responses in results for r in responses]
+
+async def serve(valuator, requests, concurrency, max_batch, port):
+    service = service3.ValuationService(valuator, max_batch)
+    server = await service.start(port=port)
+    start = time.perf_counter()
+    responses = await run_clients(requests, concurrency, port)
+    elapsed = time.perf_counter() - start
+    stats = await service3.query({'type': 'stats'}, port=port)
+    server.close()
+    await server.wait_closed()
+    service.batcher.cancel()
+    errors = sum('error' in r for r in responses)
+    return responses, elapsed, stats, errors
+
+def main(num_seasons=1000, num_requests=2000, concurrency=64):
+    start = time.perf_counter()
+    valuator = service3.build_valuator(roster_positions=common.ROSTER_POSITIONS, roster_slots=common.ROSTER_SLOTS, league_size=common.LEAGUE_SIZE,
+                                       season_length=common.SEASON_LENGTH, num_seasons=num_seasons, seed=2014)
+    print('{} built in {:.2f} s'.format(valuator, time.perf_counter() - start))
+    pool = [p for p in valuator.players if p.slot in common.ROSTER_SLOTS]
+    requests = get_requests(valuator, pool, num_requests)
+    for max_batch in [64, 1]:
+        responses, elapsed, stats, errors = asyncio.run(serve(valuator, requests, concurrency, max_batch, PORT))
+        print('max_batch {:3d}: {:.2f} s, {:7.0f} requests/s, p50 {:7.2f} ms, p99 {:7.2f} ms, mean batch {:5.1f}, errors {}'.format(
+            max_batch, elapsed, num_requests/elapsed, stats['p50_ms'], stats['p99_ms'], stats['mean_batch_size'], errors))
+    direct, = valuator.evaluate([valuator.get_rows(requests[1]['players'])])
+    served = asyncio.run(serve(valuator, requests[1:2], 1, 64, PORT))[0][0]
+    print('served roster matches direct evaluation: {}'.format(served == direct))
+    print(served)
+    print('slot_value: ' + ', '.join('{} {:.4f}'.format(slot, value) for slot, value in valuator.slot_values.items()))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,62 @@
+"""
+Scoring-rule sweep benchmark: K rule sets (reception points, passing TD
+points and yardage rates varied around SCORING_VALUES) evaluated with one
+ScoringSweep against one Player_DB + StreamingLeague per rule set.
+
+    python benchmarks/scoring_sweep.py [num_seasons] [max_rules]
+"""
+
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+import pandas as pd
+import common
+import engine3 as eng
+import models3 as fs
+import sweep3
+
+def get_scoring_rules(num_rules, seed=0):
+    'The standard rules first, then random variants: 0-1 point per reception, 4-6 per passing TD, +/-25% yardage'
+    rng = np.random.default_rng(seed)
+    rules = np.tile(common.SCORING_VALUES, (num_rules, 1))
+    categories = common.SCORING_CATEGORIES
+    rules[1:, categories.index('recs')] = rng.choice([0., .5, 1.], num_rules - 1)
+    rules[1:, categories.index('pass_tds')] = rng.choice([4., 5., 6.], num_rules - 1)
+    for category in ['pass_yards', 'rush_yards', 'rec_yards']:
+        rules[1:, categories.index(category)] *= rng.uniform(.75, 1.25, num_rules - 1)
+    return pd.DataFrame(rules, columns=categories, index=['rule{:03d}'.format(k) for k in range(num_rules)])
+
+def run_loop(game_logs, rules, teams, num_seasons):
+    'One columnar Player_DB and StreamingLeague per rule set'
+    slot_values = []
+    for name, values in rules.iterrows():
+        player_db = fs.Player_DB(game_logs, 'game_logs', common.SCORING_CATEGORIES, list(values), common.SEASON_LENGTH, common.INJURY_HANDLING, columnar=True, seed=0)
+        player_db.set_tiers(common.ROSTER_POSITIONS, common.LEAGUE_SIZE, common.MINIMUM_GAMES_PLAYED)
+        league = eng.StreamingLeague(player_db.get_player_pool(common.ROSTER_SLOTS), teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=0, block_size=250)
+        slot_values.append(league.accumulator.slots.mean)
+    return np.array(slot_values)
+
+def main(num_seasons=2000, max_rules=100):
+    game_logs = common.read_game_logs()
+    teams = common.get_teams()
+    print('{} seasons per rule set'.format(num_seasons))
+    print('{:>6s} {:>10s} {:>10s} {:>9s} {:>12s}'.format('K', 'loop s', 'sweep s', 'speedup', 'max |diff|'))
+    num_rules = 1
+    while num_rules <= max_rules:
+        rules = get_scoring_rules(num_rules)
+        start = time.perf_counter()
+        loop = run_loop(game_logs, rules, teams, num_seasons)
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        sweep = sweep3.ScoringSweep(game_logs, common.SCORING_CATEGORIES, rules, teams, common.ROSTER_SLOTS, common.SEASON_LENGTH, num_seasons,
+                                    common.INJURY_HANDLING, common.MINIMUM_GAMES_PLAYED, seed=0, block_size=250)
+        sweep_time = time.perf_counter() - start
+        difference = np.abs(sweep.get_slot_values().to_numpy() - loop).max()
+        print('{:6d} {:10.2f} {:10.2f} {:8.1f}x {:12.2e}'.format(num_rules, loop_time, sweep_time, loop_time/sweep_time, difference))
+        num_rules *= 4 if num_rules < 64 else 2
+    print()
+    print(sweep.get_slot_values().head(8).round(4))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,70 @@
+"""
+Season store benchmark: a StreamingLeague (then a ParallelLeague) writing
+every season to a SeasonStore against one that keeps nothing, the store's
+bytes per season next to the traced memory of a populated ArrayLeague, and
+reads from the reopened store: one random season, one team's season, and
+a player's values over every season, a chunk at a time.
+
+    python benchmarks/season_store.py [num_seasons] [block_size]
+"""
+
+from __future__ import print_function
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import common
+import engine3 as eng
+import models3 as fs
+import parallel3
+import store3
+
+def get_populated_bytes(players, teams, num_seasons=1000):
+    'Traced bytes per season of an ArrayLeague that fills the Player/Team/Season dicts'
+    random.seed(0)
+    tracemalloc.start()
+    eng.ArrayLeague(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used/float(num_seasons)
+
+def main(num_seasons=200000, block_size=10000, seed=2014):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    directory = tempfile.mkdtemp(prefix='season_store')
+    try:
+        start = time.time()
+        eng.StreamingLeague(players, teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=seed, block_size=block_size)
+        elapsed = time.time() - start
+        print('{:>32s} {:8.2f} s {:10.0f} seasons/s'.format('StreamingLeague, no store', elapsed, num_seasons/elapsed))
+        for name, league_class in [('StreamingLeague', eng.StreamingLeague), ('ParallelLeague', parallel3.ParallelLeague)]:
+            path = os.path.join(directory, name)
+            store = store3.SeasonStore(path, [p.player_id for p in players], [t.team_id for t in teams], common.SEASON_LENGTH)
+            start = time.time()
+            if league_class is eng.StreamingLeague:
+                league = league_class(players, teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=seed, block_size=block_size, season_store=store)
+            else:
+                league = league_class(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), common.ROSTER_SLOTS, common.SEASON_LENGTH,
+                                      seed=seed, block_size=block_size, populate=False, season_store=store)
+            elapsed = time.time() - start
+            print('{:>32s} {:8.2f} s {:10.0f} seasons/s'.format(name + ' + SeasonStore', elapsed, num_seasons/elapsed))
+        print(store)
+        print('{:.0f} bytes/season on disk, {:.0f} bytes/season for a populated ArrayLeague'.format(store.get_size()/float(len(store)), get_populated_bytes(players, teams)))
+        store = store3.SeasonStore(os.path.join(directory, 'StreamingLeague'))
+        start = time.time()
+        season = store.get_season(random.randrange(len(store)))
+        final_team_ranks = season.final_team_ranks
+        team_scores = store.get_team(teams[0].team_id).scoring_output[season.season_id]
+        print('{} of {}: {:.2f} ms for its final ranks and a team\'s scores'.format(season.season_id, len(store), (time.time() - start)*1000))
+        start = time.time()
+        average, harmonic, champion = store.get_player(players[0].player_id).get_player_values()
+        print('{} over {} seasons out of core: champion_pct {:.4f} ({:.2f} s, accumulator {:.4f})'.format(
+            players[0].player_id, len(store), champion, time.time() - start, league.accumulator.get_player_values()[2][0]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
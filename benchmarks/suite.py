@@ -0,0 +1,226 @@
+"""
+Benchmark suite for the whole pipeline: game logs -> Player_DB -> set_tiers
+-> player pool -> every League stage, per engine, across league sizes,
+roster depths, season counts and player pools. Each case runs in a fresh
+process, so peak RSS is that case's own. Wall time and peak RSS come from a
+plain run; allocations (tracemalloc peak and net) from a second, traced run.
+
+    python benchmarks/suite.py --quick --output results.json
+    python benchmarks/suite.py --engines streaming --seasons 100000 1000000 --baseline results.json
+
+With --baseline, stages slower (or with a higher peak RSS) than the baseline
+by more than --tolerance are reported and the exit status is 1.
+"""
+
+from __future__ import print_function
+import argparse
+import datetime
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+import common
+import engine3 as eng
+import models3 as fs
+
+ROSTERS = {'7': common.ROSTER_SLOTS, '13': common.DEEP_ROSTER_SLOTS}
+ROSTER_OPENINGS = {'7': None, '13': common.DEEP_ROSTER_OPENINGS}
+ENGINES = {'league': fs.League, 'array': eng.ArrayLeague, 'streaming': eng.StreamingLeague}
+ENGINE_MAX_SEASONS = {'league': 1000, 'array': 100000, 'streaming': 1000000}
+LEAGUE_STAGES = ['set_rosters', 'generate_player_scores', 'calculate_team_scores', 'calculate_weekly_stats', 'calculate_season_stats', 'calculate_player_value']
+STAGES = ['read_stats', 'player_db', 'set_tiers', 'get_player_pool'] + LEAGUE_STAGES + ['end_to_end']
+FULL = {'league_sizes': [8, 12, 16, 24, 32], 'rosters': ['7', '13'], 'seasons': [100, 1000, 10000, 100000, 1000000]}
+QUICK = {'league_sizes': [12], 'rosters': ['7', '13'], 'seasons': [100, 1000]}
+
+class StageRecorder:
+    """
+    Times named stages. Wall time always; with trace=True the tracemalloc
+    peak and net allocation of each stage as well. Peak RSS is the process
+    high-water mark after the stage, so the first stage that needs the memory
+    is the one that shows it.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.stages = {}
+        self.alloc_peak = 0
+
+    def __str__(self):
+        return '{}: {} stage(s)'.format(self.__class__.__name__, len(self.stages))
+
+    def run(self, stage, function, *args, **kwargs):
+        if self.trace:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        wall = time.perf_counter() - start
+        record = {'wall_s': wall, 'peak_rss_mb': get_peak_rss_mb()}
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_peak = max(self.alloc_peak, peak)
+            record.update({'alloc_peak_mb': (peak - before)/2.**20, 'alloc_net_mb': (current - before)/2.**20})
+        self.stages[stage] = record
+        return result
+
+###############
+## Functions ##
+###############
+
+def get_peak_rss_mb():
+    'High-water RSS of this process (ru_maxrss is KiB on Linux, bytes on macOS)'
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/2.**20 if sys.platform == 'darwin' else peak/2.**10
+
+def get_timed_league(league_class, recorder):
+    'Subclass of league_class whose stages report to recorder'
+    def timed(stage):
+        method = getattr(league_class, stage)
+        return lambda self: recorder.run(stage, method, self)
+    return type('Timed' + league_class.__name__, (league_class,), {stage: timed(stage) for stage in LEAGUE_STAGES})
+
+def read_stats(pool, league_size):
+    if pool == 'synthetic':
+        return common.read_synthetic_logs(copies=int(math.ceil(league_size/12.)))
+    return common.read_game_logs(int(pool))
+
+def run_case(case, trace=False):
+    'One engine / league size / roster / seasons / pool combination; returns its stage records'
+    recorder = StageRecorder(trace)
+    fs.Player.id = fs.Team.id = fs.Season.id = 1
+    random_seed = 0
+    np.random.seed(random_seed)
+    random.seed(random_seed)
+    league_size = case['league_size']
+    roster_slots = ROSTERS[case['roster']]
+    num_seasons = case['num_seasons']
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    game_logs = recorder.run('read_stats', read_stats, case['pool'], league_size)
+    player_db = recorder.run('player_db', fs.Player_DB, game_logs, 'game_logs', common.SCORING_CATEGORIES, common.SCORING_VALUES,
+                             common.SEASON_LENGTH, common.INJURY_HANDLING)
+    recorder.run('set_tiers', player_db.set_tiers, common.ROSTER_POSITIONS, league_size, common.MINIMUM_GAMES_PLAYED)
+    players = recorder.run('get_player_pool', player_db.get_player_pool, roster_slots)
+    teams = common.get_teams(league_size)
+    league_class = get_timed_league(ENGINES[case['engine']], recorder)
+    roster_openings = ROSTER_OPENINGS[case['roster']]
+    if case['engine'] == 'streaming':
+        league_class(players, teams, num_seasons, roster_slots, common.SEASON_LENGTH, seed=random_seed, roster_openings=roster_openings)
+    elif case['engine'] == 'array':
+        league_class(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), roster_slots, common.SEASON_LENGTH, populate=False,
+                     roster_openings=roster_openings)
+    else:
+        league_class(players, teams, fs.create_seasons(num_seasons, common.SEASON_LENGTH), roster_slots, common.SEASON_LENGTH, roster_openings=roster_openings)
+    end_to_end = {'wall_s': time.perf_counter() - start, 'peak_rss_mb': get_peak_rss_mb()}
+    if trace:
+        current, peak = tracemalloc.get_traced_memory()
+        # every stage resets the tracemalloc peak, so the overall one is the largest stage peak
+        end_to_end.update({'alloc_peak_mb': max(peak, recorder.alloc_peak)/2.**20, 'alloc_net_mb': current/2.**20})
+        tracemalloc.stop()
+    recorder.stages['end_to_end'] = end_to_end
+    return {'num_players': len(players), 'stages': recorder.stages}
+
+def run_isolated(case, trace=False):
+    'run_case in a fresh process, so ru_maxrss and tracemalloc only see this case'
+    pool = multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1)
+    try:
+        return pool.apply(run_case, (case, trace))
+    finally:
+        pool.terminate()
+
+def get_cases(engines, league_sizes, rosters, seasons, pool):
+    cases = []
+    for engine, league_size, roster, num_seasons in itertools.product(engines, league_sizes, rosters, seasons):
+        if num_seasons > ENGINE_MAX_SEASONS[engine]:
+            continue
+        name = '{}-L{}-R{}-S{}-{}'.format(engine, league_size, roster, num_seasons, pool)
+        cases.append({'case': name, 'engine': engine, 'league_size': league_size, 'roster': roster, 'num_seasons': num_seasons, 'pool': pool})
+    return cases
+
+def get_metadata():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=common.ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit, 'python': platform.python_version(),
+            'numpy': np.__version__, 'platform': platform.platform(), 'cpu_count': os.cpu_count()}
+
+def compare_to_baseline(results, baseline, tolerance, min_seconds=.01, min_rss_mb=16.):
+    'Stages whose wall time or peak RSS grew by more than tolerance (and more than the noise floors) since the baseline'
+    previous = {(c['case'], stage): record for c in baseline['cases'] for stage, record in c['stages'].items()}
+    regressions = []
+    for c in results['cases']:
+        for stage, record in c['stages'].items():
+            old = previous.get((c['case'], stage))
+            if old is None:
+                continue
+            for metric, floor in [('wall_s', min_seconds), ('peak_rss_mb', min_rss_mb)]:
+                if record[metric] > old[metric]*(1 + tolerance) and record[metric] - old[metric] > floor:
+                    regressions.append((c['case'], stage, metric, old[metric], record[metric]))
+    return regressions
+
+def print_case(case):
+    if 'error' in case:
+        print(case['case'], 'failed:', case['error'])
+        return
+    print(case['case'], '({} players)'.format(case['num_players']))
+    for stage in STAGES:
+        record = case['stages'].get(stage)
+        if record is None:
+            continue
+        allocations = ' alloc peak {:9.1f} MB net {:9.1f} MB'.format(record['alloc_peak_mb'], record['alloc_net_mb']) if 'alloc_peak_mb' in record else ''
+        print('  {:>24s} {:10.4f} s  rss {:8.1f} MB{}'.format(stage, record['wall_s'], record['peak_rss_mb'], allocations))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help='one league size and 100/1000 seasons')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=['league', 'array', 'streaming'])
+    parser.add_argument('--league-sizes', nargs='+', type=int)
+    parser.add_argument('--rosters', nargs='+', choices=sorted(ROSTERS))
+    parser.add_argument('--seasons', nargs='+', type=int)
+    parser.add_argument('--pool', default='synthetic', choices=['2014', '2015', 'synthetic'])
+    parser.add_argument('--allocations', type=int, default=10000, metavar='MAX_SEASONS', help='trace allocations for cases up to this many seasons (0 = never)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=.25, help='allowed relative slowdown / RSS growth over the baseline')
+    args = parser.parse_args(argv)
+    grid = QUICK if args.quick else FULL
+    cases = get_cases(args.engines, args.league_sizes or grid['league_sizes'], args.rosters or grid['rosters'], args.seasons or grid['seasons'], args.pool)
+    results = {'meta': get_metadata(), 'cases': []}
+    for case in cases:
+        try:
+            outcome = run_isolated(case)
+            if case['num_seasons'] <= args.allocations:
+                traced = run_isolated(case, trace=True)
+                for stage, record in traced['stages'].items():
+                    outcome['stages'][stage].update({k: v for k, v in record.items() if k.startswith('alloc')})
+        except Exception as e:
+            outcome = {'num_players': None, 'stages': {}, 'error': '{}: {}'.format(e.__class__.__name__, e)}
+        case.update(outcome)
+        results['cases'].append(case)
+        print_case(case)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        print()
+        print('{} regression(s) against {}'.format(len(regressions), args.baseline))
+        for name, stage, metric, old, new in regressions:
+            print('  {} {} {}: {:.4g} -> {:.4g} ({:+.0%})'.format(name, stage, metric, old, new, new/old - 1))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
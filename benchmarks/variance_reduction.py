@@ -0,0 +1,58 @@
+"""
+Variance-reduction benchmark: effective sample size per CPU-second of each
+roster sampling scheme against plain Monte Carlo, for slot_value and
+champion_pct, plus the gain from common random numbers when comparing two
+injury_handling settings.
+
+    python benchmarks/variance_reduction.py [num_seasons] [replicates] [score_draw]
+"""
+
+from __future__ import print_function
+import sys
+import time
+import numpy as np
+import common
+import engine3 as eng
+import montecarlo3 as mc
+
+SCHEMES = ['plain', 'antithetic', 'stratified']
+
+def run_replicates(players, teams, sampling, num_seasons, replicates, score_draw):
+    'slot_value and champion_pct estimates of independent replicate runs, and the CPU time they took'
+    slot_values, champion_pcts = [], []
+    start = time.process_time()
+    for seed in range(replicates):
+        league = eng.StreamingLeague(players, teams, num_seasons, common.ROSTER_SLOTS, common.SEASON_LENGTH, seed=seed, block_size=1200,
+                                     score_draw=score_draw, sampling=sampling)
+        slot_values.append(league.accumulator.slots.mean)
+        champion_pcts.append(league.accumulator.get_player_values()[2])
+    return np.array(slot_values), np.array(champion_pcts), (time.process_time() - start)/replicates
+
+def main(num_seasons=2400, replicates=40, score_draw='replay'):
+    players = common.get_player_pool()
+    teams = common.get_teams()
+    print('{} seasons x {} replicates per scheme, score_draw={}'.format(num_seasons, replicates, score_draw))
+    print('{:>12s} {:>14s} {:>14s} {:>10s} {:>16s} {:>16s}'.format('scheme', 'slot var', 'champ var', 'cpu s', 'slot ESS/cpu-s', 'champ ESS/cpu-s'))
+    plain = None
+    for scheme in SCHEMES:
+        slot_values, champion_pcts, cpu = run_replicates(players, teams, scheme, num_seasons, replicates, score_draw)
+        # qb1/te1 have exactly one player per team, so their slot_value is always 0; leave them out
+        varying = slot_values.std(axis=0) > 0
+        slot_var = slot_values[:, varying].var(axis=0, ddof=1).sum()
+        champ_var = champion_pcts.var(axis=0, ddof=1).sum()
+        if plain is None:
+            plain = (slot_var, champ_var)
+        slot_ess = num_seasons*plain[0]/slot_var
+        champ_ess = num_seasons*plain[1]/champ_var
+        print('{:>12s} {:14.3e} {:14.3e} {:10.3f} {:16.0f} {:16.0f}'.format(scheme, slot_var, champ_var, cpu, slot_ess/cpu, champ_ess/cpu))
+
+    print()
+    print('Common random numbers: slot_value(recycle) - slot_value(zeros)')
+    pools = [common.get_player_pool(injury_handling='zeros'), common.get_player_pool(injury_handling='recycle')]
+    for crn in [False, True]:
+        comparison = mc.compare_slot_values(pools, teams, common.ROSTER_SLOTS, common.SEASON_LENGTH, num_seasons, seed=1, common_random_numbers=crn)[1]
+        print('  {:>14s}: {}'.format('CRN' if crn else 'independent', ' '.join('{}={:+.4f}+/-{:.4f}'.format(slot, comparison['difference'][slot], comparison['difference_se'][slot]) for slot in common.ROSTER_SLOTS)))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    main(*([int(a) for a in args[:2]] + args[2:]))
@@ -0,0 +1,273 @@
+"""
+On-disk cache for parsed weekly stats and the player score matrices built
+from them. Each entry is a directory of .npy files (loaded back with
+mmap_mode='r', so the score matrix is used straight from the page cache)
+plus a meta.json, keyed by the sha256 of the source csv and the settings
+that went into it. Entries left behind by an edited csv are dropped, and the
+least recently used ones are evicted once the cache grows past max_bytes.
+ResultCache keeps simulation results the same way, behind an in-memory LRU.
+"""
+
+from __future__ import print_function
+import collections
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import ingest3 as ingest
+from table3 import PlayerTable
+
+FORMAT_VERSION = 2
+
+class DataCache:
+    """
+    Directory of cache entries, one subdirectory per key.
+    get returns a dict of read-only memory-mapped arrays (or None on a miss);
+    put writes the arrays to a temporary directory and renames it into place,
+    so a crashed or concurrent writer never leaves a half-written entry.
+    """
+
+    def __init__(self, directory='.fantasy_cache', max_bytes=512*2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __str__(self):
+        return '{}: {} ({} entries, {:.1f} MB, {} hit(s) / {} miss(es))'.format(self.__class__.__name__, self.directory, len(self.get_entries()), self.get_size()/2.**20, self.hits, self.misses)
+
+    def get_key(self, kind, source_hash, settings):
+        'Digest of everything an entry depends on'
+        description = json.dumps([FORMAT_VERSION, kind, source_hash, settings], sort_keys=True, default=str)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in meta['arrays']}
+        except (IOError, OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        os.utime(path, None)
+        self.hits += 1
+        return arrays
+
+    def put(self, key, arrays, source=None, source_hash=None, meta=None):
+        '''
+        Store arrays under key (with any extra meta fields find can match on), drop entries made
+        from an older version of source, then evict down to max_bytes
+        '''
+        staging = tempfile.mkdtemp(prefix='.' + key, dir=self.directory)
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, name + '.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(dict(meta or {}, arrays=sorted(arrays), source=source, source_hash=source_hash), f)
+        path = os.path.join(self.directory, key)
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(staging, path)
+        except OSError:
+            # another process stored the same key first; theirs is just as good
+            shutil.rmtree(staging, ignore_errors=True)
+        if source is not None:
+            self.invalidate(source, source_hash)
+        self.evict()
+
+    def find(self, **fields):
+        'Keys and meta of every entry whose meta has all of fields'
+        found = []
+        for path in self.get_entries():
+            meta = self.get_meta(path)
+            if meta is not None and all(meta.get(k) == v for k, v in fields.items()):
+                found.append((os.path.basename(path), meta))
+        return found
+
+    def get_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def get_entries(self):
+        'Entry directories, least recently used first'
+        entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if not name.startswith('.')]
+        return sorted(entries, key=os.path.getmtime)
+
+    def get_entry_size(self, path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+    def get_size(self):
+        return sum(self.get_entry_size(path) for path in self.get_entries())
+
+    def invalidate(self, source, source_hash):
+        'Remove entries built from source when its contents hashed to anything but source_hash'
+        source = os.path.abspath(source)
+        for path in self.get_entries():
+            meta = self.get_meta(path)
+            if meta is None:
+                continue
+            if meta.get('source') == source and meta.get('source_hash') != source_hash:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def evict(self):
+        'Drop least recently used entries until the cache fits in max_bytes'
+        entries = self.get_entries()
+        sizes = [self.get_entry_size(path) for path in entries]
+        total = sum(sizes)
+        for path, size in zip(entries, sizes):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for path in self.get_entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+class ResultCache:
+    """
+    Memoized StreamingLeague results (PlayerAccumulator state, plus the
+    per-season trace when there is one), keyed by the league fingerprint and
+    the number of seasons. An in-memory LRU of max_entries sits in front of an
+    optional DataCache disk tier, which evicts by size. get can also return
+    the longest cached run of the same league that stops on a block
+    boundary, for the league to top up with the blocks it is missing.
+    """
+
+    def __init__(self, disk=None, max_entries=32):
+        self.disk = disk
+        self.max_entries = max_entries
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.top_ups = 0
+        self.misses = 0
+
+    def __str__(self):
+        return '{}: {} in memory, disk {} ({} hit(s), {} top-up(s), {} miss(es))'.format(self.__class__.__name__, len(self.memory), self.disk, self.hits, self.top_ups, self.misses)
+
+    def get(self, fingerprint, num_seasons, block_size=None):
+        '''
+        State of the run with exactly num_seasons, else (if block_size is given) of the longest shorter
+        run whose season count is a multiple of block_size, else None.
+        '''
+        state = self.load(fingerprint, num_seasons)
+        if state is not None:
+            self.hits += 1
+            return state
+        if block_size:
+            shorter = [n for n in self.get_season_counts(fingerprint) if n < num_seasons and n % block_size == 0]
+            if shorter:
+                state = self.load(fingerprint, max(shorter))
+                if state is not None:
+                    self.top_ups += 1
+                    return state
+        self.misses += 1
+        return None
+
+    def put(self, fingerprint, num_seasons, state):
+        self.remember((fingerprint, num_seasons), state)
+        if self.disk is not None:
+            self.disk.put(self.get_disk_key(fingerprint, num_seasons), state, meta={'kind': 'result', 'fingerprint': fingerprint, 'num_seasons': num_seasons})
+
+    def load(self, fingerprint, num_seasons):
+        'Memory first, then disk (promoting the entry into memory)'
+        key = (fingerprint, num_seasons)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.disk is None:
+            return None
+        arrays = self.disk.get(self.get_disk_key(fingerprint, num_seasons))
+        if arrays is not None:
+            self.remember(key, arrays)
+        return arrays
+
+    def remember(self, key, state):
+        self.memory[key] = state
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_season_counts(self, fingerprint):
+        'Season counts cached for fingerprint, in memory or on disk'
+        counts = set(n for f, n in self.memory if f == fingerprint)
+        if self.disk is not None:
+            counts.update(meta['num_seasons'] for key, meta in self.disk.find(kind='result', fingerprint=fingerprint))
+        return sorted(counts)
+
+    def get_disk_key(self, fingerprint, num_seasons):
+        return self.disk.get_key('result', fingerprint, {'num_seasons': num_seasons})
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            for key, meta in self.disk.find(kind='result'):
+                shutil.rmtree(os.path.join(self.disk.directory, key), ignore_errors=True)
+
+###############
+## Functions ##
+###############
+
+def hash_file(path, chunk_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def frame_to_arrays(df):
+    'DataFrame -> {column: array}, text columns as fixed-width unicode so they can be memory-mapped'
+    arrays = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        arrays[column] = values if np.issubdtype(values.dtype, np.number) else values.astype(np.str_)
+    arrays['_columns'] = np.array(list(df.columns), dtype=np.str_)
+    return arrays
+
+def arrays_to_frame(arrays):
+    import pandas as pd
+    return pd.DataFrame({column: arrays[column] for column in arrays['_columns']}, copy=False)
+
+def load_stats(path, cache=None):
+    'ingest3.read_stats_csv, served from cache when the csv has not changed'
+    if cache is None:
+        return ingest.read_stats_csv(path)
+    source = os.path.abspath(path)
+    source_hash = hash_file(path)
+    key = cache.get_key('stats', source_hash, {})
+    arrays = cache.get(key)
+    if arrays is None:
+        gl = ingest.read_stats_csv(path)
+        cache.put(key, frame_to_arrays(gl), source, source_hash)
+        return gl
+    return arrays_to_frame(arrays)
+
+def load_player_table(path, scoring_categories, scoring_values, season_length, injury_handling, seed, cache=None):
+    '''
+    PlayerTable.from_game_logs for a stats csv. With a cache (and an integer seed, without which
+    the filled-in games are not reproducible) the score matrix, names, positions, gp and points
+    are stored once and then memory-mapped, skipping the csv, the scoring and the injury handling.
+    '''
+    if cache is None or seed is None:
+        gl = load_stats(path, cache)
+        return PlayerTable.from_game_logs(gl, scoring_categories, scoring_values, season_length, injury_handling, seed)
+    source = os.path.abspath(path)
+    source_hash = hash_file(path)
+    settings = {'scoring_categories': list(scoring_categories), 'scoring_values': [float(v) for v in scoring_values],
+                'season_length': season_length, 'injury_handling': injury_handling, 'seed': seed}
+    key = cache.get_key('players', source_hash, settings)
+    arrays = cache.get(key)
+    if arrays is None:
+        gl = load_stats(path, cache)
+        matrix = ingest.read_game_logs(gl, scoring_categories, scoring_values, season_length)
+        arrays = {'names': np.array(matrix.names, dtype=np.str_), 'positions': np.array(matrix.positions, dtype=np.str_),
+                  'scores': matrix.get_season_scores(injury_handling, seed), 'gp': matrix.gp.astype(np.int16), 'points': matrix.points}
+        cache.put(key, arrays, source, source_hash)
+    return PlayerTable(arrays['names'], arrays['positions'].tolist(), arrays['scores'], arrays['gp'], arrays['points'])
@@ -0,0 +1,206 @@
+"""
+Batched snake drafts.
+Replaces the shuffled round-robin of League.set_rosters with a draft: every
+season gets a random draft order, and each pick goes to the best player (by
+the team's DRAFT_METHOD) at a position the team still has an opening for.
+Drafts for a whole block of seasons run together, one array operation per
+pick, and DraftLeague feeds the rosters straight into the ArrayLeague
+season simulation.
+"""
+
+from __future__ import print_function
+import re
+import numpy as np
+import pandas as pd
+import engine3 as eng
+import models3 as fs
+
+DRAFT_METHODS = ['random', 'clairvoyant', 'utility', 'adp']
+
+class DraftLeague(eng.ArrayLeague):
+    """
+    ArrayLeague whose rosters come from snake drafts.
+    strategies is one DRAFT_METHOD per team (or one for every team):
+    random picks any player the team has room for, clairvoyant takes the
+    best points_per_gp (the season that will actually be replayed), utility
+    the best certainty equivalent, and adp the most projected points in
+    projections (scored with scoring_categories / scoring_values; players
+    without a projection go after everyone with one). Teams keep their
+    strategy every season but draw a new draft slot, so
+    get_strategy_results() compares the strategies on equal footing.
+    roster_openings and assignment work as in League (see RosterAssignment);
+    by default each team drafts the positions of roster_slots.
+    """
+
+    def __init__(self, players, teams, seasons, roster_slots, season_length, strategies, projections=None, scoring_categories=None,
+                 scoring_values=None, seed=None, block_size=1000, populate=True, instrumentation=None, roster_openings=None, assignment='position'):
+        if isinstance(strategies, str):
+            strategies = [strategies]*len(teams)
+        if len(strategies) != len(teams):
+            raise ValueError('Need one draft strategy per team ({}), got {}'.format(len(teams), len(strategies)))
+        self.strategies = list(strategies)
+        self.projections = projections
+        self.scoring_categories = scoring_categories
+        self.scoring_values = scoring_values
+        self.seed = seed
+        self.block_size = block_size
+        eng.ArrayLeague.__init__(self, players, teams, seasons, roster_slots, season_length, populate, instrumentation, roster_openings, assignment)
+
+    def __str__(self):
+        return '{} ({})'.format(eng.ArrayLeague.__str__(self), ', '.join('{} {}'.format(self.strategies.count(m), m) for m in DRAFT_METHODS if m in self.strategies))
+
+    def set_rosters(self):
+        'Snake drafts for every season, stored as the same lineup and assignment arrays ArrayLeague uses'
+        players = self.players
+        for pos in eng.ROSTER_POSITIONS:
+            position_players = [p for p in players if p.position == pos]
+            if position_players:
+                fs.calculate_position_measurements(position_players)
+        rng = np.random.default_rng(self.seed)
+        roster_openings = self.roster_openings
+        if roster_openings is None and self.assignment == 'position':
+            roster_openings = dict(zip(eng.ROSTER_POSITIONS, get_roster_openings(self.roster_slots)))
+        self.roster_assignment = fs.RosterAssignment(players, self.roster_slots, self.league_size, self.assignment, roster_openings)
+        self.position_groups = self.roster_assignment.groups
+        self.openings = self.roster_assignment.openings
+        self.opening_teams = self.roster_assignment.opening_teams
+        team_keys = get_team_keys(players, self.strategies, self.projections, self.scoring_categories, self.scoring_values, rng)
+        position_index = get_group_index(self.position_groups, len(players))
+        num_seasons = len(self.seasons)
+        self.draft_order = np.empty((num_seasons, self.league_size), dtype=np.intp)
+        self.lineups = np.empty((num_seasons, self.league_size*sum(self.openings)), dtype=np.intp)
+        start = 0
+        for size in eng.get_block_sizes(num_seasons, self.block_size):
+            draft_order = get_draft_order(rng, size, self.league_size)
+            keys = get_season_keys(rng, team_keys, self.strategies, size)
+            self.draft_order[start:start+size] = draft_order
+            self.lineups[start:start+size] = run_drafts(keys, position_index, self.openings, draft_order)
+            start += size
+        self.assignments = eng.get_assignments(self.lineups, self.opening_teams, len(players))
+
+    def get_strategy_results(self):
+        'Per draft strategy: teams using it, champion_pct, average_team_ranking (1 = best) and win_pct'
+        champions = self.final_ranks == self.league_size - 1
+        records = []
+        for method in DRAFT_METHODS:
+            teams = [t for t, m in enumerate(self.strategies) if m == method]
+            if teams:
+                records.append((method, len(teams), champions[:, teams].mean(), (self.league_size - self.final_ranks[:, teams]).mean(),
+                                self.win_pct[:, teams].mean()))
+        return pd.DataFrame(records, columns=['strategy', 'teams', 'champion_pct', 'average_team_ranking', 'win_pct']).set_index('strategy')
+
+    def get_draft_slot_results(self):
+        'champion_pct and average_team_ranking by draft slot (1 = first pick), over every strategy'
+        season_index = np.arange(len(self.draft_order))[:, np.newaxis]
+        final_ranks = self.final_ranks[season_index, self.draft_order]
+        return pd.DataFrame({'champion_pct': (final_ranks == self.league_size - 1).mean(axis=0),
+                             'average_team_ranking': (self.league_size - final_ranks).mean(axis=0)},
+                            index=pd.Index(np.arange(1, self.league_size + 1), name='draft_slot'))
+
+###############
+## Functions ##
+###############
+
+def get_roster_openings(roster_slots):
+    'Openings per team for each of ROSTER_POSITIONS, counted from roster_slots'
+    positions = [fs.convert_slot_to_position(slot)[0] for slot in roster_slots]
+    return [positions.count(pos) for pos in eng.ROSTER_POSITIONS]
+
+def get_position_index(players):
+    'Index into ROSTER_POSITIONS of every player (-1 for any other position)'
+    return np.array([eng.ROSTER_POSITIONS.index(p.position) if p.position in eng.ROSTER_POSITIONS else -1 for p in players], dtype=np.intp)
+
+def get_group_index(groups, num_players):
+    'Index of the RosterAssignment group every player is in (-1 for none), so run_drafts can draft by slot as well as by position'
+    group_index = np.full(num_players, -1, dtype=np.intp)
+    for g, group in enumerate(groups):
+        group_index[group] = g
+    return group_index
+
+def normalize_name(name):
+    'Lower case, letters and digits only, no Jr/Sr/II suffix: "Odell Beckham Jr." and "Odell Beckham Jr" match'
+    name = re.sub(r'[^a-z0-9 ]', '', name.lower())
+    return re.sub(r' (jr|sr|ii|iii|iv)$', '', name).strip()
+
+def get_projected_points(players, projections, scoring_categories, scoring_values):
+    'Projected season points per player from a projections frame (NaN where a player has no projection)'
+    points = projections[scoring_categories].to_numpy(dtype=np.float64).dot(np.asarray(scoring_values, dtype=np.float64))
+    lookup = {}
+    for name, pos, total in zip(projections['player'], projections['position'], points):
+        lookup.setdefault((normalize_name(name), pos), total)
+    return np.array([lookup.get((normalize_name(p.name), p.position), np.nan) for p in players])
+
+def get_draft_keys(players, method, projections=None, scoring_categories=None, scoring_values=None):
+    'Players x 1 value a method drafts by, highest first (None for random)'
+    if method not in DRAFT_METHODS:
+        raise ValueError('Draft method must be one of {}, not {!r}'.format(DRAFT_METHODS, method))
+    if method == 'random':
+        return None
+    if method == 'clairvoyant':
+        return np.array([p.points_per_gp for p in players], dtype=np.float64)
+    if method == 'utility':
+        return np.array([p.utility for p in players], dtype=np.float64)
+    if projections is None or scoring_categories is None or scoring_values is None:
+        raise ValueError('adp drafts need projections, scoring_categories and scoring_values')
+    return np.nan_to_num(get_projected_points(players, projections, scoring_categories, scoring_values), nan=-np.inf)
+
+def get_team_keys(players, strategies, projections, scoring_categories, scoring_values, rng):
+    '''
+    Teams x players draft preference (higher goes first) for the deterministic strategies, as ranks
+    0..players-1 with ties broken at random once; random teams get fresh keys every season.
+    '''
+    team_keys = np.zeros((len(strategies), len(players)))
+    for method in set(strategies):
+        keys = get_draft_keys(players, method, projections, scoring_categories, scoring_values)
+        if keys is None:
+            continue
+        order = np.lexsort((rng.random(len(players)), keys))
+        ranks = np.empty(len(players))
+        ranks[order] = np.arange(len(players))
+        team_keys[[t for t, m in enumerate(strategies) if m == method]] = ranks
+    return team_keys
+
+def get_season_keys(rng, team_keys, strategies, num_seasons):
+    'Seasons x teams x players draft preference, with uniform random keys for random teams'
+    keys = np.repeat(team_keys[np.newaxis], num_seasons, axis=0)
+    random_teams = [t for t, m in enumerate(strategies) if m == 'random']
+    if random_teams:
+        keys[:, random_teams] = rng.random((num_seasons, len(random_teams), team_keys.shape[1]))*team_keys.shape[1]
+    return keys
+
+def get_draft_order(rng, num_seasons, league_size):
+    'Seasons x teams: the team picking first, second, ... in round one'
+    return rng.permuted(np.tile(np.arange(league_size), (num_seasons, 1)), axis=1)
+
+def get_snake_order(draft_order, num_rounds):
+    'Seasons x picks team index: odd rounds in draft order, even rounds reversed'
+    rounds = [draft_order if r % 2 == 0 else draft_order[:, ::-1] for r in range(num_rounds)]
+    return np.concatenate(rounds, axis=1)
+
+def run_drafts(keys, position_index, openings, draft_order):
+    '''
+    Seasons x openings lineups (the layout of engine3.get_opening_teams, -1 where nobody was left)
+    from snake drafts. keys is seasons x teams x players; every pick takes the team's highest-keyed
+    player still on the board at a position it has an opening for, for all seasons at once.
+    '''
+    num_seasons, league_size, num_players = keys.shape
+    openings = np.asarray(openings, dtype=np.intp)
+    starts = np.concatenate([[0], np.cumsum(openings*league_size)[:-1]])
+    season_index = np.arange(num_seasons)
+    lineups = np.full((num_seasons, league_size*openings.sum()), -1, dtype=np.intp)
+    needs = np.tile(openings, (num_seasons, league_size, 1))
+    # players at positions nobody drafts are never on the board
+    board = np.tile(position_index >= 0, (num_seasons, 1))
+    player_position = np.where(position_index >= 0, position_index, 0)
+    for team in get_snake_order(draft_order, openings.sum()).T:
+        team_needs = needs[season_index, team]
+        eligible = board & (team_needs[:, player_position] > 0)
+        pick = np.where(eligible, keys[season_index, team], -np.inf).argmax(axis=1)
+        picked = eligible[season_index, pick]
+        s, p, t = season_index[picked], pick[picked], team[picked]
+        pos = player_position[p]
+        filled = openings[pos] - needs[s, t, pos]
+        lineups[s, starts[pos] + t*openings[pos] + filled] = p
+        needs[s, t, pos] -= 1
+        board[s, p] = False
+    return lineups
@@ -0,0 +1,895 @@
+"""
+Array-based season engine for the fantasy simulator.
+Holds a seasons x players x weeks score array and a seasons x players roster
+assignment array, so team totals, weekly ranks, win pct, final ranks and
+champion_pct come from batched array operations instead of nested loops.
+"""
+
+from __future__ import print_function
+import hashlib
+import json
+import numpy as np
+import models3 as fs
+
+ROSTER_POSITIONS = fs.ROSTER_POSITIONS
+ROSTER_OPENINGS = fs.ROSTER_OPENINGS
+ACCUMULATOR_TOTALS = ['counts', 'rank_sums', 'rank_square_sums', 'reciprocal_sums', 'champion_counts']
+ACCUMULATOR_STATS = ['points', 'utility', 'slots']
+TRACE_ARRAYS = ['season_index', 'assignments', 'final_ranks', 'win_pct', 'player_ranks']
+# part of every fingerprint; bumped when a sampling scheme draws differently, so cached results are not reused
+SAMPLING_VERSION = 2
+# seasons calculate_swap_deltas swaps at a time, so its per-opening arrays stay in cache
+SWAP_BLOCK = 1000
+
+class ArrayLeague(fs.League):
+    """
+    Drop-in replacement for League that simulates every season at once.
+    Rosters come from the same RosterAssignment draw League makes off the
+    random module, so a fixed seed gives bit-identical scores, ranks and
+    player values (for any assignment and roster_openings).
+    With populate=False the per-season dicts on Player/Team/Season are left
+    empty and only the player values are set (much faster for big runs).
+    """
+
+    def __init__(self, players, teams, seasons, roster_slots, season_length, populate=True, instrumentation=None, roster_openings=None, assignment='position'):
+        self.populate = populate
+        fs.League.__init__(self, players, teams, seasons, roster_slots, season_length, instrumentation, roster_openings, assignment)
+
+    def set_rosters(self):
+        'Same draw as League.set_rosters, kept as the seasons x openings lineup array'
+        players = self.players
+        for pos in ROSTER_POSITIONS:
+            position_players = fs.get_position_players(players, pos)
+            fs.calculate_position_measurements(position_players)
+        self.roster_assignment = fs.RosterAssignment(players, self.roster_slots, self.league_size, self.assignment, self.roster_openings)
+        self.position_groups = self.roster_assignment.groups
+        self.opening_teams = self.roster_assignment.opening_teams
+        self.lineups = self.roster_assignment.draw(fs.get_roster_rng(), len(self.seasons))
+        self.assignments = get_assignments(self.lineups, self.opening_teams, len(players))
+
+    def generate_player_scores(self):
+        'Every season replays each scoring_array in order, so the seasons axis is a broadcast view'
+        self.player_scores = get_score_matrix(self.players, self.season_length)
+        self.scores = np.broadcast_to(self.player_scores, (len(self.seasons),) + self.player_scores.shape)
+
+    def calculate_team_scores(self):
+        self.team_scores = calculate_team_scores(self.player_scores, self.assignments, self.league_size)
+
+    def calculate_weekly_stats(self):
+        self.weekly_ranks = calculate_weekly_ranks(self.team_scores)
+
+    def calculate_season_stats(self):
+        self.win_pct, self.final_ranks = calculate_final_ranks(self.weekly_ranks)
+        self.player_ranks = get_player_ranks(self.final_ranks, self.assignments)
+
+    def calculate_player_value(self):
+        self.rank_summary = summarize_player_ranks(self.player_ranks, self.league_size)
+        average, harmonic, champion = get_player_values(self.rank_summary, self.league_size)
+        # where this league's value lands in each player's lists, so update_players can overwrite it
+        self.value_index = [len(p.champion_pct) for p in self.players]
+        for i, p in enumerate(self.players):
+            p.update_average_team_ranking(average[i])
+            p.update_harmonic_team_ranking(harmonic[i])
+            p.update_champion_pct(float(champion[i]))
+        if self.populate:
+            self.populate_objects()
+
+    def update_players(self, players):
+        '''
+        Re-simulate after the scoring_array of some players in the league changed.
+        Rosters are kept, only the teams those players were on are re-added and re-ranked, only
+        seasons whose weekly ranks moved get new final ranks, and every player's values are
+        overwritten in place, giving what a full rebuild with the same random seed gives.
+        Returns the indices of the seasons whose final ranks were recalculated.
+        '''
+        player_index = {p.player_id: i for i, p in enumerate(self.players)}
+        changed = np.array(sorted(set(player_index[p.player_id] for p in players)), dtype=np.intp)
+        self.player_scores[changed] = get_score_matrix([self.players[i] for i in changed], self.season_length)
+        season_index, team_index = get_changed_teams(self.assignments, changed, self.league_size)
+        self.team_scores[season_index, team_index] = calculate_roster_scores(self.player_scores, self.lineups[season_index],
+                                                                            get_team_openings(self.opening_teams, self.league_size)[team_index])
+        affected = np.unique(season_index)
+        seasons = self.update_season_stats(affected)
+        player_ranks = get_player_ranks(self.final_ranks[seasons], self.assignments[seasons])
+        reranked = np.flatnonzero((player_ranks != self.player_ranks[seasons]).any(axis=0))
+        self.player_ranks[seasons] = player_ranks
+        self.rank_summary = update_rank_summary(self.rank_summary, self.player_ranks, reranked, self.league_size)
+        average, harmonic, champion = get_player_values(self.rank_summary, self.league_size)
+        for i, p in enumerate(self.players):
+            k = self.value_index[i]
+            p.average_team_ranking[k] = average[i]
+            p.harmonic_team_ranking[k] = harmonic[i]
+            p.champion_pct[k] = float(champion[i])
+        if self.populate:
+            self.populate_objects(affected)
+            # a changed player is scored in every season, including those no team of theirs played in
+            self.populate_player_scores(changed)
+        return seasons
+
+    def update_season_stats(self, affected):
+        'Weekly ranks again for the affected seasons (their team scores changed); returns the seasons whose final ranks were recalculated'
+        weekly_ranks = calculate_weekly_ranks(self.team_scores[affected])
+        moved = (weekly_ranks != self.weekly_ranks[affected]).any(axis=(1, 2))
+        seasons = affected[moved]
+        self.weekly_ranks[seasons] = weekly_ranks[moved]
+        self.win_pct[seasons], self.final_ranks[seasons] = calculate_final_ranks(self.weekly_ranks[seasons])
+        return seasons
+
+    def get_marginal_values(self, replacements=None, confidence=0.95):
+        '''
+        Championships above replacement: for every player and every season they were rostered, the
+        change in their team's championship share and final rank when their weekly scores are swapped
+        for a replacement-level player's at the same slot, everything else in the season unchanged.
+        replacements maps slot -> Player (any scoring_array will do); by default each slot's lowest
+        points_per_gp player. Every swap is a delta on one team's weekly scores (added up again
+        wherever rounding could decide a tie) and the all-play wins of the rest, so all players cost
+        about one more pass over team_scores. Ties for first share the title both before and after
+        the swap. Returns {player_id: {...}} with the mean and confidence interval of the per-season
+        differences.
+        '''
+        # statistics is slow to import and only needed here
+        from statistics import NormalDist
+        z = NormalDist().inv_cdf(0.5 + confidence/2.)
+        replacement_scores = get_replacement_scores(self.players, self.roster_slots, self.season_length, replacements)
+        slot_index = {slot: i for i, slot in enumerate(self.roster_slots)}
+        player_slots = np.array([slot_index.get(p.slot, -1) for p in self.players], dtype=np.intp)
+        if np.any(player_slots < 0):
+            raise ValueError('Every player needs a slot in roster_slots for a replacement: {}'.format(sorted(set(p.slot for p in self.players) - set(slot_index))))
+        counts, champion_sums, champion_square_sums, rank_sums = calculate_swap_deltas(self.team_scores, self.lineups, self.opening_teams, self.player_scores,
+                                                                                       replacement_scores[player_slots])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            car = champion_sums/counts
+            half_width = z*np.sqrt(np.maximum(champion_square_sums/counts - car**2, 0.)/(counts - 1))
+            rank_gain = rank_sums/counts
+        return {p.player_id: {'name': p.name, 'slot': p.slot, 'seasons': int(counts[i]), 'championships_above_replacement': car[i],
+                              'car_low': car[i] - half_width[i], 'car_high': car[i] + half_width[i], 'rank_gain': rank_gain[i]}
+                for i, p in enumerate(self.players)}
+
+    def populate_player_scores(self, player_indices, season_indices=None):
+        'Per-season scoring_output, average_points, average_utility and season_consistency of the players at player_indices'
+        if season_indices is None:
+            season_indices = range(len(self.seasons))
+        season_ids = [self.seasons[s_index].season_id for s_index in season_indices]
+        num_weeks = self.season_length
+        for p_index in player_indices:
+            p = self.players[p_index]
+            output = list(p.scoring_array[:num_weeks])
+            average_points, average_utility, consistency = get_average_stats(output)
+            for season_id in season_ids:
+                p.scoring_output[season_id] = list(output)
+                p.average_points[season_id] = average_points
+                p.average_utility[season_id] = average_utility
+                p.season_consistency[season_id] = consistency
+
+    def populate_objects(self, season_indices=None):
+        'Fill the per-season Player/Team/Season dicts exactly as League would (only for season_indices, if given)'
+        if season_indices is None:
+            season_indices = range(len(self.seasons))
+        players = self.players
+        teams = self.teams
+        team_ids = [t.team_id for t in teams]
+        player_ids = [p.player_id for p in players]
+        # League scores every player, rostered or not
+        self.populate_player_scores(range(len(players)), season_indices)
+        team_points, team_utility = get_team_average_stats(self.team_scores)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            team_consistency = team_utility/team_points
+        for s_index in season_indices:
+            s = self.seasons[s_index]
+            season_id = s.season_id
+            assignments = self.assignments[s_index]
+            final_ranks = self.final_ranks[s_index]
+            rosters = {tid: [] for tid in team_ids}
+            for p_index in self.lineups[s_index]:
+                if p_index >= 0:
+                    rosters[team_ids[assignments[p_index]]].append(player_ids[p_index])
+            s.rosters = rosters
+            for p_index, p in enumerate(players):
+                t_index = assignments[p_index]
+                if t_index >= 0:
+                    p.team_assignments[season_id] = team_ids[t_index]
+                    p.team_rankings[season_id] = final_ranks[t_index]
+            weekly_ranks = self.weekly_ranks[s_index]
+            for t_index, t in enumerate(teams):
+                t.player_assignments[season_id] = rosters[t.team_id]
+                t.scoring_output[season_id] = self.team_scores[s_index, t_index].tolist()
+                t.average_points[season_id] = team_points[s_index, t_index]
+                t.average_utility[season_id] = team_utility[s_index, t_index]
+                t.weekly_consistency[season_id] = team_consistency[s_index, t_index]
+                s.team_rankings[t.team_id] = list(weekly_ranks[:, t_index])
+                s.team_win_pct[t.team_id] = self.win_pct[s_index, t_index]
+                s.final_team_ranks[t.team_id] = final_ranks[t_index]
+
+class StreamingLeague(fs.League):
+    """
+    Constant-memory League: blocks of seasons come out of a generator and are
+    folded into a PlayerAccumulator, so no per-season history is kept.
+    seasons is a count, or a list of Season objects (only used by subclasses
+    that write per-season results back). Each block is drawn from its own
+    SeedSequence child, so results depend on seed and block_size only.
+    score_draw='replay' replays each scoring_array in order like League;
+    'sample' draws every week at random from it like Season.generate_player_scores.
+    trace_seasons keeps the full per-season arrays of that many randomly
+    chosen seasons in self.trace, for debugging.
+    sampling picks the variance-reduction scheme used to draw rosters (and
+    sampled scores): 'plain', 'antithetic' or 'stratified'; see draw_lineups.
+    result_cache (a cache3.ResultCache) memoizes seeded runs by get_fingerprint:
+    an identical run is read back, and a cached run of fewer seasons (a whole
+    number of blocks) is topped up with only the blocks it is missing.
+    season_store (a store3.SeasonStore) gets every block's per-season arrays
+    appended as it is folded, so runs too big for memory keep their seasons on
+    disk; it bypasses result_cache, whose cached blocks have no such arrays.
+    roster_openings and assignment ('position' or 'slot') set the groups and
+    openings rosters are drawn from; see models3.RosterAssignment.
+    """
+
+    def __init__(self, players, teams, seasons, roster_slots, season_length, seed=None, block_size=1000, score_draw='replay', trace_seasons=0, workers=1, sampling='plain',
+                 instrumentation=None, result_cache=None, season_store=None, roster_openings=None, assignment='position'):
+        self.num_seasons = seasons if isinstance(seasons, int) else len(seasons)
+        self.season_store = season_store
+        # an unseeded run can never be asked for again
+        self.result_cache = result_cache if seed is not None and season_store is None else None
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.block_size = block_size
+        self.score_draw = score_draw
+        self.sampling = sampling
+        self.workers = workers
+        self.trace_seasons = trace_seasons
+        self.trace_index = get_trace_index(self.seed, self.num_seasons, trace_seasons)
+        self.cached_blocks = 0
+        fs.League.__init__(self, players, teams, [] if isinstance(seasons, int) else seasons, roster_slots, season_length, instrumentation, roster_openings, assignment)
+
+    def __str__(self):
+        return '{} {}: {} players, {} teams, {} seasons'.format(self.__class__.__name__, self.league_id, len(self.players), len(self.teams), self.num_seasons)
+
+    def get_num_seasons(self):
+        return self.num_seasons
+
+    def set_rosters(self):
+        'Position measurements and roster openings; the rosters themselves are drawn per block'
+        players = self.players
+        for pos in ROSTER_POSITIONS:
+            position_players = fs.get_position_players(players, pos, method=None)
+            fs.calculate_position_measurements(position_players)
+        self.roster_assignment = fs.RosterAssignment(players, self.roster_slots, self.league_size, self.assignment, self.roster_openings)
+        self.position_groups = self.roster_assignment.groups
+        self.slot_groups = get_slot_groups(players, self.roster_slots)
+        self.openings = self.roster_assignment.openings
+        self.opening_teams = self.roster_assignment.opening_teams
+
+    def generate_player_scores(self):
+        self.player_scores = get_score_matrix(self.players, self.season_length)
+
+    def calculate_team_scores(self):
+        'Team scores, weekly ranks and final ranks are computed block by block while folding'
+        self.accumulator = PlayerAccumulator(len(self.players), self.league_size, len(self.slot_groups))
+        traces = []
+        instrumentation = self.instrumentation
+        if self.result_cache is not None:
+            self.fingerprint = self.get_fingerprint()
+            # a sampled trace depends on the season count, so only an exact match will do
+            resumable = self.trace_seasons == 0 or self.trace_seasons >= self.num_seasons
+            cached = self.result_cache.get(self.fingerprint, self.num_seasons, self.block_size if resumable else None)
+            if cached is not None:
+                self.accumulator = PlayerAccumulator.from_state(cached)
+                if 'trace_season_index' in cached:
+                    traces.append(SeasonTrace.from_state(cached))
+                self.cached_blocks = len(get_block_sizes(self.accumulator.num_seasons, self.block_size))
+                instrumentation.count('cached_seasons', self.accumulator.num_seasons)
+        for block in self.generate_seasons():
+            self.accumulator.merge(block.accumulator)
+            if block.trace is not None:
+                traces.append(block.trace)
+            if block.seasons is not None:
+                # Season objects name their seasons; otherwise the store numbers them on from its last one
+                start = self.accumulator.num_seasons - block.num_seasons
+                season_ids = [s.season_id for s in self.seasons[start:start+block.num_seasons]] if self.seasons else None
+                self.season_store.append(season_ids=season_ids, **block.seasons)
+            instrumentation.count('blocks')
+            instrumentation.progress('calculate_team_scores', self.accumulator.num_seasons, self.num_seasons)
+        self.trace = SeasonTrace.concatenate(traces) if traces else None
+        if self.result_cache is not None and self.cached_blocks < len(get_block_sizes(self.num_seasons, self.block_size)):
+            state = self.accumulator.get_state()
+            if self.trace is not None:
+                state.update(self.trace.get_state())
+            self.result_cache.put(self.fingerprint, self.num_seasons, state)
+
+    def calculate_weekly_stats(self):
+        pass
+
+    def calculate_season_stats(self):
+        pass
+
+    def calculate_player_value(self):
+        average, harmonic, champion = self.accumulator.get_player_values()
+        for i, p in enumerate(self.players):
+            p.update_average_team_ranking(average[i])
+            p.update_harmonic_team_ranking(harmonic[i])
+            p.update_champion_pct(float(champion[i]))
+
+    def get_block_task(self, block_index, season_offset, num_seasons):
+        trace_index = self.trace_index[(self.trace_index >= season_offset) & (self.trace_index < season_offset + num_seasons)]
+        return BlockTask(block_index, season_offset, num_seasons, self.seed, self.player_scores, self.position_groups, self.openings,
+                         self.league_size, self.score_draw, trace_index, self.slot_groups, self.sampling, self.season_store is not None)
+
+    def get_block_tasks(self):
+        'Tasks for every block not already read from the result cache'
+        tasks = []
+        start = 0
+        for i, n in enumerate(get_block_sizes(self.num_seasons, self.block_size)):
+            if i >= self.cached_blocks:
+                tasks.append(self.get_block_task(i, start, n))
+            start += n
+        return tasks
+
+    def get_fingerprint(self):
+        '''
+        Digest of everything the results depend on except the season count: the score matrix (and so
+        the scoring rules behind it), positions, slots, roster configuration, seed and engine settings.
+        '''
+        digest = hashlib.sha256(np.ascontiguousarray(self.player_scores, dtype=np.float64).tobytes())
+        settings = [[p.position for p in self.players], [p.slot for p in self.players], list(self.roster_slots),
+                    self.assignment, list(self.openings), self.league_size, self.season_length, str(self.seed), self.block_size, self.score_draw, self.sampling, SAMPLING_VERSION,
+                    self.trace_seasons if self.trace_seasons < self.num_seasons else 'all']
+        digest.update(json.dumps(settings).encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    def generate_seasons(self):
+        'Yield simulated SeasonBlocks in block order'
+        for task in self.get_block_tasks():
+            yield simulate_block(task)
+
+    def get_slot_values(self):
+        'slot_value (average champion_pct - 1/league_size) for every roster slot'
+        return dict(zip(self.roster_slots, self.accumulator.slots.mean))
+
+    def get_season_stats(self, player):
+        'Mean and standard deviation of a player\'s season average points and utility'
+        i = self.players.index(player)
+        points, utility = self.accumulator.points, self.accumulator.utility
+        return {'avg_points': points.mean[i], 'std_points': np.sqrt(points.get_variance()[i]),
+                'avg_utility': utility.mean[i], 'std_utility': np.sqrt(utility.get_variance()[i])}
+
+class RunningStats:
+    """
+    Welford mean/variance per column, folded in a block of rows at a time
+    (Chan et al. pairwise update), so blocks can also be merged.
+    """
+
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def update(self, values):
+        if len(values):
+            mean = values.mean(axis=0)
+            self.combine(len(values), mean, np.square(values - mean).sum(axis=0))
+
+    def merge(self, other):
+        self.combine(other.count, other.mean, other.m2)
+
+    def combine(self, count, mean, m2):
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta*count/total
+        self.m2 = self.m2 + m2 + np.square(delta)*self.count*count/total
+        self.count = total
+
+    def get_variance(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.m2/(self.count - 1)
+
+class PlayerAccumulator:
+    """
+    Running per-player totals: seasons played, rank sums, reciprocal-rank sums
+    (for the harmonic mean), champion counts, rank sums of squares (for error
+    bars), RunningStats of each player's season average points and utility,
+    and RunningStats of each roster slot's per-season slot_value.
+    """
+
+    def __init__(self, num_players, league_size, num_slots=0):
+        self.league_size = league_size
+        self.num_seasons = 0
+        self.counts = np.zeros(num_players, dtype=np.int64)
+        self.rank_sums = np.zeros(num_players, dtype=np.int64)
+        self.rank_square_sums = np.zeros(num_players, dtype=np.int64)
+        self.reciprocal_sums = np.zeros(num_players)
+        self.champion_counts = np.zeros(num_players, dtype=np.int64)
+        self.points = RunningStats(num_players)
+        self.utility = RunningStats(num_players)
+        self.slots = RunningStats(num_slots)
+
+    def __str__(self):
+        return '{}: {} seasons, {} players'.format(self.__class__.__name__, self.num_seasons, len(self.counts))
+
+    def update(self, player_ranks, points=None, utility=None, slot_groups=()):
+        'Fold in seasons x players final ranks (and season average points/utility)'
+        self.add_summary(summarize_player_ranks(player_ranks, self.league_size), len(player_ranks))
+        self.rank_square_sums = self.rank_square_sums + np.square(np.where(player_ranks >= 0, player_ranks, 0)).sum(axis=0)
+        if len(slot_groups):
+            self.slots.update(get_slot_value_samples(player_ranks, slot_groups, self.league_size))
+        if points is not None:
+            self.points.update(points)
+        if utility is not None:
+            self.utility.update(utility)
+
+    def add_summary(self, summary, num_seasons):
+        counts, rank_sums, reciprocal_sums, champion_counts = summary
+        self.num_seasons += num_seasons
+        self.counts = self.counts + counts
+        self.rank_sums = self.rank_sums + rank_sums
+        self.reciprocal_sums = self.reciprocal_sums + reciprocal_sums
+        self.champion_counts = self.champion_counts + champion_counts
+
+    def merge(self, other):
+        'Fold in another accumulator; merge in a fixed order to get reproducible float sums'
+        self.add_summary(other.get_summary(), other.num_seasons)
+        self.rank_square_sums = self.rank_square_sums + other.rank_square_sums
+        self.points.merge(other.points)
+        self.utility.merge(other.utility)
+        self.slots.merge(other.slots)
+
+    def get_summary(self):
+        return self.counts, self.rank_sums, self.reciprocal_sums, self.champion_counts
+
+    def get_state(self):
+        'Dict of arrays that from_state turns back into an identical accumulator'
+        state = {'league_size': np.array(self.league_size), 'num_seasons': np.array(self.num_seasons)}
+        for name in ACCUMULATOR_TOTALS:
+            state[name] = getattr(self, name)
+        for name in ACCUMULATOR_STATS:
+            stats = getattr(self, name)
+            state.update({name + '_count': np.array(stats.count), name + '_mean': stats.mean, name + '_m2': stats.m2})
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        accumulator = cls(len(state['counts']), state['league_size'].item(), len(state['slots_mean']))
+        accumulator.num_seasons = state['num_seasons'].item()
+        for name in ACCUMULATOR_TOTALS:
+            setattr(accumulator, name, np.array(state[name]))
+        for name in ACCUMULATOR_STATS:
+            stats = getattr(accumulator, name)
+            stats.count = state[name + '_count'].item()
+            stats.mean = np.array(state[name + '_mean'])
+            stats.m2 = np.array(state[name + '_m2'])
+        return accumulator
+
+    def get_player_values(self):
+        return get_player_values(self.get_summary(), self.league_size)
+
+    def get_standard_errors(self):
+        'Standard error of each player\'s champion_pct and average_team_ranking, and of each slot_value'
+        n = self.counts.astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            champion = self.champion_counts/n
+            champion_se = np.sqrt(champion*(1 - champion)/(n - 1))
+            rank_variance = (self.rank_square_sums - np.square(self.rank_sums)/n)/(n - 1)
+            rank_se = np.sqrt(np.maximum(rank_variance, 0)/n)
+            slot_se = np.sqrt(self.slots.get_variance()/self.slots.count)
+        return champion_se, rank_se, slot_se
+
+class SeasonTrace:
+    """
+    Full per-season arrays for a subset of seasons (season_index into the run).
+    """
+
+    def __init__(self, season_index, assignments, final_ranks, win_pct, player_ranks):
+        self.season_index = season_index
+        self.assignments = assignments
+        self.final_ranks = final_ranks
+        self.win_pct = win_pct
+        self.player_ranks = player_ranks
+
+    def __str__(self):
+        return '{}: {} seasons'.format(self.__class__.__name__, len(self.season_index))
+
+    @classmethod
+    def concatenate(cls, traces):
+        return cls(*[np.concatenate([getattr(t, attr) for t in traces]) for attr in TRACE_ARRAYS])
+
+    def get_state(self):
+        return {'trace_' + attr: getattr(self, attr) for attr in TRACE_ARRAYS}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(*[np.array(state['trace_' + attr]) for attr in TRACE_ARRAYS])
+
+class BlockTask:
+    """
+    Everything needed to simulate one block of seasons; picklable so it can be
+    sent to a process pool. trace_index holds run-wide season indices.
+    keep_seasons returns every season's arrays, for a SeasonStore.
+    """
+
+    def __init__(self, block_index, season_offset, num_seasons, seed, player_scores, position_groups, openings, league_size,
+                 score_draw='replay', trace_index=(), slot_groups=(), sampling='plain', keep_seasons=False):
+        self.block_index = block_index
+        self.season_offset = season_offset
+        self.num_seasons = num_seasons
+        self.seed = seed
+        self.player_scores = player_scores
+        self.position_groups = position_groups
+        self.openings = openings
+        self.league_size = league_size
+        self.score_draw = score_draw
+        self.trace_index = np.asarray(trace_index, dtype=np.intp)
+        self.slot_groups = slot_groups
+        self.sampling = sampling
+        self.keep_seasons = keep_seasons
+
+    def __str__(self):
+        return '{} {}: seasons {}-{}'.format(self.__class__.__name__, self.block_index, self.season_offset, self.season_offset + self.num_seasons - 1)
+
+class SeasonBlock:
+    """
+    Results for one block of seasons simulated from its own seeded Generator:
+    a PlayerAccumulator, plus a SeasonTrace of any traced seasons and, when
+    the task asked for them, every season's arrays in SeasonStore.append's
+    compact dtypes.
+    """
+
+    def __init__(self, block_index, num_seasons, accumulator, trace=None, seasons=None):
+        self.block_index = block_index
+        self.num_seasons = num_seasons
+        self.accumulator = accumulator
+        self.trace = trace
+        self.seasons = seasons
+
+    def __str__(self):
+        return '{} {}: {} seasons'.format(self.__class__.__name__, self.block_index, self.num_seasons)
+
+###############
+## Functions ##
+###############
+
+def get_position_groups(players, positions):
+    'Player indices for each position, in the same order get_position_players filters them'
+    return [np.array([i for i, p in enumerate(players) if p.position == pos], dtype=np.intp) for pos in positions]
+
+def get_slot_groups(players, roster_slots):
+    'Player indices for each roster slot (tier), e.g. every rb2'
+    return [np.array([i for i, p in enumerate(players) if p.slot == slot], dtype=np.intp) for slot in roster_slots]
+
+def get_opening_teams(openings, league_size):
+    'Team index of every roster opening: position-major, then team-major (T01, T01, T02, ...)'
+    return np.concatenate([np.repeat(np.arange(league_size), n) for n in openings])
+
+def draw_lineups(rng, position_groups, openings, league_size, num_seasons, sampling='plain', strength=None):
+    '''
+    fs.permute_lineups (every season permuted at once from a numpy Generator), plus variance reduction.
+    sampling='antithetic' pairs each even season with one where, in every position group,
+    the player with the i-th best strength takes the opening of the i-th worst.
+    sampling='stratified' spreads every position group's strong and weak blocks evenly over
+    each team within a stratum of league_size seasons: see stratify_lineups.
+    '''
+    lineups = fs.permute_lineups(rng, position_groups, openings, league_size, num_seasons)
+    if sampling == 'antithetic':
+        num_pairs = num_seasons//2
+        complement = get_complement(position_groups, strength)
+        lineups[1:2*num_pairs:2] = complement[lineups[0:2*num_pairs:2]]
+    elif sampling == 'stratified':
+        lineups = stratify_lineups(rng, lineups, openings, league_size, strength)
+    return lineups
+
+def stratify_lineups(rng, lineups, openings, league_size, strength):
+    '''
+    Latin-hypercube assignment of each season's position-group blocks to teams. Within a group,
+    every team's block of players is ranked by total strength, and team t gets the block of rank
+    (perm[t] + shift) % league_size, where perm is a random permutation of the teams drawn per
+    group and stratum of league_size seasons and shift runs through a random permutation of
+    0..league_size-1 over the stratum, again per group. Every season on its own is then a uniform
+    and, across groups, independent assignment (as with sampling='plain'), while across a stratum
+    each team gets the block of every rank of every group exactly once. Groups with unfilled
+    openings are left as drawn.
+    '''
+    num_seasons = len(lineups)
+    num_strata = -(-num_seasons//league_size)
+    season_index = np.arange(num_seasons)[:, np.newaxis]
+    stratum_index = np.arange(num_seasons)//league_size
+    stratified = lineups.copy()
+    start = 0
+    for n in openings:
+        blocks = lineups[:, start:start+league_size*n].reshape(num_seasons, league_size, n)
+        if np.all(blocks >= 0):
+            ranked = np.argsort(strength[blocks].sum(axis=2), axis=1, kind='stable')
+            perms = rng.permuted(np.tile(np.arange(league_size), (num_strata, 1)), axis=1)
+            shifts = rng.permuted(np.tile(np.arange(league_size), (num_strata, 1)), axis=1).reshape(-1)[:num_seasons, np.newaxis]
+            block_rank = (perms[stratum_index] + shifts) % league_size
+            stratified[:, start:start+league_size*n] = blocks[season_index, ranked[season_index, block_rank]].reshape(num_seasons, -1)
+        start += league_size*n
+    return stratified
+
+def get_complement(position_groups, strength):
+    'Player index -> player of mirrored strength rank in the same group (index -1 maps to -1)'
+    complement = np.full(len(strength) + 1, -1, dtype=np.intp)
+    for group in position_groups:
+        ranked = group[np.argsort(-strength[group], kind='stable')]
+        complement[ranked] = ranked[::-1]
+    return complement
+
+def get_assignments(lineups, opening_teams, num_players):
+    'Seasons x players array of team indices (-1 if the player sat out that season)'
+    num_seasons = len(lineups)
+    assignments = np.full((num_seasons, num_players), -1, dtype=np.intp)
+    season_index, opening_index = np.nonzero(lineups >= 0)
+    assignments[season_index, lineups[season_index, opening_index]] = opening_teams[opening_index]
+    return assignments
+
+def get_score_matrix(players, season_length):
+    'Players x weeks array of the scoring_array each player replays every season'
+    return np.array([p.scoring_array[:season_length] for p in players], dtype=np.float64)
+
+def calculate_team_scores(scores, assignments, league_size):
+    '''
+    Scatter-add player scores into seasons x teams x weeks, in player order so sums match League.
+    scores is either seasons x players x weeks or players x weeks (same scores every season).
+    '''
+    num_seasons, num_players = assignments.shape
+    team_scores = np.zeros((num_seasons, league_size, scores.shape[-1]))
+    for p in range(num_players):
+        seasons = np.flatnonzero(assignments[:, p] >= 0)
+        if scores.ndim == 2:
+            team_scores[seasons, assignments[seasons, p]] += scores[p]
+        else:
+            team_scores[seasons, assignments[seasons, p]] += scores[seasons, p]
+    return team_scores
+
+def get_team_openings(opening_teams, league_size):
+    'Teams x openings-per-team array of the lineup columns each team fills'
+    return np.argsort(opening_teams, kind='stable').reshape(league_size, -1)
+
+def get_changed_teams(assignments, players, league_size):
+    'Season and team indices (sorted, no repeats) of every team any of players was on'
+    rostered = assignments[:, players]
+    season_index, column = np.nonzero(rostered >= 0)
+    keys = np.unique(season_index*league_size + rostered[season_index, column])
+    return keys//league_size, keys % league_size
+
+def calculate_roster_scores(scores, lineups, team_openings):
+    '''
+    Totals (rows x weeks) of one team per lineup row, whose columns are the matching row of team_openings.
+    Players are added in player order, so each total matches calculate_team_scores.
+    '''
+    members = np.take_along_axis(lineups, team_openings, axis=1)
+    # unfilled openings point at an extra all-zero player and sort last
+    members = np.sort(np.where(members >= 0, members, len(scores)), axis=1)
+    scores = np.concatenate([scores, np.zeros((1, scores.shape[1]))])
+    totals = np.zeros((len(members), scores.shape[1]))
+    for spot in range(members.shape[1]):
+        totals += scores[members[:, spot]]
+    return totals
+
+def rank_last_axis(array):
+    'numpy_rank applied to every row of the last axis'
+    return np.ascontiguousarray(array).argsort(axis=-1).argsort(axis=-1)
+
+def calculate_weekly_ranks(team_scores):
+    'Seasons x weeks x teams all-play rank of each team score (any leading axes are kept)'
+    return rank_last_axis(team_scores.swapaxes(-1, -2))
+
+def calculate_final_ranks(weekly_ranks):
+    'Win pct and final rank (seasons x teams) from the weekly ranks'
+    num_weeks, league_size = weekly_ranks.shape[-2:]
+    win_pct = weekly_ranks.sum(axis=-2)/float((league_size-1)*num_weeks)
+    return win_pct, rank_last_axis(win_pct)
+
+def get_replacement_scores(players, roster_slots, season_length, replacements=None):
+    'Slots x weeks replacement scoring arrays: replacements[slot], or the slot\'s lowest points_per_gp player'
+    rows = []
+    for slot in roster_slots:
+        if replacements is not None and slot in replacements:
+            replacement = replacements[slot]
+        else:
+            slot_players = [p for p in players if p.slot == slot]
+            if not slot_players:
+                raise ValueError('No {} players to pick a replacement from'.format(slot))
+            replacement = min(slot_players, key=lambda p: p.points_per_gp)
+        rows.append(replacement)
+    return get_score_matrix(rows, season_length)
+
+def calculate_all_play_wins(team_scores):
+    'Seasons x teams all-play wins over every week, a tied week counting half'
+    scores = team_scores[:, :, np.newaxis, :]
+    others = team_scores[:, np.newaxis, :, :]
+    return ((scores > others).sum(axis=(2, 3)) + .5*(scores == others).sum(axis=(2, 3)) - .5*team_scores.shape[-1])
+
+def get_shared_outcomes(wins, team):
+    'Championship share (1/number tied for first, or 0) and final rank (1 = best, ties averaged) of one team, per season'
+    team_wins = wins[:, team, np.newaxis]
+    best = wins.max(axis=1)
+    champion = np.where(team_wins[:, 0] == best, 1./(wins == best[:, np.newaxis]).sum(axis=1), 0.)
+    rank = 1 + (wins > team_wins).sum(axis=1) + .5*((wins == team_wins).sum(axis=1) - 1)
+    return champion, rank
+
+def calculate_swap_deltas(team_scores, lineups, opening_teams, scores, replacement_scores):
+    '''
+    Per player: rostered seasons, the sum and sum of squares of the championship share they add over
+    their replacement (replacement_scores[player] are its weekly scores) and the sum of final ranks
+    they add, SWAP_BLOCK seasons at a time (see calculate_block_swap_deltas).
+    '''
+    totals = [np.zeros(len(scores)) for _ in range(4)]
+    for start in range(0, len(team_scores), SWAP_BLOCK):
+        block = calculate_block_swap_deltas(team_scores[start:start+SWAP_BLOCK], lineups[start:start+SWAP_BLOCK], opening_teams, scores, replacement_scores)
+        for total, part in zip(totals, block):
+            total += part
+    return tuple(totals)
+
+def calculate_block_swap_deltas(team_scores, lineups, opening_teams, scores, replacement_scores):
+    '''
+    calculate_swap_deltas for one block of seasons. One team at a time: an opening's team is the same
+    in every season, so every season is swapped at once and only that team's comparisons with the rest
+    change (a week the other team gains is a week the swapped team loses). A swapped total is old +
+    replacement - player, except in seasons where that comes within rounding of another team's week:
+    there the team is added up again in player order like calculate_roster_scores, so tied weeks come
+    out exactly as in a full re-simulation.
+    '''
+    num_players = len(scores)
+    league_size = team_scores.shape[1]
+    base_wins = calculate_all_play_wins(team_scores)
+    counts = np.zeros(num_players)
+    champion_sums = np.zeros(num_players)
+    champion_square_sums = np.zeros(num_players)
+    rank_sums = np.zeros(num_players)
+    # an extra all-zero player for unfilled openings, which sort last
+    scores = np.concatenate([scores, np.zeros((1, scores.shape[1]))])
+    team_openings = get_team_openings(opening_teams, league_size)
+    # far above the rounding error of adding up a team, far below any real difference in points
+    tolerance = 1e-9*max(np.abs(team_scores).max(), np.abs(replacement_scores).max(), 1.)
+    for team in range(league_size):
+        rest = np.arange(league_size) != team
+        old = team_scores[:, team]
+        others = team_scores[:, rest]
+        # other teams' wins against this team, as (week count + sum of signs)/2
+        others_before = np.sign(others - old[:, np.newaxis]).sum(axis=2)
+        champion, rank = get_shared_outcomes(base_wins, team)
+        members = lineups[:, team_openings[team]]
+        members = np.sort(np.where(members >= 0, members, num_players), axis=1)
+        for j in team_openings[team]:
+            players = lineups[:, j]
+            seasons = np.flatnonzero(players >= 0)
+            if len(seasons) < len(players):
+                players = players[seasons]
+            else:
+                seasons = slice(None)
+            differences = others[seasons] - (old[seasons] + (replacement_scores[players] - scores[players]))[:, np.newaxis]
+            signs = np.sign(differences)
+            # where that lands within rounding of another team's week, add the team up again as a re-simulation would
+            close = np.flatnonzero(np.less(np.abs(differences, out=differences), tolerance).any(axis=(1, 2)))
+            if len(close):
+                season_index = np.arange(len(lineups))[seasons][close]
+                close_members = members[season_index]
+                replaced = close_members == players[close, np.newaxis]
+                new = np.zeros((len(close), scores.shape[1]))
+                for spot in range(members.shape[1]):
+                    new += np.where(replaced[:, spot, np.newaxis], replacement_scores[players[close]], scores[close_members[:, spot]])
+                signs[close] = np.sign(others[season_index] - new[:, np.newaxis])
+            gained = .5*(signs.sum(axis=2) - others_before[seasons])
+            swapped = base_wins[seasons].copy()
+            swapped[:, rest] += gained
+            swapped[:, team] -= gained.sum(axis=1)
+            swapped_champion, swapped_rank = get_shared_outcomes(swapped, team)
+            champion_change = champion[seasons] - swapped_champion
+            counts += np.bincount(players, minlength=num_players)
+            champion_sums += np.bincount(players, champion_change, minlength=num_players)
+            champion_square_sums += np.bincount(players, champion_change**2, minlength=num_players)
+            rank_sums += np.bincount(players, swapped_rank - rank[seasons], minlength=num_players)
+    return counts, champion_sums, champion_square_sums, rank_sums
+
+def get_player_ranks(final_ranks, assignments):
+    'Seasons x players final rank of the team each player was on (-1 if unassigned)'
+    season_index = np.arange(len(assignments))[:, np.newaxis]
+    return np.where(assignments >= 0, final_ranks[..., season_index, assignments], -1)
+
+def summarize_player_ranks(player_ranks, league_size):
+    'Per-player season count, rank sum, reciprocal-rank sum and champion count'
+    valid = player_ranks >= 0
+    counts = valid.sum(axis=0)
+    rank_sums = np.where(valid, player_ranks, 0).sum(axis=0)
+    reciprocal = np.where(valid, 1.0/(league_size + 1 - player_ranks.astype(np.intp)), 0.0)
+    reciprocal_sums = np.cumsum(reciprocal, axis=0)[-1] if len(reciprocal) else np.zeros(player_ranks.shape[1])
+    champion_counts = (player_ranks == league_size - 1).sum(axis=0)
+    return counts, rank_sums, reciprocal_sums, champion_counts
+
+def update_rank_summary(summary, player_ranks, players, league_size):
+    'summarize_player_ranks output with the columns of players recomputed from player_ranks'
+    summary = [values.copy() for values in summary]
+    for values, changed in zip(summary, summarize_player_ranks(player_ranks[:, players], league_size)):
+        values[players] = changed
+    return tuple(summary)
+
+def get_slot_value_samples(player_ranks, slot_groups, league_size):
+    'Seasons x slots: share of each slot\'s players on the champion team, minus 1/league_size'
+    champions = player_ranks == league_size - 1
+    return np.stack([champions[:, group].mean(axis=1) for group in slot_groups], axis=1) - 1./league_size
+
+def get_player_values(summary, league_size):
+    'Average, harmonic and champion_pct per player from a rank summary'
+    counts, rank_sums, reciprocal_sums, champion_counts = summary
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average = league_size + 1 - rank_sums/counts.astype(np.float64)
+        harmonic = counts/reciprocal_sums
+        champion = champion_counts/counts.astype(np.float64)
+    return average, harmonic, champion
+
+def get_average_stats(scoring_output):
+    'Average points, certainty equivalent and consistency of one scoring output'
+    average_points = sum(scoring_output)/len(scoring_output)
+    average_utility = fs.get_certainty_equivalent(scoring_output)
+    return average_points, average_utility, average_utility/average_points
+
+def get_team_average_stats(team_scores):
+    'Vectorized get_average_stats over seasons x teams, with sequential sums like sum()'
+    num_weeks = team_scores.shape[-1]
+    average_points = np.cumsum(team_scores, axis=-1)[..., -1]/num_weeks
+    with np.errstate(invalid='ignore'):
+        average_utility = np.expm1(np.cumsum(np.log1p(team_scores), axis=-1)[..., -1]/num_weeks)
+    return average_points, average_utility
+
+def get_block_seed(seed, block_index):
+    'Child SeedSequence for one block; equal to SeedSequence(seed).spawn(n)[block_index]'
+    return np.random.SeedSequence(seed, spawn_key=(block_index,))
+
+def get_block_sizes(num_seasons, block_size):
+    'Split num_seasons into fixed-size blocks (the last one may be short)'
+    return [min(block_size, num_seasons - start) for start in range(0, num_seasons, block_size)]
+
+def get_trace_index(seed, num_seasons, trace_seasons):
+    'Sorted indices of the seasons to trace: all of them, or a seeded random sample'
+    if trace_seasons >= num_seasons:
+        return np.arange(num_seasons)
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    return np.sort(rng.choice(num_seasons, trace_seasons, replace=False))
+
+def draw_scores(rng, player_scores, num_seasons, sampling='plain'):
+    '''
+    Seasons x players x weeks scores, each week drawn at random from the player's scoring array.
+    With sampling='antithetic' odd seasons mirror the draws of the even season before them
+    (the k-th smallest score becomes the k-th largest).
+    '''
+    num_players, num_weeks = player_scores.shape
+    draws = rng.integers(0, num_weeks, size=(num_seasons, num_players, num_weeks))
+    if sampling == 'antithetic':
+        player_scores = np.sort(player_scores, axis=1)
+        num_pairs = num_seasons//2
+        draws[1:2*num_pairs:2] = num_weeks - 1 - draws[0:2*num_pairs:2]
+    return player_scores[np.arange(num_players)[:, np.newaxis], draws]
+
+def get_season_averages(scores):
+    'Season average points and certainty equivalent along the weeks axis'
+    with np.errstate(invalid='ignore'):
+        return scores.mean(axis=-1), np.expm1(np.log1p(scores).mean(axis=-1))
+
+def simulate_block(task):
+    'Simulate one BlockTask from its own Generator; module level so it can run in a process pool'
+    num_seasons = task.num_seasons
+    player_scores = task.player_scores
+    league_size = task.league_size
+    rng = np.random.default_rng(get_block_seed(task.seed, task.block_index))
+    lineups = draw_lineups(rng, task.position_groups, task.openings, league_size, num_seasons, task.sampling, player_scores.mean(axis=1))
+    assignments = get_assignments(lineups, get_opening_teams(task.openings, league_size), len(player_scores))
+    if task.score_draw == 'sample':
+        scores = draw_scores(rng, player_scores, num_seasons, task.sampling)
+        points, utility = get_season_averages(scores)
+    else:
+        scores = player_scores
+        points, utility = [np.broadcast_to(a, (num_seasons, len(a))) for a in get_season_averages(scores)]
+    team_scores = calculate_team_scores(scores, assignments, league_size)
+    weekly_ranks = calculate_weekly_ranks(team_scores)
+    win_pct, final_ranks = calculate_final_ranks(weekly_ranks)
+    player_ranks = get_player_ranks(final_ranks, assignments)
+    accumulator = PlayerAccumulator(len(player_scores), league_size, len(task.slot_groups))
+    accumulator.update(player_ranks, points, utility, task.slot_groups)
+    trace = None
+    if len(task.trace_index):
+        local = task.trace_index - task.season_offset
+        trace = SeasonTrace(task.trace_index, assignments[local].astype(np.int8), final_ranks[local].astype(np.int8),
+                            win_pct[local], player_ranks[local].astype(np.int8))
+    seasons = None
+    if task.keep_seasons:
+        seasons = {'assignments': assignments.astype(np.int8), 'team_scores': team_scores.astype(np.float32), 'weekly_ranks': weekly_ranks.astype(np.int8),
+                   'final_ranks': final_ranks.astype(np.int8), 'win_pct': win_pct.astype(np.float32)}
+    return SeasonBlock(task.block_index, num_seasons, accumulator, trace, seasons)
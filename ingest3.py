@@ -0,0 +1,244 @@
+"""
+Batched game-log ingestion.
+Turns game logs into a padded players x season_length score matrix in one
+pass and applies injury_handling to the whole matrix with a seeded Generator,
+instead of one Python list per player (analyze_game_logs ->
+generate_scoring_array -> create_players_from_pdb).
+read_game_log_history streams any number of yearly stats files in chunks
+with compact dtypes into one multi-season GameLogHistory, optionally
+weighting recent seasons more.
+pandas is only imported by the functions that parse csvs, so code that gets
+its score matrix from elsewhere (e.g. cache3) never loads it.
+"""
+
+from __future__ import print_function
+import numpy as np
+
+INJURY_HANDLING = ['zeros', 'recycle', 'impute', 'normal']
+POSITION_CODES = {10.0: 'qb', 20.0: 'rb', 30.0: 'wr', 40.0: 'te'}
+POSITION_NAMES = ['qb', 'rb', 'wr', 'te', 'other']
+# stats are whole numbers, which float32 holds exactly; week, season and gp come as 1.0, 2014.0, ...
+STATS_DTYPES = {'player': 'category', 'team': 'category', 'position': 'category', 'week': np.float32, 'season': np.float32, 'gp': np.float32}
+STAT_DTYPE = np.float32
+
+class GameLogMatrix:
+    """
+    Output of read_game_logs. Row i is one (player, position) pair, in the
+    same order as analyze_game_logs. scores holds the games played in the
+    leading gp[i] columns (in game log order) and NaN after them; the matrix is
+    season_length wide, or wider if someone played more games than that.
+    points is the historic total, as in Player.points.
+    """
+
+    def __init__(self, names, positions, scores, gp, season_length):
+        self.season_length = season_length
+        self.names = names
+        self.positions = positions
+        self.scores = scores
+        self.gp = gp
+        self.points = np.nansum(scores, axis=1)
+
+    def __str__(self):
+        return '{}: {} player(s) x {} week(s)'.format(self.__class__.__name__, len(self.names), self.scores.shape[1])
+
+    def get_season_scores(self, injury_handling='zeros', seed=None):
+        'Fill the missed games and shuffle every row, like generate_scoring_array does per player'
+        rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        scores, gp = self.scores, self.gp
+        if scores.shape[1] > self.season_length:
+            # anyone with more than season_length games keeps a random season_length of them (League only reads that many weeks)
+            keys = self.get_selection_keys(rng)
+            keys[np.isnan(scores)] = np.inf
+            scores = np.take_along_axis(scores, np.argsort(keys, axis=1), axis=1)[:, :self.season_length]
+            gp = np.minimum(gp, self.season_length)
+        scores = fill_missed_games(scores, gp, injury_handling, rng)
+        return rng.permuted(scores, axis=1)
+
+    def get_selection_keys(self, rng):
+        'Sort keys for picking season_length games: the smallest keys are kept'
+        return rng.random(self.scores.shape)
+
+class GameLogHistory(GameLogMatrix):
+    """
+    GameLogMatrix over several seasons, from read_game_log_history. seasons
+    holds the season of every game (0 in the padding) and weights its recency
+    weight, or is None when every game counts the same. A player with more
+    than season_length games keeps a weighted random season_length of them
+    (each game's chance grows with its weight), so a Player_DB built from
+    it replays a season drawn from the player's whole recent history.
+    """
+
+    def __init__(self, names, positions, scores, gp, season_length, seasons, weights=None):
+        GameLogMatrix.__init__(self, names, positions, scores, gp, season_length)
+        self.seasons = seasons
+        self.weights = weights
+
+    def __str__(self):
+        played = self.seasons[self.seasons > 0]
+        span = '{}-{}'.format(played.min(), played.max()) if len(played) else 'no seasons'
+        return '{}: {} player(s), {} game(s), {}'.format(self.__class__.__name__, len(self.names), int(self.gp.sum()), span)
+
+    def get_selection_keys(self, rng):
+        'Exponential keys over the weights, so the smallest season_length are a weighted sample without replacement'
+        if self.weights is None:
+            return GameLogMatrix.get_selection_keys(self, rng)
+        with np.errstate(divide='ignore'):
+            return rng.standard_exponential(self.scores.shape)/self.weights
+
+###############
+## Functions ##
+###############
+
+def read_stats_csv(path):
+    'Weekly stats csv with the numeric position codes mapped to qb/rb/wr/te/other'
+    import pandas as pd
+    gl = pd.read_csv(path)
+    gl['position'] = gl['position'].map(POSITION_CODES).fillna('other')
+    return gl
+
+def read_stats_chunks(paths, chunksize=50000, columns=None):
+    '''
+    Weekly stats csvs (one path or a list) as frames of at most chunksize rows with STATS_DTYPES:
+    categorical player, team and position (mapped to qb/rb/wr/te/other) and float32 stats.
+    columns limits the stat columns read (default: all of them).
+    '''
+    import pandas as pd
+    for path in [paths] if isinstance(paths, str) else paths:
+        usecols = None if columns is None else list(STATS_DTYPES) + list(columns)
+        dtypes = {column: STAT_DTYPE for column in columns or []}
+        dtypes.update(STATS_DTYPES)
+        reader = pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize)
+        for chunk in reader:
+            chunk = chunk.drop(columns=[c for c in chunk.columns if c.startswith('Unnamed')])
+            stats = [c for c in chunk.columns if c not in STATS_DTYPES]
+            chunk[stats] = chunk[stats].astype(STAT_DTYPE)
+            # one lookup per category; a missing position (code -1) lands on the trailing 'other'
+            lookup = [POSITION_NAMES.index(POSITION_CODES.get(float(code), 'other')) for code in chunk['position'].cat.categories] + [POSITION_NAMES.index('other')]
+            chunk['position'] = pd.Categorical.from_codes(np.array(lookup)[chunk['position'].cat.codes.to_numpy()], POSITION_NAMES)
+            yield chunk
+
+def read_game_log_history(paths, scoring_categories, scoring_values, season_length, recency_half_life=None, max_games=None, chunksize=50000):
+    '''
+    GameLogHistory from any number of weekly stats csvs, streamed chunksize rows at a time: only the
+    scoring categories are read, each chunk is scored right away and just its (player, season, points)
+    triples are kept. Rows are grouped by (player, position) like analyze_game_logs, with every game a
+    player played across all the files. recency_half_life (in seasons) weights a game by
+    0.5**((latest season - season)/recency_half_life); None weights every game the same. max_games keeps
+    only each player's most recent max_games games, which bounds memory however many seasons are read.
+    '''
+    keys = {}
+    groups, seasons, points = [], [], []
+    for chunk in read_stats_chunks(paths, chunksize, scoring_categories):
+        chunk_points = score_stats(get_stat_matrix(chunk, scoring_categories), [scoring_values])[:, 0]
+        groups.append(get_group_ids(chunk['player'], chunk['position'], keys))
+        seasons.append(chunk['season'].to_numpy().astype(np.int16))
+        points.append(chunk_points)
+        if max_games is not None:
+            groups, seasons, points = [np.concatenate(a) for a in (groups, seasons, points)]
+            recent = get_recent_games(groups, seasons, max_games)
+            groups, seasons, points = [groups[recent]], [seasons[recent]], [points[recent]]
+    groups, seasons, points = [np.concatenate(a) if a else np.zeros(0, dtype=t) for a, t in ((groups, np.intp), (seasons, np.int16), (points, np.float64))]
+    # rows in analyze_game_logs order (sorted by player, then position), games in the order they were read
+    names, positions = zip(*sorted(keys, key=lambda k: (k[0], POSITION_NAMES[k[1]]))) if keys else ((), ())
+    order = np.empty(len(keys), dtype=np.intp)
+    order[[keys[k] for k in zip(names, positions)]] = np.arange(len(keys))
+    rows = order[groups]
+    gp = np.bincount(rows, minlength=len(keys))
+    weeks = get_game_numbers(rows)
+    width = max(season_length, gp.max() if len(gp) else 0)
+    scores = np.full((len(keys), width), np.nan)
+    scores[rows, weeks] = points
+    game_seasons = np.zeros((len(keys), width), dtype=np.int16)
+    game_seasons[rows, weeks] = seasons
+    weights = None
+    if recency_half_life is not None and len(seasons):
+        weights = np.zeros((len(keys), width), dtype=np.float32)
+        weights[rows, weeks] = .5**((seasons.max() - seasons)/float(recency_half_life))
+    return GameLogHistory(list(names), [POSITION_NAMES[p] for p in positions], scores, gp, season_length, game_seasons, weights)
+
+def get_group_ids(players, positions, keys):
+    'Id of every row\'s (player, position) group, adding new groups to keys ((name, position code) -> id)'
+    pairs = players.cat.codes.to_numpy().astype(np.int64)*len(POSITION_NAMES) + positions.cat.codes.to_numpy()
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    names = players.cat.categories
+    ids = np.array([keys.setdefault((names[pair//len(POSITION_NAMES)], int(pair % len(POSITION_NAMES))), len(keys)) for pair in unique_pairs], dtype=np.intp)
+    return ids[inverse.reshape(-1)]
+
+def get_recent_games(groups, seasons, max_games):
+    'Sorted indices of each group\'s latest max_games games (later seasons first, then later rows)'
+    order = np.lexsort((-np.arange(len(groups)), -seasons.astype(np.int64), groups))
+    return np.sort(order[get_game_numbers(groups[order]) < max_games])
+
+def get_game_numbers(rows):
+    'Running count of each value in rows (groupby().cumcount() for an integer array)'
+    order = np.argsort(rows, kind='stable')
+    sorted_rows = rows[order]
+    starts = np.flatnonzero(np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]) if len(rows) else np.zeros(0, dtype=np.intp)
+    counts = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    numbers = np.empty(len(rows), dtype=np.intp)
+    numbers[order] = counts
+    return numbers
+
+def read_game_logs(game_logs, scoring_categories, scoring_values, season_length):
+    'analyze_game_logs without the per-group list building: points as one matrix product, then one scatter into the padded matrix'
+    points = score_stats(get_stat_matrix(game_logs, scoring_categories), [scoring_values])[:, 0]
+    names, positions, rows, weeks, gp = index_game_logs(game_logs)
+    scores = np.full((len(names), max(season_length, gp.max() if len(gp) else 0)), np.nan)
+    scores[rows, weeks] = points
+    return GameLogMatrix(names, positions, scores, gp, season_length)
+
+def get_stat_matrix(game_logs, scoring_categories):
+    'Player-weeks x scoring_categories float matrix'
+    return game_logs[scoring_categories].to_numpy(dtype=np.float64)
+
+def score_stats(stats, scoring_rules):
+    '''
+    Player-weeks x K points for K rows of scoring values. Accumulated one category at a time, so
+    every element is the same left-to-right sum whatever K is (a BLAS product is not).
+    '''
+    scoring_rules = np.asarray(scoring_rules, dtype=np.float64)
+    points = np.zeros((len(stats), len(scoring_rules)))
+    for c in range(stats.shape[1]):
+        points += stats[:, c, np.newaxis]*scoring_rules[:, c]
+    return points
+
+def index_game_logs(game_logs):
+    'Names and positions of every (player, position) group in analyze_game_logs order, plus each log row\'s group row, game number and the games played per group'
+    groups = game_logs.groupby(['player', 'position'], sort=True)
+    rows = groups.ngroup().to_numpy()
+    weeks = groups.cumcount().to_numpy()
+    keys = groups.size().index
+    gp = np.bincount(rows, minlength=len(keys))
+    return list(keys.get_level_values('player')), list(keys.get_level_values('position')), rows, weeks, gp
+
+def fill_missed_games(scores, gp, injury_handling, rng):
+    '''
+    Fill every NaN (missed game) at once:
+    zeros -> 0, recycle -> a random game the player did play, impute -> |N(avg, std + .01)|,
+    normal -> the whole row becomes |N(avg, std + .01)| for anyone who missed a game.
+    '''
+    if injury_handling not in INJURY_HANDLING:
+        raise ValueError('injury_handling must be one of {}, not {!r}'.format(INJURY_HANDLING, injury_handling))
+    scores = scores.copy()
+    missed = np.isnan(scores)
+    if not missed.any():
+        return scores
+    if injury_handling == 'zeros':
+        scores[missed] = 0.
+        return scores
+    if injury_handling == 'recycle':
+        # played games sit in the leading gp columns, so a random column below gp is a random played game
+        played = np.minimum(rng.random(scores.shape)*gp[:, None], gp[:, None] - 1).astype(np.intp)
+        recycled = np.take_along_axis(scores, played, axis=1)
+        scores[missed] = recycled[missed]
+        return scores
+    with np.errstate(invalid='ignore'):
+        score_avg = np.nanmean(scores, axis=1)
+        score_std = np.nanstd(scores, axis=1) + .01
+    draws = np.absolute(rng.normal(score_avg[:, None], score_std[:, None], scores.shape))
+    if injury_handling == 'impute':
+        scores[missed] = draws[missed]
+    else:
+        injured = missed.any(axis=1)
+        scores[injured] = draws[injured]
+    return scores
@@ -0,0 +1,203 @@
+"""
+Instrumentation for League construction and Player_DB ingestion.
+Pass an Instrumentation as instrumentation= (or set League.instrumentation /
+Player_DB.instrumentation for every instance) to get per-stage wall and CPU
+time, seasons per second, allocated-block counts, optional tracemalloc peaks
+and an optional sampling profile, exportable as JSON. The default is NULL,
+whose stages are a shared no-op context manager.
+"""
+
+from __future__ import print_function
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+class Instrumentation:
+    """
+    Registry of stage timers and counters.
+    stage(name, seasons) times a block of code; stages can nest and repeat
+    (times add up). seasons may be a callable, read when the stage ends. progress, if given, is called as progress(event) with a
+    dict (stage, seasons_done, seasons_total, elapsed_s) at the end of every
+    stage and whenever an engine reports progress inside one (StreamingLeague
+    after each block). allocations=True adds the tracemalloc peak of each
+    stage (slow for object-heavy stages); sample_interval starts a
+    SamplingProfiler while the outermost stage runs.
+    """
+
+    def __init__(self, progress=None, allocations=False, sample_interval=None):
+        self.progress_callback = progress
+        self.allocations = allocations
+        self.profiler = SamplingProfiler(sample_interval) if sample_interval else None
+        self.stages = collections.OrderedDict()
+        self.counters = collections.OrderedDict()
+        self.active = []
+        self.start_time = None
+        self.started_tracing = False
+
+    def __str__(self):
+        return '{}: {} stage(s), {} counter(s)'.format(self.__class__.__name__, len(self.stages), len(self.counters))
+
+    @contextlib.contextmanager
+    def stage(self, name, seasons=0):
+        if not self.active:
+            self.start_session()
+        frame = {'name': name, 'alloc_peak': 0}
+        self.active.append(frame)
+        if self.allocations:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield self
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            record = self.stages.setdefault(name, {'calls': 0, 'wall_s': 0., 'cpu_s': 0., 'seasons': 0, 'allocated_blocks': 0})
+            record['calls'] += 1
+            record['wall_s'] += wall
+            record['cpu_s'] += cpu
+            seasons = seasons() if callable(seasons) else seasons
+            record['seasons'] += seasons
+            record['allocated_blocks'] += sys.getallocatedblocks() - blocks
+            self.active.pop()
+            if self.allocations:
+                # nested stages reset the peak, so take the largest of ours and theirs
+                peak = max(tracemalloc.get_traced_memory()[1], frame['alloc_peak']) - before
+                record['alloc_peak_mb'] = max(record.get('alloc_peak_mb', 0.), peak/2.**20)
+                if self.active:
+                    self.active[-1]['alloc_peak'] = max(self.active[-1]['alloc_peak'], peak + before)
+            self.progress(name, seasons, seasons)
+            if not self.active:
+                self.stop_session()
+
+    def start_session(self):
+        self.start_time = time.perf_counter()
+        if self.allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        if self.profiler is not None:
+            self.profiler.start()
+
+    def stop_session(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def progress(self, stage, seasons_done, seasons_total):
+        if self.progress_callback is not None:
+            self.progress_callback({'stage': stage, 'seasons_done': seasons_done, 'seasons_total': seasons_total,
+                                    'elapsed_s': time.perf_counter() - (self.start_time or time.perf_counter())})
+
+    def get_report(self, top=25):
+        'Stages (with seasons_per_s where seasons were given), counters and the top sampled stacks'
+        stages = collections.OrderedDict()
+        for name, record in self.stages.items():
+            record = dict(record)
+            if record['seasons'] and record['wall_s'] > 0:
+                record['seasons_per_s'] = record['seasons']/record['wall_s']
+            stages[name] = record
+        report = {'stages': stages, 'counters': dict(self.counters)}
+        if self.profiler is not None:
+            report['profile'] = {'interval_s': self.profiler.interval, 'samples': self.profiler.num_samples,
+                                 'top_stacks': self.profiler.get_collapsed().most_common(top)}
+        return report
+
+    def to_json(self, path=None, top=25):
+        'Report as a JSON string, also written to path if given'
+        text = json.dumps(self.get_report(top), indent=1)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(text)
+        return text
+
+    def print_report(self):
+        for name, record in self.get_report()['stages'].items():
+            throughput = ' {:12.0f} seasons/s'.format(record['seasons_per_s']) if 'seasons_per_s' in record else ''
+            print('{:>26s} {:10.4f} s wall {:10.4f} s cpu {:10d} blocks{}'.format(name, record['wall_s'], record['cpu_s'], record['allocated_blocks'], throughput))
+        for name, value in self.counters.items():
+            print('{:>26s} {}'.format(name, value))
+
+class NullInstrumentation:
+    """
+    Instrumentation that records nothing: stage returns one shared no-op
+    context manager and count/progress return immediately.
+    """
+    context = contextlib.nullcontext()
+
+    def __str__(self):
+        return self.__class__.__name__
+
+    def stage(self, name, seasons=0):
+        return self.context
+
+    def count(self, name, n=1):
+        pass
+
+    def progress(self, stage, seasons_done, seasons_total):
+        pass
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that started it every interval seconds
+    from a background thread. get_collapsed() returns a Counter of
+    'file:function;file:function;...' stacks (outermost first), and
+    write_collapsed() writes them in the folded format flamegraph.pl and
+    speedscope read.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.num_samples = 0
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def __str__(self):
+        return '{}: {} sample(s) every {} s'.format(self.__class__.__name__, self.num_samples, self.interval)
+
+    def start(self):
+        self.target = threading.get_ident()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, name='SamplingProfiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+            self.num_samples += 1
+
+    def get_collapsed(self):
+        return collections.Counter(self.samples)
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write('{} {}\n'.format(stack, count))
+
+NULL = NullInstrumentation()
@@ -5,8 +5,12 @@ League, Player_DB, Player, Team, Roster, Season
 
 from __future__ import print_function
 import numpy as np
-import pandas as pd
 import random
+import instrument3 as instrument
+
+ROSTER_POSITIONS = ['qb', 'rb', 'wr', 'te']
+ROSTER_OPENINGS = {'qb':1, 'rb':2, 'wr':3, 'te':1}
+ASSIGNMENT_MODES = ['position', 'slot']
 
 class League:
     """
@@ -15,10 +19,12 @@ class League:
     Teams: LEAGUE_SIZE
     Rosters: LEAGUE_LENGTH x LEAGUE SIZE (1 per Team*Season)
     Players: LEAGUE_SIZE x ROSTER_SIZE (1 per Team*Roster, repeated every season)
+    assignment and roster_openings pick how rosters are filled; see RosterAssignment.
     """
     id = 1
+    instrumentation = instrument.NULL
     
-    def __init__(self, players, teams, seasons, roster_slots, season_length):
+    def __init__(self, players, teams, seasons, roster_slots, season_length, instrumentation=None, roster_openings=None, assignment='position'):
         self.league_id = 'L' + str(League.id).zfill(2)
         League.id += 1
         self.players = players
@@ -27,17 +33,33 @@ class League:
         self.roster_slots = roster_slots
         self.season_length = season_length
         self.league_size = len(teams)
-
-        self.set_rosters()
-        self.generate_player_scores()
-        self.calculate_team_scores()
-        self.calculate_weekly_stats()
-        self.calculate_season_stats()
-        self.calculate_player_value()
+        self.roster_openings = roster_openings
+        self.assignment = assignment
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
+
+        stage = self.instrumentation.stage
+        num_seasons = self.get_num_seasons
+        with stage(self.__class__.__name__, num_seasons):
+            with stage('set_rosters', num_seasons):
+                self.set_rosters()
+            with stage('generate_player_scores', num_seasons):
+                self.generate_player_scores()
+            with stage('calculate_team_scores', num_seasons):
+                self.calculate_team_scores()
+            with stage('calculate_weekly_stats', num_seasons):
+                self.calculate_weekly_stats()
+            with stage('calculate_season_stats', num_seasons):
+                self.calculate_season_stats()
+            with stage('calculate_player_value', num_seasons):
+                self.calculate_player_value()
 
     def __str__(self):
         return '{} {}: {} players, {} teams, {} seasons'.format(self.__class__.__name__, self.league_id, len(self.players), len(self.teams), len(self.seasons))
 
+    def get_num_seasons(self):
+        return len(self.seasons)
+
     def get_player_by_id(self, player_id):
         return [p for p in self.players if p.player_id == player_id][0]
 
@@ -55,45 +77,30 @@ class League:
         slot_players = [p for p in self.players if p.slot == slot]
         return slot_players
 
-    # def set_rosters(self):
-    #     'Set rosters according to slot (i.e., only the 11-20th best wrs go in a wr2 slot)'
-    #     seasons = self.seasons
-    #     teams = self.teams
-    #     players = self.players
-    #     roster_slots = self.roster_slots
-    #     for s in seasons:
-    #         rosters = {t.team_id: [] for t in teams}
-    #         num_teams = len(teams)
-    #         for slot in roster_slots:
-    #             slot_players = get_slot_players(players, slot)
-    #             assignments = zip(teams, slot_players)
-    #             [rosters[t.team_id].append(p.player_id) for t, p in assignments]
-    #             [p.update_team_assignment(s.season_id, t.team_id) for t, p in assignments]
-    #         s.rosters = rosters
-    #         [t.update_player_assignments(s.season_id, rosters[t.team_id]) for t in teams]
-
     def set_rosters(self):
-        'Set rosters without regard to slots (i.e., wr1 can go in a wr2 slot)'
-        seasons = self.seasons
+        '''
+        Draw every season's rosters at once as a RosterAssignment lineup array, from a Generator
+        seeded off the random module (so random.seed still fixes them), then fill the per-season dicts
+        '''
         teams = self.teams
         players = self.players
-        roster_positions = ['qb', 'rb', 'wr', 'te']
-        roster_openings = {'qb':1, 'rb':2, 'wr':3, 'te':1}
-        #roster_openings = {'qb':2, 'rb':4, 'wr':5, 'te':2}
-        for pos in roster_positions:
+        for pos in ROSTER_POSITIONS:
             position_players = get_position_players(players, pos)
             calculate_position_measurements(position_players)
-        for s in seasons:
-            rosters = {t.team_id: [] for t in teams}
-            for pos in roster_positions:
-                position_players = get_position_players(players, pos)
-                team_ids = np.repeat([t.team_id for t in teams], roster_openings[pos])
-                assignments = zip(team_ids, position_players)
-                [rosters[tid].append(p.player_id) for tid, p in assignments]
-                [p.update_team_assignment(s.season_id, tid) for tid, p in assignments]
+        roster_assignment = RosterAssignment(players, self.roster_slots, self.league_size, self.assignment, self.roster_openings)
+        lineups = roster_assignment.draw(get_roster_rng(), len(self.seasons))
+        team_ids = [t.team_id for t in teams]
+        opening_team_ids = [team_ids[i] for i in roster_assignment.opening_teams]
+        for s, lineup in zip(self.seasons, lineups.tolist()):
+            rosters = {tid: [] for tid in team_ids}
+            for tid, i in zip(opening_team_ids, lineup):
+                if i >= 0:
+                    p = players[i]
+                    rosters[tid].append(p.player_id)
+                    p.update_team_assignment(s.season_id, tid)
             s.rosters = rosters
-            [t.update_player_assignments(s.season_id, rosters[t.team_id]) for t in teams]
-
+            for t in teams:
+                t.update_player_assignments(s.season_id, rosters[t.team_id])
 
     def generate_player_scores(self):
         seasons = self.seasons
@@ -101,8 +108,8 @@ class League:
         for s in seasons:
             season_length = s.season_length
             for p in players:
-                #p.update_scoring_output(s.season_id, [random.choice(p.scoring_array) for i in xrange(season_length)])
-                p.update_scoring_output(s.season_id, [p.scoring_array[i] for i in xrange(season_length)])
+                #p.update_scoring_output(s.season_id, [random.choice(p.scoring_array) for i in range(season_length)])
+                p.update_scoring_output(s.season_id, [p.scoring_array[i] for i in range(season_length)])
 
     def calculate_team_scores(self):
         seasons = self.seasons
@@ -111,7 +118,7 @@ class League:
         for s in seasons:
             season_length = s.season_length
             for t in teams:
-                weekly_output = [sum(p.scoring_output[s.season_id][i] for p in players if p.team_assignments[s.season_id] == t.team_id) for i in xrange(season_length)]
+                weekly_output = [sum((p.scoring_output[s.season_id][i] for p in players if p.team_assignments.get(s.season_id) == t.team_id), 0.) for i in range(season_length)]
                 t.update_scoring_output(s.season_id, weekly_output)
 
     def calculate_weekly_stats(self):
@@ -120,9 +127,9 @@ class League:
         for s in seasons:
             season_length = s.season_length
             league_size = len(teams)
-            matchup_rankings_by_week = [numpy_rank([t.scoring_output[s.season_id][i] for t in teams]) for i in xrange(season_length)]
-            matchup_rankings_by_team = map(list, zip(*matchup_rankings_by_week))
-            [s.update_team_rankings_weekly(teams[i].team_id, matchup_rankings_by_team[i]) for i in xrange(league_size)]
+            matchup_rankings_by_week = [numpy_rank([t.scoring_output[s.season_id][i] for t in teams]) for i in range(season_length)]
+            matchup_rankings_by_team = [list(r) for r in zip(*matchup_rankings_by_week)]
+            [s.update_team_rankings_weekly(teams[i].team_id, matchup_rankings_by_team[i]) for i in range(league_size)]
 
     def calculate_season_stats(self):
         seasons = self.seasons
@@ -135,11 +142,17 @@ class League:
             team_ids = [t.team_id for t in teams]
             final_team_ranks = numpy_rank([s.team_win_pct[t.team_id] for t in teams])
             [s.update_final_team_ranks(team_id, rank) for team_id, rank in zip(team_ids, final_team_ranks)]
-            [p.update_team_rankings(s.season_id, s.final_team_ranks[p.team_assignments[s.season_id]]) for p in players]
+            [p.update_team_rankings(s.season_id, s.final_team_ranks[p.team_assignments[s.season_id]]) for p in players if s.season_id in p.team_assignments]
 
     def calculate_player_value(self):
-        players = self.players
+        players = [p for p in self.players if p.team_rankings]
         league_size = len(self.teams)
+        # players no season had an opening for have no value (nan, as in ArrayLeague)
+        for p in self.players:
+            if not p.team_rankings:
+                p.update_average_team_ranking(float('nan'))
+                p.update_harmonic_team_ranking(float('nan'))
+                p.update_champion_pct(float('nan'))
         [p.update_average_team_ranking(league_size+1-sum(p.team_rankings.values())/float(len(p.team_rankings))) for p in players]
         [p.update_harmonic_team_ranking(len(p.team_rankings)/sum([1.0/(league_size+1-r) for r in p.team_rankings.values()])) for p in players]
         [p.update_champion_pct(sum([1 for tr in p.team_rankings.values() if tr == (league_size-1)])/float(len(p.team_rankings))) for p in players]
@@ -151,33 +164,72 @@ class Player_DB:
     sorting, filtering, and returning Players based on different attributes.
     """
     id = 1
+    instrumentation = instrument.NULL
 
-    def __init__(self, game_logs_or_projections, input_type, scoring_categories, scoring_values, season_length, injury_handling):
+    def __init__(self, game_logs_or_projections, input_type, scoring_categories, scoring_values, season_length, injury_handling, columnar=False, seed=None, instrumentation=None):
         self.db_id = 'DB' + str(Player_DB.id)
         Player_DB.id += 1
-        if input_type == 'game_logs':
-            pdb = analyze_game_logs(game_logs_or_projections, scoring_categories, scoring_values)
-        elif input_type == 'season':
-            pdb = convert_projections_to_pdb(game_logs_or_projections, scoring_categories, scoring_values)
-        else:
-            print('Please select your input_type ("game_logs" or "season").')
-        self.players = create_players_from_pdb(pdb, season_length, injury_handling)
+        if instrumentation is not None:
+            self.instrumentation = instrumentation
         self.has_tiers = False
+        stage = self.instrumentation.stage
+        with stage('Player_DB'):
+            if input_type in ('table', 'history') or (columnar and input_type == 'game_logs'):
+                if input_type == 'table':
+                    self.table = game_logs_or_projections
+                elif input_type == 'history':
+                    from table3 import PlayerTable
+                    with stage('player_table'):
+                        self.table = PlayerTable.from_matrix(game_logs_or_projections, injury_handling, seed)
+                else:
+                    from table3 import PlayerTable
+                    with stage('player_table'):
+                        self.table = PlayerTable.from_game_logs(game_logs_or_projections, scoring_categories, scoring_values, season_length, injury_handling, seed)
+                self.players = self.table.get_views()
+                self.instrumentation.count('players', len(self.players))
+                return
+            if input_type == 'game_logs':
+                with stage('analyze_game_logs'):
+                    pdb = analyze_game_logs(game_logs_or_projections, scoring_categories, scoring_values)
+            elif input_type == 'season':
+                with stage('convert_projections_to_pdb'):
+                    pdb = convert_projections_to_pdb(game_logs_or_projections, scoring_categories, scoring_values)
+            else:
+                print('Please select your input_type ("game_logs", "season", "table" or "history").')
+            if columnar:
+                from table3 import PlayerTable
+                with stage('player_table'):
+                    self.table = PlayerTable.from_pdb(pdb, season_length, injury_handling)
+                self.players = self.table.get_views()
+            else:
+                self.table = None
+                with stage('create_players'):
+                    self.players = create_players_from_pdb(pdb, season_length, injury_handling)
+            self.instrumentation.count('players', len(self.players))
 
     def __str__(self):
         return '{}: {} player(s)'.format(self.__class__.__name__, len(self.players))
 
     def set_tiers(self, positions, league_size, minimum_games_played):
+        with self.instrumentation.stage('set_tiers'):
+            self.set_position_tiers(positions, league_size, minimum_games_played)
+        self.has_tiers = True
+
+    def set_position_tiers(self, positions, league_size, minimum_games_played):
+        if self.table is not None:
+            self.table.set_tiers(positions, league_size, minimum_games_played)
+            return
         pdb = self.players
         pdb_qualified = [p for p in pdb if p.gp >= minimum_games_played]
         for pos in positions:
             position_players = [p for p in pdb_qualified if p.position == pos]
             position_players_ranked = sort_array_descending(position_players, 'points_per_gp')
             set_position_tiers(position_players_ranked, pos, league_size)
-        self.has_tiers = True
 
     def get_player_pool(self, roster_slots):
         if self.has_tiers:
+            if self.table is not None:
+                return self.table.get_views(self.table.get_pool_rows(roster_slots))
             pdb = self.players
             player_pool = [p for p in pdb if p.slot in roster_slots]
             return player_pool
@@ -217,6 +269,7 @@ class Player:
         self.average_team_ranking = []
         self.harmonic_team_ranking = []
         self.champion_pct = []
+        self.h2h_champion_pct = []
 
     def __str__(self):
         return '{} {}: {:20s} ({}) -- Avg: {:5.2f} | Hrm: {:5.2f} | Champ: {:5.2f} | P: {:5.2f} | U: {:5.2f} | C: {:5.2f}'.format(self.__class__.__name__, self.player_id, self.name, self.slot, self.average_team_ranking[0], self.harmonic_team_ranking[0], self.champion_pct[0], self.points_per_gp_excess, self.utility_excess, self.consistency)
@@ -259,6 +312,9 @@ class Player:
     def update_champion_pct(self, champion_pct):
         self.champion_pct.append(champion_pct)
 
+    def update_h2h_champion_pct(self, champion_pct):
+        self.h2h_champion_pct.append(champion_pct)
+
 class Team:
     """
     Contains team nickname.
@@ -305,6 +361,10 @@ class Season:
         self.team_rankings = {}
         self.final_team_ranks = {}
         self.team_win_pct = {}
+        self.h2h_wins = {}
+        self.points_for = {}
+        self.playoff_seeds = []
+        self.champion = None
 
     def __str__(self):
         return '{} {}: {} / {}'.format(self.__class__.__name__, self.season_id, self.team_win_pct, self.final_team_ranks)
@@ -312,7 +372,7 @@ class Season:
     def generate_player_scores(self, players):
         season_length = self.season_length
         season_id = self.season_id
-        [p.update_scoring_output(season_id, [random.choice(p.scoring_array) for i in xrange(season_length)]) for p in players]
+        [p.update_scoring_output(season_id, [random.choice(p.scoring_array) for i in range(season_length)]) for p in players]
 
     def update_team_rankings_weekly(self, team_id, matchup_rankings_by_team):
         self.team_rankings.update({team_id: matchup_rankings_by_team})
@@ -323,6 +383,50 @@ class Season:
     def update_final_team_ranks(self, team_id, rank):
         self.final_team_ranks.update({team_id: rank})
 
+class RosterAssignment:
+    """
+    Which players can fill which roster openings, drawn for every season at once.
+    assignment='position' ignores tiers (a wr1 can go in a wr2 opening): each
+    position fills roster_openings[position] openings per team (default
+    ROSTER_OPENINGS, e.g. {'qb':2, 'rb':4, 'wr':5, 'te':2} for deep rosters).
+    assignment='slot' only puts a slot's players in that slot's openings (only
+    the 13-24th best wrs go in wr2): every slot in roster_slots fills
+    roster_openings.get(slot, 1) openings per team.
+    A lineup array is seasons x openings player indices, group-major then
+    team-major (T01, T01, T02, ...), with -1 for an opening nobody is left for.
+    """
+
+    def __init__(self, players, roster_slots, league_size, assignment='position', roster_openings=None):
+        if assignment == 'position':
+            roster_openings = ROSTER_OPENINGS if roster_openings is None else roster_openings
+            self.keys = [pos for pos in ROSTER_POSITIONS if pos in roster_openings] + [pos for pos in roster_openings if pos not in ROSTER_POSITIONS]
+            self.groups = [np.array([i for i, p in enumerate(players) if p.position == pos], dtype=np.intp) for pos in self.keys]
+        elif assignment == 'slot':
+            roster_openings = {} if roster_openings is None else roster_openings
+            unknown = sorted(set(roster_openings) - set(roster_slots))
+            if unknown:
+                raise ValueError('roster_openings has slots that are not in roster_slots: {}'.format(unknown))
+            self.keys = list(roster_slots)
+            self.groups = [np.array([i for i, p in enumerate(players) if p.slot == slot], dtype=np.intp) for slot in self.keys]
+        else:
+            raise ValueError('Unknown assignment {!r}, expected one of {}'.format(assignment, ASSIGNMENT_MODES))
+        self.openings = [int(roster_openings.get(key, 1)) for key in self.keys]
+        if any(n < 0 for n in self.openings):
+            raise ValueError('roster_openings must not be negative: {}'.format(dict(zip(self.keys, self.openings))))
+        self.assignment = assignment
+        self.league_size = league_size
+        self.num_players = len(players)
+        self.opening_teams = np.concatenate([np.repeat(np.arange(league_size), n) for n in self.openings])
+        self.dtype = get_lineup_dtype(len(players))
+
+    def __str__(self):
+        return '{} ({}): {} per team, {} openings, {} players'.format(self.__class__.__name__, self.assignment,
+            ', '.join('{} {}'.format(n, key) for key, n in zip(self.keys, self.openings)), len(self.opening_teams), self.num_players)
+
+    def draw(self, rng, num_seasons, dtype=None):
+        'Seasons x openings lineup array, one vectorized permutation of every group per season'
+        return permute_lineups(rng, self.groups, self.openings, self.league_size, num_seasons, self.dtype if dtype is None else dtype)
+
 ###############
 ## Functions ##
 ###############
@@ -330,7 +434,7 @@ class Season:
 def analyze_game_logs(game_logs, scoring_categories, scoring_values):
     game_logs['points'] = game_logs[scoring_categories].dot(scoring_values)
     gl = game_logs[['player', 'position', 'points']]
-    pdb = gl.groupby(['player', 'position'], as_index=False)['points'].apply(list).reset_index(name='scoring_array')
+    pdb = gl.groupby(['player', 'position'])['points'].apply(list).reset_index(name='scoring_array')
     return pdb
 
 def convert_projections_to_pdb(projections, scoring_categories, scoring_values):
@@ -340,20 +444,20 @@ def convert_projections_to_pdb(projections, scoring_categories, scoring_values):
     return pj
 
 def create_players_from_pdb(pdb, season_length, injury_handling):
-    players = [Player(pdb['player'][p], pdb['position'][p], pdb['scoring_array'][p], season_length, injury_handling) for p in xrange(len(pdb))]
+    players = [Player(pdb['player'][p], pdb['position'][p], pdb['scoring_array'][p], season_length, injury_handling) for p in range(len(pdb))]
     return players
 
 def create_teams(league_size, nicknames):
-    teams = [Team(nicknames[t]) for t in xrange(league_size)]
+    teams = [Team(nicknames[t]) for t in range(league_size)]
     return teams
 
 def create_seasons(num_seasons, season_length):
-    seasons = [Season(season_length) for i in xrange(num_seasons)]
+    seasons = [Season(season_length) for i in range(num_seasons)]
     return seasons
 
 def set_position_tiers(players, position, league_size):
     num_players = len(players)
-    tier_assignments = [t/league_size + 1 for t in range(num_players)]
+    tier_assignments = [t//league_size + 1 for t in range(num_players)]
     slot_assignments = [convert_position_to_slot(position, t) for t in tier_assignments]
     [players[i].set_slot(slot_assignments[i]) for i in range(num_players)]
     [players[i].set_position_rank(i+1) for i in range(num_players)]
@@ -365,13 +469,13 @@ def generate_scoring_array(scoring_array, season_length, injury_handling='zeros'
     score_std = np.std(scoring_array)+.01
     if games_missed:
         if injury_handling == 'zeros':
-            [scoring_array.append(0) for i in xrange(games_missed)]
+            [scoring_array.append(0) for i in range(games_missed)]
         elif injury_handling == 'recycle':
-            [scoring_array.append(random.choice(scoring_array)) for i in xrange(games_missed)]
+            [scoring_array.append(random.choice(scoring_array)) for i in range(games_missed)]
         elif injury_handling == 'impute':
-            [scoring_array.append(np.absolute(np.random.normal(score_avg, score_std))) for i in xrange(games_missed)]
+            [scoring_array.append(np.absolute(np.random.normal(score_avg, score_std))) for i in range(games_missed)]
         elif injury_handling == 'normal':
-            scoring_array = [np.absolute(np.random.normal(score_avg, score_std)) for i in xrange(season_length)]
+            scoring_array = [np.absolute(np.random.normal(score_avg, score_std)) for i in range(season_length)]
         else:
             print('Options for handling injuries include "zeros", "recycle", or "impute".')
     random.shuffle(scoring_array)
@@ -405,6 +509,10 @@ def numpy_rank(array):
     return np.array(array).argsort().argsort()
 
 def calculate_position_measurements(position_players):
+    if position_players and getattr(position_players[0], 'table', None) is not None:
+        # PlayerViews from a PlayerTable: measure the whole group as column operations
+        position_players[0].table.calculate_position_measurements([p.row for p in position_players])
+        return
     min_points_per_gp = min([p.points_per_gp for p in position_players])
     avg_points_per_gp = np.average([p.points_per_gp for p in position_players])
     std_points_per_gp = np.std([p.points_per_gp for p in position_players])
@@ -439,3 +547,26 @@ def convert_slot_to_position(slot):
 def convert_position_to_slot(position, tier):
     slot = position + str(tier)
     return slot
+
+def get_lineup_dtype(num_players):
+    'Smallest signed integer type holding every player index, -1 and num_players (the padding index)'
+    return np.min_scalar_type(-num_players - 1)
+
+def get_roster_rng():
+    'A numpy Generator seeded from the random module, so random.seed still fixes the rosters'
+    return np.random.default_rng(random.getrandbits(64))
+
+def permute_lineups(rng, groups, openings, league_size, num_seasons, dtype=np.intp):
+    '''
+    Seasons x openings array of player indices (-1 for an unfilled opening): each group is tiled once
+    per season and every row permuted at once, so the first league_size*n of a row fill its openings.
+    '''
+    lineups = np.full((num_seasons, league_size*sum(openings)), -1, dtype=dtype)
+    start = 0
+    for group, n in zip(groups, openings):
+        filled = min(len(group), league_size*n)
+        if filled:
+            order = rng.permuted(np.tile(group.astype(dtype, copy=False), (num_seasons, 1)), axis=1)
+            lineups[:, start:start+filled] = order[:, :filled]
+        start += league_size*n
+    return lineups
@@ -0,0 +1,105 @@
+"""
+Monte Carlo controls for the season engine: run seasons until the estimates
+of champion_pct, average_team_ranking and slot_value are precise enough.
+"""
+
+from __future__ import print_function
+from statistics import NormalDist
+import numpy as np
+import engine3 as eng
+
+class AdaptiveLeague(eng.StreamingLeague):
+    """
+    StreamingLeague that simulates batch_size seasons at a time and stops once
+    every player's champion_pct and every slot_value is within +/- half_width,
+    and every average_team_ranking within +/- rank_half_width, at the given
+    confidence, or when max_seasons have been used. Seasons before
+    min_seasons are never enough (a champion_pct of 0 has no spread yet).
+    Blocks are seeded exactly like StreamingLeague, so a run that stops at N
+    seasons matches StreamingLeague(N) with the same seed and block_size, and
+    a run found in the result_cache is picked up where it stopped.
+    """
+
+    def __init__(self, players, teams, roster_slots, season_length, half_width=0.01, rank_half_width=0.05, confidence=0.95,
+                 max_seasons=100000, min_seasons=1000, batch_size=1000, seed=None, block_size=1000, score_draw='replay', sampling='plain', instrumentation=None,
+                 result_cache=None, season_store=None, roster_openings=None, assignment='position'):
+        self.half_width = half_width
+        self.rank_half_width = rank_half_width
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf(0.5 + confidence/2.)
+        self.max_seasons = max_seasons
+        self.min_seasons = min_seasons
+        self.batch_size = max(batch_size, block_size)
+        self.converged = False
+        eng.StreamingLeague.__init__(self, players, teams, max_seasons, roster_slots, season_length, seed, block_size, score_draw, sampling=sampling, instrumentation=instrumentation,
+                                     result_cache=result_cache, season_store=season_store, roster_openings=roster_openings, assignment=assignment)
+
+    def __str__(self):
+        status = 'converged' if self.converged else 'hit max_seasons'
+        return '{} ({} at {:.0%})'.format(eng.StreamingLeague.__str__(self), status, self.confidence)
+
+    def generate_seasons(self):
+        'Yield blocks a batch at a time, after any seasons read from the result cache, until the error bars are narrow enough'
+        block_index = self.cached_blocks
+        season_offset = self.accumulator.num_seasons
+        while True:
+            if season_offset and season_offset >= self.min_seasons and self.is_converged():
+                self.converged = True
+                break
+            if season_offset >= self.max_seasons:
+                break
+            batch_end = min(season_offset + self.batch_size, self.max_seasons)
+            while season_offset < batch_end:
+                num_seasons = min(self.block_size, batch_end - season_offset)
+                yield eng.simulate_block(self.get_block_task(block_index, season_offset, num_seasons))
+                block_index += 1
+                season_offset += num_seasons
+        self.num_seasons = season_offset
+
+    def get_error_bars(self):
+        'Confidence half-widths: (champion_pct, average_team_ranking) per player and slot_value per slot'
+        champion_se, rank_se, slot_se = self.accumulator.get_standard_errors()
+        return self.z*champion_se, self.z*rank_se, self.z*slot_se
+
+    def is_converged(self):
+        'Every half-width narrow enough, leaving out players no season has rostered (they have no estimate, only a nan error bar)'
+        champion_hw, rank_hw, slot_hw = self.get_error_bars()
+        rostered = self.accumulator.counts > 0
+        return bool(np.all(champion_hw[rostered] <= self.half_width) and np.all(rank_hw[rostered] <= self.rank_half_width) and np.all(slot_hw <= self.half_width))
+
+    def get_report(self):
+        'Seasons used plus each estimate and its half-width, keyed by player_id and slot'
+        average, harmonic, champion = self.accumulator.get_player_values()
+        champion_hw, rank_hw, slot_hw = self.get_error_bars()
+        players = {p.player_id: {'champion_pct': champion[i], 'champion_pct_half_width': champion_hw[i],
+                                 'average_team_ranking': average[i], 'average_team_ranking_half_width': rank_hw[i]}
+                   for i, p in enumerate(self.players)}
+        slots = {slot: {'slot_value': self.accumulator.slots.mean[i], 'slot_value_half_width': slot_hw[i]}
+                 for i, slot in enumerate(self.roster_slots)}
+        return {'num_seasons': self.num_seasons, 'converged': self.converged, 'confidence': self.confidence, 'players': players, 'slots': slots}
+
+###############
+## Functions ##
+###############
+
+def compare_slot_values(player_pools, teams, roster_slots, season_length, num_seasons, seed=None, common_random_numbers=True, sampling='plain', block_size=1000):
+    '''
+    slot_value of several player pools (e.g. two injury_handling or scoring settings) and each
+    pool's difference from the first one, with the standard error of that difference.
+    With common_random_numbers every pool is simulated from the same seed, so pools with the same
+    position group sizes see the same roster permutations and the paired differences lose most of
+    the roster noise; otherwise each pool gets an independent seed.
+    '''
+    root = np.random.SeedSequence(seed)
+    seeds = [root.entropy]*len(player_pools) if common_random_numbers else [s.generate_state(4) for s in root.spawn(len(player_pools))]
+    samples = []
+    for players, pool_seed in zip(player_pools, seeds):
+        league = eng.StreamingLeague(players, teams, num_seasons, roster_slots, season_length, pool_seed, block_size, trace_seasons=num_seasons, sampling=sampling)
+        samples.append(eng.get_slot_value_samples(league.trace.player_ranks, league.slot_groups, league.league_size))
+    comparisons = []
+    for sample in samples:
+        difference = sample - samples[0]
+        comparisons.append({'slot_value': dict(zip(roster_slots, sample.mean(axis=0))),
+                            'difference': dict(zip(roster_slots, difference.mean(axis=0))),
+                            'difference_se': dict(zip(roster_slots, difference.std(axis=0, ddof=1)/np.sqrt(num_seasons)))})
+    return comparisons
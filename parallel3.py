@@ -0,0 +1,68 @@
+"""
+Process-pool League simulation.
+Seasons are split into fixed-size blocks, each simulated from its own
+SeedSequence child, so a seed gives the same results for any number of workers.
+"""
+
+from __future__ import print_function
+import os
+from concurrent.futures import ProcessPoolExecutor
+import engine3 as eng
+
+class ParallelLeague(eng.StreamingLeague):
+    """
+    StreamingLeague that simulates blocks of seasons in a process pool.
+    Randomness comes only from seed (never the global random/np.random state),
+    and block results are merged in block order, so champion_pct and
+    average_team_ranking depend on seed and block_size but not on workers.
+    With populate=True every season is traced and the roster assignments and
+    final ranks are written into Player/Team/Season; weekly scores are not.
+    """
+
+    def __init__(self, players, teams, seasons, roster_slots, season_length, seed=None, workers=None, block_size=1000, populate=True, score_draw='replay', sampling='plain', instrumentation=None, result_cache=None,
+                 season_store=None, roster_openings=None, assignment='position'):
+        self.populate = populate
+        trace_seasons = (seasons if isinstance(seasons, int) else len(seasons)) if populate else 0
+        eng.StreamingLeague.__init__(self, players, teams, seasons, roster_slots, season_length, seed, block_size, score_draw, trace_seasons, workers or os.cpu_count(), sampling, instrumentation, result_cache, season_store,
+                                     roster_openings, assignment)
+
+    def __str__(self):
+        return '{} ({} worker(s), seed {})'.format(eng.StreamingLeague.__str__(self), self.workers, self.seed)
+
+    def generate_seasons(self):
+        'Yield SeasonBlocks in block order, simulated in a process pool when workers > 1'
+        tasks = self.get_block_tasks()
+        if self.workers == 1 or len(tasks) == 1:
+            for task in tasks:
+                yield eng.simulate_block(task)
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for block in executor.map(eng.simulate_block, tasks):
+                    yield block
+
+    def calculate_player_value(self):
+        eng.StreamingLeague.calculate_player_value(self)
+        if self.populate:
+            self.populate_objects()
+
+    def populate_objects(self):
+        'Write the per-season assignments and ranks from the trace'
+        players = self.players
+        teams = self.teams
+        team_ids = [t.team_id for t in teams]
+        trace = self.trace
+        for s_index, s in enumerate(self.seasons):
+            season_id = s.season_id
+            rosters = {tid: [] for tid in team_ids}
+            for p_index, p in enumerate(players):
+                t_index = trace.assignments[s_index, p_index]
+                if t_index < 0:
+                    continue
+                rosters[team_ids[t_index]].append(p.player_id)
+                p.team_assignments[season_id] = team_ids[t_index]
+                p.team_rankings[season_id] = trace.final_ranks[s_index, t_index]
+            s.rosters = rosters
+            for t_index, t in enumerate(teams):
+                t.player_assignments[season_id] = rosters[t.team_id]
+                s.team_win_pct[t.team_id] = trace.win_pct[s_index, t_index]
+                s.final_team_ranks[t.team_id] = trace.final_ranks[s_index, t_index]
@@ -0,0 +1,175 @@
+"""
+Head-to-head schedules and playoffs.
+League ranks every team against every other team each week (all-play).
+H2HLeague also plays a round-robin schedule over the regular season, seeds
+the standings by wins with points-for as the tiebreaker, and runs a playoff
+bracket over the last weeks, for every season at once. Players get both the
+all-play champion_pct and h2h_champion_pct.
+"""
+
+from __future__ import print_function
+import numpy as np
+import engine3 as eng
+
+class H2HLeague(eng.ArrayLeague):
+    """
+    ArrayLeague with a head-to-head season on top of the all-play one.
+    schedule is regular-season weeks x teams of opponent indices (-1 for a
+    bye); by default get_round_robin over every week but the playoff weeks.
+    The top playoff_teams in the standings make a seeded bracket (byes go to
+    the top seeds when playoff_teams is not a power of two) that plays one
+    round per remaining week; playoff_teams=1 crowns the regular season
+    leader. Ties in a game go half a win each in the regular season and to
+    the better seed in the playoffs.
+    """
+
+    def __init__(self, players, teams, seasons, roster_slots, season_length, playoff_teams=4, schedule=None, populate=True, instrumentation=None,
+                 roster_openings=None, assignment='position'):
+        if not 1 <= playoff_teams <= len(teams):
+            raise ValueError('playoff_teams must be between 1 and the league size ({}), not {}'.format(len(teams), playoff_teams))
+        self.playoff_teams = playoff_teams
+        self.playoff_weeks = get_playoff_rounds(playoff_teams)
+        self.regular_season_weeks = season_length - self.playoff_weeks
+        if self.regular_season_weeks < 1:
+            raise ValueError('{} playoff teams need {} playoff weeks, which leaves no regular season in {} weeks'.format(playoff_teams, self.playoff_weeks, season_length))
+        if schedule is None:
+            schedule = get_round_robin(len(teams), self.regular_season_weeks)
+        self.schedule = np.asarray(schedule, dtype=np.intp)
+        if self.schedule.shape != (self.regular_season_weeks, len(teams)):
+            raise ValueError('schedule must be {} weeks x {} teams, not {}'.format(self.regular_season_weeks, len(teams), self.schedule.shape))
+        eng.ArrayLeague.__init__(self, players, teams, seasons, roster_slots, season_length, populate, instrumentation, roster_openings, assignment)
+
+    def calculate_season_stats(self):
+        eng.ArrayLeague.calculate_season_stats(self)
+        self.calculate_h2h_stats()
+
+    def calculate_h2h_stats(self, season_indices=None):
+        '''
+        Regular-season wins and points-for, standings (seasons x teams, league_size - 1 = first), playoff seeds
+        and champions, for every season or again for just season_indices.
+        '''
+        team_scores = self.team_scores if season_indices is None else self.team_scores[season_indices]
+        h2h_wins, points_for = calculate_h2h_results(team_scores[..., :self.regular_season_weeks], self.schedule)
+        standings = calculate_standings(h2h_wins, points_for)
+        playoff_seeds = get_playoff_seeds(standings, self.playoff_teams)
+        champions = run_playoffs(team_scores[..., self.regular_season_weeks:], playoff_seeds)
+        if season_indices is None:
+            self.h2h_wins, self.points_for, self.standings, self.playoff_seeds, self.champions = h2h_wins, points_for, standings, playoff_seeds, champions
+        else:
+            self.h2h_wins[season_indices], self.points_for[season_indices], self.standings[season_indices] = h2h_wins, points_for, standings
+            self.playoff_seeds[season_indices], self.champions[season_indices] = playoff_seeds, champions
+
+    def calculate_player_value(self):
+        self.h2h_value_index = [len(p.h2h_champion_pct) for p in self.players]
+        for p, champion in zip(self.players, get_h2h_champion_pct(self.assignments, self.champions)):
+            p.update_h2h_champion_pct(float(champion))
+        eng.ArrayLeague.calculate_player_value(self)
+
+    def update_season_stats(self, affected):
+        'ArrayLeague.update_season_stats, then the head-to-head seasons of the affected seasons and every h2h_champion_pct'
+        seasons = eng.ArrayLeague.update_season_stats(self, affected)
+        self.calculate_h2h_stats(affected)
+        for p, k, champion in zip(self.players, self.h2h_value_index, get_h2h_champion_pct(self.assignments, self.champions)):
+            p.h2h_champion_pct[k] = float(champion)
+        return seasons
+
+    def populate_objects(self, season_indices=None):
+        if season_indices is None:
+            season_indices = range(len(self.seasons))
+        eng.ArrayLeague.populate_objects(self, season_indices)
+        self.populate_h2h(season_indices)
+
+    def populate_h2h(self, season_indices):
+        'Season.h2h_wins, points_for, playoff_seeds and champion, keyed by team_id'
+        team_ids = [t.team_id for t in self.teams]
+        for s_index in season_indices:
+            s = self.seasons[s_index]
+            s.h2h_wins = dict(zip(team_ids, self.h2h_wins[s_index].tolist()))
+            s.points_for = dict(zip(team_ids, self.points_for[s_index].tolist()))
+            s.playoff_seeds = [team_ids[t] for t in self.playoff_seeds[s_index]]
+            s.champion = team_ids[self.champions[s_index]]
+
+    def get_champion_summary(self):
+        'How the H2H champion finished in the all-play ranks and the standings, and how often they agree'
+        import pandas as pd
+        season_index = np.arange(len(self.champions))
+        return pd.Series({'h2h_champion_is_all_play_champion': (self.final_ranks[season_index, self.champions] == self.league_size - 1).mean(),
+                          'h2h_champion_is_first_seed': (self.playoff_seeds[:, 0] == self.champions).mean(),
+                          'h2h_champion_average_all_play_rank': (self.league_size - self.final_ranks[season_index, self.champions]).mean(),
+                          'h2h_champion_average_seed': 1 + (self.playoff_seeds == self.champions[:, np.newaxis]).argmax(axis=1).mean()})
+
+###############
+## Functions ##
+###############
+
+def get_round_robin(league_size, num_weeks):
+    '''
+    Weeks x teams opponent index (-1 for a bye) from the circle method: every team plays every other
+    team once per league_size - 1 weeks (league_size with a bye week for an odd league), repeated.
+    '''
+    size = league_size + league_size % 2
+    circle = list(range(size))
+    rounds = []
+    for r in range(size - 1):
+        opponents = np.empty(size, dtype=np.intp)
+        for i in range(size//2):
+            a, b = circle[i], circle[size - 1 - i]
+            opponents[a], opponents[b] = b, a
+        rounds.append(opponents)
+        circle = [circle[0], circle[-1]] + circle[1:-1]
+    schedule = np.array([rounds[w % len(rounds)] for w in range(num_weeks)], dtype=np.intp).reshape(num_weeks, size)
+    schedule = np.where(schedule < league_size, schedule, -1)
+    return schedule[:, :league_size]
+
+def get_playoff_rounds(playoff_teams):
+    return int(np.ceil(np.log2(playoff_teams))) if playoff_teams > 1 else 0
+
+def get_bracket(playoff_teams):
+    'Seeds (0 = top) in bracket order, -1 for a bye: 8 teams play 1-8, 4-5, 2-7, 3-6'
+    bracket = [0]
+    while len(bracket) < 2**get_playoff_rounds(playoff_teams):
+        size = 2*len(bracket)
+        bracket = [seed for top in bracket for seed in (top, size - 1 - top)]
+    return np.array([seed if seed < playoff_teams else -1 for seed in bracket], dtype=np.intp)
+
+def calculate_h2h_results(team_scores, schedule):
+    'Wins (a tie is half a win, a bye nothing) and points-for, seasons x teams, from seasons x teams x weeks scores'
+    num_weeks = team_scores.shape[-1]
+    opponents = schedule.T
+    played = opponents >= 0
+    opponent_scores = team_scores[:, np.where(played, opponents, 0), np.arange(num_weeks)]
+    results = (team_scores > opponent_scores) + .5*(team_scores == opponent_scores)
+    return (results*played).sum(axis=-1), team_scores.sum(axis=-1)
+
+def calculate_standings(wins, points_for):
+    'Seasons x teams standing, league_size - 1 for first: wins, then points-for, then team index'
+    order = np.lexsort((points_for, wins), axis=-1)
+    standings = np.empty_like(order)
+    np.put_along_axis(standings, order, np.arange(order.shape[-1]), axis=-1)
+    return standings
+
+def get_playoff_seeds(standings, playoff_teams):
+    'Seasons x playoff_teams team indices, top seed first'
+    return np.argsort(-standings, axis=-1)[:, :playoff_teams]
+
+def run_playoffs(playoff_scores, seeds):
+    '''
+    Champion team index per season. playoff_scores is seasons x teams x rounds (one week per round)
+    and seeds seasons x playoff teams; every round of every season's bracket is played at once.
+    '''
+    num_seasons, playoff_teams = seeds.shape
+    season_index = np.arange(num_seasons)[:, np.newaxis]
+    alive = np.tile(get_bracket(playoff_teams), (num_seasons, 1))
+    for r in range(get_playoff_rounds(playoff_teams)):
+        a, b = alive[:, 0::2], alive[:, 1::2]
+        score_a = playoff_scores[season_index, seeds[season_index, np.maximum(a, 0)], r]
+        score_b = playoff_scores[season_index, seeds[season_index, np.maximum(b, 0)], r]
+        b_wins = (b >= 0) & ((a < 0) | (score_b > score_a) | ((score_b == score_a) & (b < a)))
+        alive = np.where(b_wins, b, a)
+    return seeds[season_index[:, 0], alive[:, 0]]
+
+def get_h2h_champion_pct(assignments, champions):
+    'Share of each player\'s seasons (seasons x players assignments) spent on the H2H champion'
+    rostered = assignments >= 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (assignments == champions[:, np.newaxis]).sum(axis=0)/rostered.sum(axis=0).astype(np.float64)
@@ -0,0 +1,384 @@
+"""
+Long-running valuation service.
+Builds the Player_DB once, draws num_seasons of weekly scores for every
+player and league_size - 1 opponent rosters per season from the player pool,
+then answers roster, trade and slot_value queries over a newline-delimited
+JSON socket protocol. Roster queries that arrive together are evaluated as
+one batch.
+
+    python service3.py --port 8765
+    echo '{"type": "roster", "players": ["Aaron Rodgers", "Le'"'"'Veon Bell", ...]}' | nc localhost 8765
+"""
+
+from __future__ import print_function
+import argparse
+import asyncio
+import collections
+import json
+import os
+import time
+import numpy as np
+import engine3 as eng
+import models3 as fs
+
+LEAGUE_SIZE = 12
+MINIMUM_GAMES_PLAYED = 10
+INJURY_HANDLING = 'zeros'
+SEASON_LENGTH = 16
+
+ROSTER_POSITIONS = ['qb', 'rb', 'wr', 'te']
+ROSTER_SLOTS = ['qb1', 'rb1', 'rb2', 'wr1', 'wr2', 'wr3', 'te1']
+
+SCORING_CATEGORIES = ['pass_yards', 'pass_tds', 'pass_ints', 'rush_yards', 'rush_tds', 'recs', 'rec_yards', 'rec_tds']
+SCORING_VALUES = [0.04, 4.0, -2.0, 0.1, 6.0, 0.0, 0.1, 6.0]
+
+STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '2014_nfl_weekly_stats.csv')
+
+class RosterValuator:
+    """
+    Hot state for roster queries. players is every player a roster may use
+    (e.g. Player_DB.players) and pool the tiered player pool opponents are
+    drawn from, as in League. Each of num_seasons seasons has its own weekly
+    scores for every player (score_draw='sample' draws each week from the
+    scoring_array, 'replay' replays it) and its own league_size - 1 opponents.
+    A roster is scored as the last team of that league, against opponents
+    that never use its own players: all-play weekly ranks, win pct, and
+    champion_pct (a tie for first is shared).
+    """
+
+    def __init__(self, players, pool, roster_slots, league_size, season_length, num_seasons=1000, seed=None, score_draw='sample'):
+        self.players = players
+        self.roster_slots = roster_slots
+        self.league_size = league_size
+        self.season_length = season_length
+        self.num_seasons = num_seasons
+        rng = np.random.default_rng(seed)
+        self.rows = {}
+        for i, p in enumerate(players):
+            self.rows.setdefault(p.name, i)
+            self.rows[p.player_id] = i
+        player_scores = eng.get_score_matrix(players, season_length)
+        if score_draw == 'sample':
+            scores = eng.draw_scores(rng, player_scores, num_seasons)
+        else:
+            scores = np.broadcast_to(player_scores, (num_seasons,) + player_scores.shape)
+        self.set_opponents(rng, pool, scores)
+        # players x weeks x seasons, so a roster is a few contiguous slabs and weeks reduce slab by slab
+        self.scores = np.ascontiguousarray(scores.transpose(1, 2, 0))
+        self.slot_values = {}
+
+    def __str__(self):
+        return '{}: {} players, {} opponents x {} seasons'.format(self.__class__.__name__, len(self.players), self.league_size - 1, self.num_seasons)
+
+    def set_opponents(self, rng, pool, scores):
+        '''
+        Draw a full league from the pool every season and keep all but the last team as opponents. The
+        last team's players are the spares get_opponents swaps in for any opponent a roster asks for.
+        '''
+        self.pool_rows = np.array([self.rows[p.player_id] for p in pool], dtype=np.intp)
+        self.pool_columns = np.full(len(self.players), -1, dtype=np.intp)
+        self.pool_columns[self.pool_rows] = np.arange(len(pool))
+        position_groups = eng.get_position_groups(pool, eng.ROSTER_POSITIONS)
+        self.pool_groups = np.full(len(pool), -1, dtype=np.intp)
+        for g, group in enumerate(position_groups):
+            self.pool_groups[group] = g
+        self.openings = [eng.ROSTER_OPENINGS[pos] for pos in eng.ROSTER_POSITIONS]
+        self.opening_teams = eng.get_opening_teams(self.openings, self.league_size)
+        self.opening_groups = np.repeat(np.arange(len(self.openings)), [self.league_size*n for n in self.openings])
+        self.team_openings = eng.get_team_openings(self.opening_teams, self.league_size)
+        self.lineups = eng.draw_lineups(rng, position_groups, self.openings, self.league_size, self.num_seasons)
+        # seasons x pool opening of every player (-1 when not drawn), so a roster finds its players without a search
+        self.opening_index = np.full((self.num_seasons, len(pool)), -1, dtype=np.intp)
+        season_index, opening_index = np.nonzero(self.lineups >= 0)
+        self.opening_index[season_index, self.lineups[season_index, opening_index]] = opening_index
+        assignments = eng.get_assignments(self.lineups, self.opening_teams, len(pool))
+        pool_scores = scores[:, self.pool_rows]
+        team_scores = eng.calculate_team_scores(pool_scores, assignments, self.league_size)[:, :-1]
+        # pool columns and seasons x spares x weeks scores of the last team, with a trailing slot of zeros for an empty opening
+        self.spares = self.lineups[:, self.team_openings[-1]]
+        self.spare_scores = np.zeros((self.num_seasons, self.spares.shape[1] + 1, self.season_length))
+        season_index, spare_index = np.nonzero(self.spares >= 0)
+        self.spare_scores[season_index, spare_index] = pool_scores[season_index, self.spares[season_index, spare_index]]
+        # opponents x weeks x seasons, so comparing against one team's scores runs over contiguous memory
+        self.opponent_scores = np.ascontiguousarray(team_scores.transpose(1, 2, 0))
+        # wins among the opponents only; each roster adds its own games on top
+        self.opponent_wins = calculate_all_play_wins(self.opponent_scores)
+
+    def get_rows(self, roster):
+        '''
+        Player rows for a list of len(roster_slots) names or player_ids: KeyError for anyone unknown,
+        ValueError for a roster of the wrong size or with a player on it twice.
+        '''
+        if not isinstance(roster, list) or not all(isinstance(name, str) for name in roster):
+            raise ValueError('A roster must be a list of player names or ids, not {!r}'.format(roster))
+        if len(roster) != len(self.roster_slots):
+            raise ValueError('A roster needs {} players ({}), not {}'.format(len(self.roster_slots), ', '.join(self.roster_slots), len(roster)))
+        try:
+            rows = [self.rows[name] for name in roster]
+        except KeyError as e:
+            raise KeyError('Unknown player {}'.format(e))
+        duplicates = sorted(set(name for name, row in zip(roster, rows) if rows.count(row) > 1))
+        if duplicates:
+            raise ValueError('Players on the roster more than once: {}'.format(duplicates))
+        return rows
+
+    def get_replacements(self, columns):
+        '''
+        Where the pool columns of one roster sit and who replaces them, both seasons x columns: the team
+        (-1 when not drawn, league_size - 1 for the spares' team) and the spare (index into spares) swapped
+        in for it on an opponent. In every position group the k-th of them on an opponent (in opening order)
+        takes the k-th spare of that group the roster does not use, or -1 (an empty opening) when there is none.
+        '''
+        positions = self.opening_index[:, columns]
+        drawn = positions >= 0
+        teams = np.where(drawn, self.opening_teams[positions], -1)
+        on_opponent = drawn & (teams < self.league_size - 1)
+        replacements = np.full(positions.shape, -1, dtype=np.intp)
+        for g in np.unique(self.pool_groups[columns]):
+            members = np.flatnonzero(self.pool_groups[columns] == g)
+            spare_index = np.flatnonzero(self.opening_groups[self.team_openings[-1]] == g)
+            spares = self.spares[:, spare_index]
+            available = (spares >= 0) & ~(spares[:, :, np.newaxis] == columns).any(axis=2)
+            spare_rank = np.cumsum(available, axis=1) - 1
+            ahead = on_opponent[:, np.newaxis, members] & (positions[:, np.newaxis, members] < positions[:, members, np.newaxis])
+            match = available[:, np.newaxis] & (spare_rank[:, np.newaxis] == ahead.sum(axis=2)[:, :, np.newaxis])
+            replacements[:, members] = np.where(match.any(axis=2), spare_index[match.argmax(axis=2)], -1)
+        return teams, np.where(on_opponent, replacements, -1), on_opponent
+
+    def get_opponents(self, rows, out=None, scratch=None):
+        '''
+        Opponent scores (opponents x weeks x seasons) and wins among themselves (seasons x opponents)
+        without the roster's own players: every one of them on an opponent is swapped for a spare of the
+        same position (see get_replacements), by adding the spare's weekly scores minus theirs to that
+        team's total, so the opponents are still a uniform draw from the rest of the pool. out and
+        scratch are buffers to reuse (see get_scratch).
+        '''
+        opponent_scores = np.empty_like(self.opponent_scores) if out is None else out
+        np.copyto(opponent_scores, self.opponent_scores)
+        rows = np.asarray(rows)[self.pool_columns[rows] >= 0]
+        if not len(rows):
+            return opponent_scores, self.opponent_wins.copy()
+        teams, replacements, on_opponent = self.get_replacements(self.pool_columns[rows])
+        for j, row in enumerate(rows):
+            seasons = np.flatnonzero(on_opponent[:, j])
+            opponent_scores[teams[seasons, j], :, seasons] += self.spare_scores[seasons, replacements[seasons, j]] - self.scores[row][:, seasons].T
+        return opponent_scores, calculate_all_play_wins(opponent_scores, scratch)
+
+    def evaluate(self, rosters):
+        '''
+        champion_pct, win_pct and average_team_ranking (1 = best) for a list of rosters (lists of
+        player rows). A tied week is half a win for both teams. Each roster's opponents are built and
+        played in the same buffers, which stay in cache; the standings of the batch are then ranked at once.
+        '''
+        num_weeks, num_opponents = self.season_length, self.league_size - 1
+        opponent_scores = np.empty_like(self.opponent_scores)
+        scratch = get_scratch(opponent_scores.shape)
+        roster_scores = np.empty(opponent_scores.shape[1:])
+        # rosters x seasons x opponents: wins among the opponents, and against the roster
+        opponent_wins = np.empty((len(rosters), self.num_seasons, num_opponents))
+        roster_losses = np.empty(opponent_wins.shape)
+        for r, rows in enumerate(rosters):
+            opponent_wins[r] = self.get_opponents(rows, opponent_scores, scratch)[1]
+            np.add.reduce(self.scores[rows], axis=0, out=roster_scores)
+            roster_losses[r] = calculate_games_won(opponent_scores, roster_scores, scratch)
+        wins = num_weeks*num_opponents - roster_losses.sum(axis=2)
+        opponent_wins += roster_losses
+        best = opponent_wins.max(axis=2)
+        tied = (opponent_wins == best[..., np.newaxis]).sum(axis=2)
+        champion = np.where(wins > best, 1., np.where(wins == best, 1./(tied + 1), 0.))
+        above = (opponent_wins > wins[..., np.newaxis]).sum(axis=2) + .5*(opponent_wins == wins[..., np.newaxis]).sum(axis=2)
+        return [{'champion_pct': float(c), 'win_pct': float(w/(num_weeks*num_opponents)), 'average_team_ranking': float(1 + a)}
+                for c, w, a in zip(champion.mean(axis=1), wins.mean(axis=1), above.mean(axis=1))]
+
+class ValuationService:
+    """
+    asyncio front end for a RosterValuator. Every connection sends one JSON
+    request per line and gets one JSON response per line:
+    {"type": "roster", "players": [...]}, {"type": "trade", "roster": [...],
+    "give": [...], "get": [...]}, {"type": "slot_value"} and {"type": "stats"}.
+    Rosters from concurrent requests are queued and evaluated max_batch at a
+    time (after waiting up to max_delay seconds for more to arrive).
+    """
+
+    def __init__(self, valuator, max_batch=64, max_delay=0.001, latency_window=10000):
+        self.valuator = valuator
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = None
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.batch_sizes = collections.deque(maxlen=latency_window)
+        self.requests = 0
+
+    def __str__(self):
+        return '{}: {} request(s), batches of up to {}'.format(self.__class__.__name__, self.requests, self.max_batch)
+
+    async def start(self, host='127.0.0.1', port=8765):
+        'Start the batcher and the server; returns the asyncio Server'
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.ensure_future(self.run_batches())
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    response = await self.answer(json.loads(line))
+                except Exception as e:
+                    response = {'error': str(e.args[0]) if e.args else str(e)}
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - start)
+                writer.write((json.dumps(response) + '\n').encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, request):
+        if not isinstance(request, dict):
+            raise ValueError('A request must be a JSON object, not {}'.format(type(request).__name__))
+        kind = request.get('type')
+        if kind == 'roster':
+            result, = await self.evaluate([request['players']])
+            return result
+        if kind == 'trade':
+            roster = list(request['roster'])
+            give, get = list(request.get('give', [])), list(request.get('get', []))
+            missing = [name for name in give if name not in roster]
+            if missing:
+                raise ValueError('Cannot give away players not on the roster: {}'.format(missing))
+            before, after = await self.evaluate([roster, [name for name in roster if name not in give] + get])
+            return {'before': before, 'after': after, 'champion_pct_change': after['champion_pct'] - before['champion_pct']}
+        if kind == 'slot_value':
+            return {'slot_value': self.valuator.slot_values}
+        if kind == 'stats':
+            return self.get_stats()
+        raise ValueError('Unknown request type {!r}'.format(kind))
+
+    async def evaluate(self, rosters):
+        'Queue rosters (validated here, so a bad name fails only its own request) and wait for their batch'
+        loop = asyncio.get_running_loop()
+        futures = []
+        for roster in rosters:
+            future = loop.create_future()
+            self.queue.put_nowait((self.valuator.get_rows(roster), future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            if self.max_delay:
+                await asyncio.sleep(self.max_delay)
+            while len(items) < self.max_batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            self.batch_sizes.append(len(items))
+            try:
+                results = await loop.run_in_executor(None, self.valuator.evaluate, [rows for rows, future in items])
+            except Exception as e:
+                for rows, future in items:
+                    future.set_exception(e)
+                continue
+            for (rows, future), result in zip(items, results):
+                future.set_result(result)
+
+    def get_stats(self):
+        'Request count, p50/p99 latency (ms, over the last latency_window requests) and mean batch size'
+        latencies = np.array(self.latencies)*1000.
+        stats = {'requests': self.requests, 'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.}
+        if len(latencies):
+            stats.update({'p50_ms': float(np.percentile(latencies, 50)), 'p99_ms': float(np.percentile(latencies, 99)), 'max_ms': float(latencies.max())})
+        return stats
+
+###############
+## Functions ##
+###############
+
+async def query(request, host='127.0.0.1', port=8765):
+    'Send one request on a new connection and return the decoded response'
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps(request) + '\n').encode('utf-8'))
+    await writer.drain()
+    response = json.loads(await reader.readline())
+    writer.close()
+    await writer.wait_closed()
+    return response
+
+def get_scratch(shape):
+    'uint8 counts, uint8 pair counts and bool buffers of team scores shape for calculate_all_play_wins and calculate_games_won'
+    return np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=bool)
+
+def calculate_all_play_wins(team_scores, scratch=None):
+    '''
+    Seasons x teams all-play wins from teams x weeks x seasons scores, a tied week half a win for
+    both teams. Every pair of teams is compared once; scratch are buffers to reuse (see get_scratch).
+    '''
+    num_teams = len(team_scores)
+    counts, pairs, compared = scratch or get_scratch(team_scores.shape)
+    # two per win and one per tie, in one byte per team and week
+    counts[:] = 0
+    for t in range(num_teams - 1):
+        later, pair = team_scores[t+1:], pairs[t+1:]
+        np.copyto(pair, np.greater(later, team_scores[t], out=compared[t+1:]).view(np.uint8))
+        pair += np.greater_equal(later, team_scores[t], out=compared[t+1:]).view(np.uint8)
+        counts[t+1:] += pair
+        # team t has the other two of every pair's points
+        counts[t] += 2*len(pair) - np.add.reduce(pair, axis=0, dtype=np.uint8)
+    return .5*np.add.reduce(counts, axis=1, dtype=np.float64).T
+
+def calculate_games_won(team_scores, roster_scores, scratch=None):
+    '''
+    Seasons x teams games won against a roster's weeks x seasons scores, counting ties like
+    calculate_all_play_wins
+    '''
+    counts, pairs, compared = scratch or get_scratch(team_scores.shape)
+    np.copyto(counts, np.greater(team_scores, roster_scores, out=compared).view(np.uint8))
+    counts += np.greater_equal(team_scores, roster_scores, out=compared).view(np.uint8)
+    return .5*np.add.reduce(counts, axis=1, dtype=np.float64).T
+
+def get_slot_values(pool, roster_slots, league_size, season_length, num_seasons, seed=None):
+    'slot_value per roster slot from a StreamingLeague over the pool'
+    teams = fs.create_teams(league_size, ['T{}'.format(i) for i in range(league_size)])
+    league = eng.StreamingLeague(pool, teams, num_seasons, roster_slots, season_length, seed=seed)
+    return {slot: float(value) for slot, value in league.get_slot_values().items()}
+
+def build_valuator(stats_path=STATS_PATH, scoring_categories=SCORING_CATEGORIES, scoring_values=SCORING_VALUES, roster_positions=ROSTER_POSITIONS,
+                   roster_slots=ROSTER_SLOTS, league_size=LEAGUE_SIZE, season_length=SEASON_LENGTH, injury_handling=INJURY_HANDLING,
+                   minimum_games_played=MINIMUM_GAMES_PLAYED, num_seasons=1000, seed=None):
+    'Player_DB (columnar) from a weekly stats csv, its pool, a RosterValuator and its slot values'
+    import cache3
+    game_logs = cache3.load_stats(stats_path)
+    player_db = fs.Player_DB(game_logs, 'game_logs', scoring_categories, scoring_values, season_length, injury_handling, columnar=True, seed=seed)
+    player_db.set_tiers(roster_positions, league_size, minimum_games_played)
+    pool = player_db.get_player_pool(roster_slots)
+    valuator = RosterValuator(player_db.players, pool, roster_slots, league_size, season_length, num_seasons, seed)
+    valuator.slot_values = get_slot_values(pool, roster_slots, league_size, season_length, num_seasons, seed)
+    return valuator
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--stats', default=STATS_PATH)
+    parser.add_argument('--seasons', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=2014)
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    valuator = build_valuator(args.stats, num_seasons=args.seasons, seed=args.seed)
+    print('{} ready in {:.2f} s'.format(valuator, time.perf_counter() - start))
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(ValuationService(valuator, args.max_batch).start(args.host, args.port))
+    print('Listening on {}:{}'.format(args.host, args.port))
+    try:
+        loop.run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
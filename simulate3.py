@@ -0,0 +1,214 @@
+"""
+Command-line entry point for the fantasy simulator.
+Reads league configs (stats csv, scoring, roster slots and openings, league
+size, seasons, injury handling, seed, engine) from JSON files and runs them,
+printing every slot's value and the top players. A file holds one config, a
+list of them, or {"defaults": {...}, "runs": [...]}; every config in every
+file runs in one process, and configs that score the same csv the same way
+share one loaded PlayerTable. With --cache (and a seed) the scored players
+are memory-mapped from disk, so pandas is only imported for a csv the cache
+has not seen yet. Reports the time from startup to the first simulated
+season.
+
+    python simulate3.py example3.json --cache .fantasy_cache
+    python simulate3.py --seasons 10000 --seed 1
+"""
+
+from __future__ import print_function
+import time
+START = time.perf_counter()
+import argparse
+import json
+import os
+import random
+import sys
+import numpy as np
+import cache3
+import engine3 as eng
+import instrument3 as instrument
+import models3 as fs
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ENGINES = ['streaming', 'parallel', 'array', 'league']
+NICKNAMES = ['Raiders', 'Seahawks', 'Colts', 'Chiefs', 'Chargers', 'Broncos', 'Cardinals', 'Packers', 'Bills', 'Rams', 'Bears', 'Falcons']
+
+DEFAULT_CONFIG = {
+    'name': None,
+    'stats': os.path.join(ROOT, '2014_nfl_weekly_stats.csv'),
+    'scoring': {'pass_yards': 0.04, 'pass_tds': 4.0, 'pass_ints': -2.0, 'rush_yards': 0.1, 'rush_tds': 6.0, 'recs': 0.0, 'rec_yards': 0.1, 'rec_tds': 6.0},
+    'roster_positions': ['qb', 'rb', 'wr', 'te'],
+    'roster_slots': ['qb1', 'rb1', 'rb2', 'wr1', 'wr2', 'wr3', 'te1'],
+    'roster_openings': None,
+    'assignment': 'position',
+    'league_size': 12,
+    'season_length': 16,
+    'seasons': 1000,
+    'injury_handling': 'zeros',
+    'minimum_games_played': 10,
+    'seed': None,
+    'engine': 'streaming',
+    'block_size': 1000,
+    'workers': None,
+}
+
+class Run:
+    """
+    One config run: a fresh Player_DB over a (possibly shared) PlayerTable,
+    its player pool and a League from config['engine']. first_season_at is
+    the perf_counter time the engine finished scoring its first season (its
+    first block, for the streaming engines), or None if it never reported one
+    (e.g. a run of 0 seasons).
+    """
+
+    def __init__(self, config, cache=None, tables=None):
+        self.config = config
+        self.first_season_at = None
+        self.instrumentation = instrument.Instrumentation(progress=self.progress)
+        self.started = start = time.perf_counter()
+        table = load_table(config, cache, tables)
+        scoring_categories, scoring_values = list(config['scoring']), list(config['scoring'].values())
+        player_db = fs.Player_DB(table, 'table', scoring_categories, scoring_values, config['season_length'], config['injury_handling'], instrumentation=self.instrumentation)
+        player_db.set_tiers(config['roster_positions'], config['league_size'], config['minimum_games_played'])
+        self.pool = player_db.get_player_pool(config['roster_slots'])
+        teams = fs.create_teams(config['league_size'], get_nicknames(config['league_size']))
+        self.league = build_league(config, self.pool, teams, self.instrumentation)
+        self.elapsed = time.perf_counter() - start
+
+    def __str__(self):
+        return '{}: {} in {:.2f} s'.format(self.config['name'], self.league, self.elapsed)
+
+    def progress(self, event):
+        if self.first_season_at is None and event['stage'] == 'calculate_team_scores' and event['seasons_done']:
+            self.first_season_at = time.perf_counter()
+
+    def get_slot_values(self):
+        'slot_value (average champion_pct - 1/league_size) for every roster slot, as in example3'
+        league_size = self.config['league_size']
+        return {slot: float(np.nanmean([p.champion_pct[-1] - 1./league_size for p in self.pool if p.slot == slot] or [np.nan]))
+                for slot in self.config['roster_slots']}
+
+    def get_top_players(self, n=10):
+        ranked = sorted(self.pool, key=lambda p: -np.nan_to_num(p.champion_pct[-1], nan=-1.))
+        return [{'name': p.name, 'slot': p.slot, 'champion_pct': float(p.champion_pct[-1]), 'average_team_ranking': float(p.average_team_ranking[-1])}
+                for p in ranked[:n]]
+
+    def get_results(self, top=10):
+        first_season_s = None if self.first_season_at is None else self.first_season_at - self.started
+        return {'name': self.config['name'], 'league': str(self.league), 'elapsed_s': self.elapsed, 'first_season_s': first_season_s,
+                'pandas_imported': 'pandas' in sys.modules, 'slot_values': self.get_slot_values(), 'top_players': self.get_top_players(top)}
+
+###############
+## Functions ##
+###############
+
+def get_config(settings, directory=ROOT, name=None):
+    'DEFAULT_CONFIG updated with settings; a relative stats path is relative to directory'
+    unknown = sorted(set(settings) - set(DEFAULT_CONFIG))
+    if unknown:
+        raise ValueError('Unknown config key(s): {}'.format(unknown))
+    config = dict(DEFAULT_CONFIG)
+    config.update(settings)
+    if config['engine'] not in ENGINES:
+        raise ValueError('Unknown engine {!r}, expected one of {}'.format(config['engine'], ENGINES))
+    if config['assignment'] not in fs.ASSIGNMENT_MODES:
+        raise ValueError('Unknown assignment {!r}, expected one of {}'.format(config['assignment'], fs.ASSIGNMENT_MODES))
+    config['stats'] = os.path.normpath(os.path.join(directory, config['stats']))
+    if config['name'] is None:
+        config['name'] = name
+    return config
+
+def read_configs(path):
+    'Configs in a JSON file: one config, a list of them, or {"defaults": {...}, "runs": [...]}'
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'runs' in data:
+        defaults, runs = data.get('defaults', {}), data['runs']
+    else:
+        defaults, runs = {}, data if isinstance(data, list) else [data]
+    directory = os.path.dirname(os.path.abspath(path))
+    label = os.path.splitext(os.path.basename(path))[0]
+    return [get_config(dict(defaults, **run), directory, label if len(runs) == 1 else '{}[{}]'.format(label, i)) for i, run in enumerate(runs)]
+
+def load_table(config, cache=None, tables=None):
+    '''
+    A fresh PlayerTable for config. tables (a dict) keeps every table loaded so far, so configs that
+    only differ in roster, league or engine settings share one score matrix instead of re-reading the csv.
+    '''
+    key = (config['stats'], json.dumps(config['scoring']), config['season_length'], config['injury_handling'], config['seed'])
+    if tables is not None and key in tables:
+        return tables[key].copy()
+    table = cache3.load_player_table(config['stats'], list(config['scoring']), list(config['scoring'].values()), config['season_length'],
+                                     config['injury_handling'], config['seed'], cache)
+    if tables is not None:
+        tables[key] = table
+        return table.copy()
+    return table
+
+def get_nicknames(league_size):
+    return NICKNAMES[:league_size] + ['Team {}'.format(i + 1) for i in range(len(NICKNAMES), league_size)]
+
+def build_league(config, pool, teams, instrumentation=None):
+    'League for config: StreamingLeague, parallel3.ParallelLeague, ArrayLeague or the reference League'
+    engine = config['engine']
+    seed = config['seed']
+    args = (config['roster_slots'], config['season_length'])
+    options = {'instrumentation': instrumentation, 'roster_openings': config['roster_openings'], 'assignment': config['assignment']}
+    if engine == 'streaming':
+        return eng.StreamingLeague(pool, teams, config['seasons'], *args, seed=seed, block_size=config['block_size'], **options)
+    seasons = fs.create_seasons(config['seasons'], config['season_length'])
+    if engine == 'parallel':
+        import parallel3
+        return parallel3.ParallelLeague(pool, teams, seasons, *args, seed=seed, workers=config['workers'], block_size=config['block_size'], populate=False, **options)
+    # ArrayLeague and League draw from the random module
+    if seed is not None:
+        random.seed(seed)
+        np.random.seed(seed)
+    if engine == 'array':
+        return eng.ArrayLeague(pool, teams, seasons, *args, populate=False, **options)
+    return fs.League(pool, teams, seasons, *args, **options)
+
+def format_ms(seconds):
+    'seconds as whole milliseconds, or "n/a" for an engine that never reported a finished season'
+    return 'n/a' if seconds is None else '{:.0f} ms'.format(1e3*seconds)
+
+def print_results(results):
+    print('{} ({:.2f} s, first season after {}, pandas {})'.format(results['league'], results['elapsed_s'], format_ms(results['first_season_s']),
+                                                                      'imported' if results['pandas_imported'] else 'not imported'))
+    print('  slot_value: ' + ', '.join('{} {:.4f}'.format(slot, value) for slot, value in results['slot_values'].items()))
+    for p in results['top_players']:
+        print('  {:24s} {:>5s} champion_pct {:.4f} average_team_ranking {:.3f}'.format(p['name'], p['slot'], p['champion_pct'], p['average_team_ranking']))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('configs', nargs='*', help='JSON config files (default: one run of DEFAULT_CONFIG)')
+    parser.add_argument('--cache', help='DataCache directory for scored players (seeded configs only)')
+    parser.add_argument('--seasons', type=int, help='override every config\'s seasons')
+    parser.add_argument('--seed', type=int, help='override every config\'s seed')
+    parser.add_argument('--engine', choices=ENGINES, help='override every config\'s engine')
+    parser.add_argument('--top', type=int, default=10, help='players to list per run')
+    parser.add_argument('--json', help='also write every run\'s results to this file')
+    parser.add_argument('--timing', action='store_true', help='print every run\'s stage timings')
+    args = parser.parse_args(argv)
+    configs = [c for path in args.configs for c in read_configs(path)] or [get_config({}, name='default')]
+    overrides = {name: getattr(args, name) for name in ['seasons', 'seed', 'engine'] if getattr(args, name) is not None}
+    for config in configs:
+        config.update(overrides)
+    cache = cache3.DataCache(args.cache) if args.cache else None
+    tables = {}
+    all_results = []
+    for config in configs:
+        run = Run(config, cache, tables)
+        results = run.get_results(args.top)
+        results['startup_s'] = None if run.first_season_at is None else run.first_season_at - START
+        print_results(results)
+        if args.timing:
+            run.instrumentation.print_report()
+        all_results.append(results)
+    print('{} run(s) in {:.2f} s, first simulated season {} after start'.format(len(all_results), time.perf_counter() - START, format_ms(all_results[0]['startup_s'])))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=1)
+    return all_results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+Append-only, memory-mapped store of per-season results for very large runs.
+Every per-season array (roster assignments, team scores, weekly ranks, final
+ranks, win pct) is one flat binary file of compact dtypes that seasons are
+appended to a chunk at a time, and players, teams and seasons are integer
+indices (player and team ids live once in the manifest, and the number of
+every season id, e.g. 12 for S0012, in its own file). Reads memory-map the
+files, and StoredSeason, StoredTeam and StoredPlayer answer the usual
+Season/Team/Player lookups from them on demand.
+"""
+
+from __future__ import print_function
+import collections
+import collections.abc
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 2
+MANIFEST = 'manifest.json'
+# name -> (dtype, per-season shape in terms of players/teams/weeks)
+SEASON_ARRAYS = collections.OrderedDict([('season_numbers', (np.int64, ())),
+                                         ('assignments', (np.int8, ('players',))),
+                                         ('team_scores', (np.float32, ('teams', 'weeks'))),
+                                         ('weekly_ranks', (np.int8, ('weeks', 'teams'))),
+                                         ('final_ranks', (np.int8, ('teams',))),
+                                         ('win_pct', (np.float32, ('teams',)))])
+
+class SeasonStore:
+    """
+    Directory holding one <name>.bin file per SEASON_ARRAYS entry and a
+    manifest.json with the player and team ids, season_length and the size of
+    every appended chunk. A new store needs player_ids, team_ids and
+    season_length; an existing one is reopened from its manifest. append
+    writes the arrays first and the manifest last (renamed into place), so a
+    crashed writer leaves the store at its last complete chunk.
+    """
+
+    def __init__(self, directory, player_ids=None, team_ids=None, season_length=None):
+        self.directory = directory
+        self.maps = {}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('format_version') != FORMAT_VERSION:
+                raise ValueError('{} has format version {}, not {}'.format(directory, self.manifest.get('format_version'), FORMAT_VERSION))
+            for name, ids in [('player_ids', player_ids), ('team_ids', team_ids)]:
+                if ids is not None and list(ids) != self.manifest[name]:
+                    raise ValueError('{} holds different {} than the ones given'.format(directory, name))
+        else:
+            if player_ids is None or team_ids is None or season_length is None:
+                raise ValueError('A new SeasonStore needs player_ids, team_ids and season_length')
+            if len(team_ids) > np.iinfo(np.int8).max:
+                raise ValueError('int8 ranks hold at most {} teams, not {}'.format(np.iinfo(np.int8).max, len(team_ids)))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.manifest = {'format_version': FORMAT_VERSION, 'player_ids': list(player_ids), 'team_ids': list(team_ids),
+                             'season_length': season_length, 'chunks': []}
+            self.write_manifest()
+        self.player_ids = self.manifest['player_ids']
+        self.team_ids = self.manifest['team_ids']
+        self.season_length = self.manifest['season_length']
+        self.league_size = len(self.team_ids)
+        self.player_index = {player_id: i for i, player_id in enumerate(self.player_ids)}
+        self.team_index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        self.season_lookup = None
+
+    def __str__(self):
+        return '{}: {} seasons in {} chunk(s), {} players, {} teams, {:.1f} MiB'.format(self.__class__.__name__, len(self), len(self.manifest['chunks']),
+                                                                                      len(self.player_ids), self.league_size, self.get_size()/2.**20)
+
+    def __len__(self):
+        return sum(self.manifest['chunks'])
+
+    def get_shape(self, name):
+        'Per-season shape of one of SEASON_ARRAYS'
+        sizes = {'players': len(self.player_ids), 'teams': self.league_size, 'weeks': self.season_length}
+        return tuple(sizes[axis] for axis in SEASON_ARRAYS[name][1])
+
+    def get_path(self, name):
+        return os.path.join(self.directory, name + '.bin')
+
+    def get_size(self):
+        return sum(os.path.getsize(self.get_path(name)) for name in SEASON_ARRAYS if os.path.exists(self.get_path(name)))
+
+    def write_manifest(self):
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(path + '.tmp', path)
+
+    def append(self, assignments, team_scores, weekly_ranks, final_ranks, win_pct, season_ids=None):
+        '''
+        Add one chunk of seasons: seasons x players team indices (-1 = not rostered), seasons x teams x
+        weeks scores, seasons x weeks x teams weekly ranks, and seasons x teams final ranks and win pct.
+        season_ids name the seasons (S0001, ...); by default they carry on from the last stored id.
+        '''
+        num_seasons = len(assignments)
+        committed = len(self)
+        stored = self.get_array('season_numbers')
+        if season_ids is None:
+            first = int(stored.max()) + 1 if committed else 1
+            season_numbers = np.arange(first, first + num_seasons)
+        else:
+            if len(season_ids) != num_seasons:
+                raise ValueError('Need one season id per season ({}), got {}'.format(num_seasons, len(season_ids)))
+            season_numbers = np.array([get_season_number(season_id) for season_id in season_ids], dtype=np.int64)
+            values, counts = np.unique(season_numbers, return_counts=True)
+            repeated = np.union1d(values[counts > 1], season_numbers[np.isin(season_numbers, stored)])
+            if len(repeated):
+                raise ValueError('Season ids must be unique, these repeat: {}'.format([format_season_id(n) for n in repeated]))
+        arrays = {'season_numbers': season_numbers, 'assignments': assignments, 'team_scores': team_scores, 'weekly_ranks': weekly_ranks,
+                  'final_ranks': final_ranks, 'win_pct': win_pct}
+        self.maps = {}
+        for name, (dtype, axes) in SEASON_ARRAYS.items():
+            array = np.ascontiguousarray(arrays[name], dtype=dtype)
+            if array.shape != (num_seasons,) + self.get_shape(name):
+                raise ValueError('{} must be {} seasons x {}, not {}'.format(name, num_seasons, ' x '.join(axes), array.shape))
+            path = self.get_path(name)
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                # drop anything past the last committed chunk (left by a writer that crashed before its manifest)
+                f.truncate(committed*int(np.prod(self.get_shape(name)))*np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        self.manifest['chunks'].append(num_seasons)
+        self.write_manifest()
+        self.maps = {}
+        self.season_lookup = None
+
+    def append_league(self, league):
+        'All seasons of an ArrayLeague (or subclass) as one chunk, under their season ids'
+        self.append(league.assignments, league.team_scores, league.weekly_ranks, league.final_ranks, league.win_pct,
+                    [s.season_id for s in league.seasons])
+
+    def get_array(self, name):
+        'Read-only seasons x ... memory map of one of SEASON_ARRAYS (nothing is read until it is indexed)'
+        if name not in self.maps:
+            dtype = SEASON_ARRAYS[name][0]
+            shape = (len(self),) + self.get_shape(name)
+            if shape[0] == 0:
+                self.maps[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self.maps[name] = np.memmap(self.get_path(name), dtype=dtype, mode='r', shape=shape)
+        return self.maps[name]
+
+    def iter_chunks(self, names=None):
+        'Yield (first season index, {name: seasons x ... view}) for every appended chunk, for out-of-core passes'
+        start = 0
+        for num_seasons in self.manifest['chunks']:
+            yield start, {name: self.get_array(name)[start:start+num_seasons] for name in names or SEASON_ARRAYS}
+            start += num_seasons
+
+    def get_season_index(self, season):
+        'Season index from an index or a season id'
+        if not isinstance(season, str):
+            if not 0 <= season < len(self):
+                raise KeyError(season)
+            return int(season)
+        try:
+            number = get_season_number(season)
+        except ValueError:
+            raise KeyError(season)
+        if self.season_lookup is None:
+            order = np.argsort(self.get_array('season_numbers'), kind='stable')
+            self.season_lookup = (self.get_array('season_numbers')[order], order)
+        numbers, order = self.season_lookup
+        position = np.searchsorted(numbers, number)
+        if position == len(numbers) or numbers[position] != number:
+            raise KeyError(season)
+        return int(order[position])
+
+    def get_season_id(self, index):
+        'Id of the season stored at index'
+        return format_season_id(self.get_array('season_numbers')[index])
+
+    def get_season(self, season):
+        return StoredSeason(self, self.get_season_index(season))
+
+    def get_seasons(self):
+        return [StoredSeason(self, i) for i in range(len(self))]
+
+    def get_team(self, team):
+        return StoredTeam(self, self.team_index[team] if isinstance(team, str) else team)
+
+    def get_player(self, player):
+        return StoredPlayer(self, self.player_index[player] if isinstance(player, str) else player)
+
+    def get_roster(self, index, team):
+        'player_ids on one team in one season'
+        return [self.player_ids[p] for p in np.flatnonzero(self.get_array('assignments')[index] == team)]
+
+class SeasonMapping(collections.abc.Mapping):
+    """
+    Read-only dict keyed by season id whose values are read from a
+    SeasonStore when asked for. has_value(index) says which seasons have one
+    (e.g. only the seasons a player was rostered); by default all of them.
+    """
+
+    def __init__(self, store, get_value, has_value=None):
+        self.store = store
+        self.get_value = get_value
+        self.has_value = has_value
+
+    def __getitem__(self, season):
+        index = self.store.get_season_index(season)
+        if self.has_value is not None and not self.has_value(index):
+            raise KeyError(season)
+        return self.get_value(index)
+
+    def __iter__(self):
+        for index in self.get_indices():
+            yield self.store.get_season_id(index)
+
+    def __len__(self):
+        return len(self.get_indices())
+
+    def get_indices(self):
+        if self.has_value is None:
+            return range(len(self.store))
+        return [i for i in range(len(self.store)) if self.has_value(i)]
+
+class StoredSeason:
+    """
+    Season-compatible view of one season in a SeasonStore.
+    """
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.season_id = store.get_season_id(index)
+        self.season_length = store.season_length
+
+    def __str__(self):
+        return '{} {}: {} / {}'.format(self.__class__.__name__, self.season_id, self.team_win_pct, self.final_team_ranks)
+
+    @property
+    def rosters(self):
+        return {team_id: self.store.get_roster(self.index, t) for t, team_id in enumerate(self.store.team_ids)}
+
+    @property
+    def team_rankings(self):
+        weekly_ranks = self.store.get_array('weekly_ranks')[self.index]
+        return {team_id: weekly_ranks[:, t].tolist() for t, team_id in enumerate(self.store.team_ids)}
+
+    @property
+    def final_team_ranks(self):
+        return dict(zip(self.store.team_ids, self.store.get_array('final_ranks')[self.index].tolist()))
+
+    @property
+    def team_win_pct(self):
+        return dict(zip(self.store.team_ids, self.store.get_array('win_pct')[self.index].tolist()))
+
+class StoredTeam:
+    """
+    Team-compatible view of one team across every season in a SeasonStore.
+    """
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.team_id = store.team_ids[index]
+
+    def __str__(self):
+        return '{} {}: {} season(s)'.format(self.__class__.__name__, self.team_id, len(self.store))
+
+    @property
+    def player_assignments(self):
+        return SeasonMapping(self.store, lambda s: self.store.get_roster(s, self.index))
+
+    @property
+    def scoring_output(self):
+        return SeasonMapping(self.store, lambda s: self.store.get_array('team_scores')[s, self.index].tolist())
+
+    @property
+    def average_points(self):
+        return SeasonMapping(self.store, lambda s: float(self.store.get_array('team_scores')[s, self.index].mean(dtype=np.float64)))
+
+    def get_final_ranks(self):
+        'Final rank in every season, read chunk by chunk'
+        return np.concatenate([chunk['final_ranks'][:, self.index] for start, chunk in self.store.iter_chunks(['final_ranks'])])
+
+class StoredPlayer:
+    """
+    View of one player's per-season results in a SeasonStore: the team they
+    were on and its final rank, for the seasons they were rostered.
+    """
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.player_id = store.player_ids[index]
+
+    def __str__(self):
+        return '{} {}: {} season(s) rostered'.format(self.__class__.__name__, self.player_id, int((self.get_team_indices() >= 0).sum()))
+
+    def is_rostered(self, season_index):
+        return self.store.get_array('assignments')[season_index, self.index] >= 0
+
+    @property
+    def team_assignments(self):
+        return SeasonMapping(self.store, lambda s: self.store.team_ids[self.store.get_array('assignments')[s, self.index]], self.is_rostered)
+
+    @property
+    def team_rankings(self):
+        return SeasonMapping(self.store, lambda s: int(self.store.get_array('final_ranks')[s, self.store.get_array('assignments')[s, self.index]]), self.is_rostered)
+
+    def get_team_indices(self):
+        'Team index in every season (-1 if not rostered), read chunk by chunk'
+        return np.concatenate([chunk['assignments'][:, self.index] for start, chunk in self.store.iter_chunks(['assignments'])])
+
+    def get_player_values(self):
+        '''
+        average_team_ranking, harmonic_team_ranking and champion_pct over every stored season, one
+        chunk at a time, so the whole store never has to fit in memory.
+        '''
+        league_size = self.store.league_size
+        counts, rank_sums, reciprocal_sums, champion_counts = 0, 0, 0., 0
+        for start, chunk in self.store.iter_chunks(['assignments', 'final_ranks']):
+            teams = chunk['assignments'][:, self.index].astype(np.intp)
+            rostered = np.flatnonzero(teams >= 0)
+            ranks = chunk['final_ranks'][rostered, teams[rostered]].astype(np.intp)
+            counts += len(ranks)
+            rank_sums += ranks.sum()
+            reciprocal = 1.0/(league_size + 1 - ranks)
+            # added in season order like engine3.summarize_player_ranks, so chunks written block by block give its exact values
+            reciprocal_sums += np.cumsum(reciprocal)[-1] if len(reciprocal) else 0.
+            champion_counts += (ranks == league_size - 1).sum()
+        if not counts:
+            return np.nan, np.nan, np.nan
+        return league_size + 1 - rank_sums/float(counts), counts/reciprocal_sums, champion_counts/float(counts)
+
+###############
+## Functions ##
+###############
+
+def get_season_number(season_id):
+    'S0012 -> 12, with no limit past S9999'
+    if not isinstance(season_id, str) or not season_id.startswith('S') or not season_id[1:].isdigit():
+        raise ValueError('Season ids look like S0001, not {!r}'.format(season_id))
+    return int(season_id[1:])
+
+def format_season_id(number):
+    'Inverse of get_season_number'
+    return 'S' + str(int(number)).zfill(4)
@@ -0,0 +1,190 @@
+"""
+Scoring-rule sweep: evaluate many SCORING_VALUES vectors against the same
+game logs in one pass. Points for every rule set come from one matrix
+product, tiers are ranked for all rule sets at once, and every rule set is
+simulated on the same random rosters (and the same injury fill-ins).
+"""
+
+from __future__ import print_function
+import sys
+import numpy as np
+import engine3 as eng
+import ingest3 as ingest
+import models3 as fs
+
+class ScoringSweep:
+    """
+    slot_value and champion_pct for each row of scoring_rules (K x
+    scoring_categories, an array or a DataFrame whose index names the rules).
+    Each rule set gets its own player pool (set_tiers with its own
+    points_per_gp), but the pools are laid out position by position in player
+    order, so all of them share one draw of rosters per season: common random
+    numbers, so differences between rule sets are not roster noise. With one
+    rule set the results match StreamingLeague on that rule's Player_DB pool
+    (columnar, same seed and block_size).
+    Each block holds K x block_size x league_size x season_length team scores,
+    so lower block_size for very large K.
+    """
+
+    def __init__(self, game_logs, scoring_categories, scoring_rules, teams, roster_slots, season_length, num_seasons,
+                 injury_handling='zeros', minimum_games_played=10, seed=None, block_size=250):
+        # a DataFrame can only have been made if pandas is already loaded
+        pd = sys.modules.get('pandas')
+        if pd is not None and isinstance(scoring_rules, pd.DataFrame):
+            self.rule_names = list(scoring_rules.index)
+            scoring_rules = scoring_rules[scoring_categories].to_numpy(dtype=np.float64)
+        else:
+            scoring_rules = np.atleast_2d(np.asarray(scoring_rules, dtype=np.float64))
+            self.rule_names = list(range(len(scoring_rules)))
+        self.scoring_categories = scoring_categories
+        self.scoring_rules = scoring_rules
+        self.teams = teams
+        self.league_size = len(teams)
+        self.roster_slots = roster_slots
+        self.season_length = season_length
+        self.num_seasons = num_seasons
+        self.injury_handling = injury_handling
+        self.minimum_games_played = minimum_games_played
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.block_size = block_size
+        self.generate_player_scores(game_logs)
+        self.set_tiers()
+        self.set_pools()
+        self.simulate()
+
+    def __str__(self):
+        return '{}: {} rule set(s), {} players, {} teams, {} seasons'.format(self.__class__.__name__, len(self.rule_names), len(self.names), self.league_size, self.num_seasons)
+
+    def generate_player_scores(self, game_logs):
+        'K x players x season_length season scores, every rule set filled in from the same seeded draws'
+        points = ingest.score_stats(ingest.get_stat_matrix(game_logs, self.scoring_categories), self.scoring_rules)
+        self.names, self.positions, rows, weeks, self.gp = ingest.index_game_logs(game_logs)
+        historic = np.full((len(self.scoring_rules), len(self.names), max(self.season_length, self.gp.max())), np.nan)
+        historic[:, rows, weeks] = points.T
+        fill_seed = np.random.SeedSequence(self.seed)
+        self.player_scores = np.stack([ingest.GameLogMatrix(self.names, self.positions, scores, self.gp, self.season_length)
+                                       .get_season_scores(self.injury_handling, np.random.default_rng(fill_seed)) for scores in historic])
+
+    def set_tiers(self):
+        'PlayerTable.set_tiers for every rule set at once: K x players tiers (0 = no tier)'
+        num_rules, num_players, num_weeks = self.player_scores.shape
+        points_per_gp = self.player_scores.sum(axis=2)/num_weeks
+        positions = np.array(self.positions)
+        qualified = self.gp >= self.minimum_games_played
+        self.tiers = np.zeros((num_rules, num_players), dtype=np.int16)
+        rule_index = np.arange(num_rules)[:, np.newaxis]
+        for pos in eng.ROSTER_POSITIONS:
+            members = np.flatnonzero(qualified & (positions == pos))
+            ranked = members[np.argsort(-points_per_gp[:, members], axis=1, kind='stable')]
+            self.tiers[rule_index, ranked] = np.arange(len(members))//self.league_size + 1
+
+    def set_pools(self):
+        '''
+        K x pool player rows: position by position (ROSTER_POSITIONS order), ascending player row
+        within a position, so column j is a player of the same position in every rule set.
+        '''
+        positions = np.array(self.positions)
+        slot_positions = [fs.convert_slot_to_position(slot)[0] for slot in self.roster_slots]
+        in_pool = np.zeros(self.tiers.shape, dtype=bool)
+        self.pool_slots = np.full(self.tiers.shape, -1, dtype=np.intp)
+        for s_index, (pos, tier) in enumerate(map(fs.convert_slot_to_position, self.roster_slots)):
+            members = (positions == pos) & (self.tiers == tier)
+            in_pool |= members
+            self.pool_slots[members] = s_index
+        pool_rows = []
+        self.position_groups = []
+        start = 0
+        for pos in eng.ROSTER_POSITIONS:
+            position_pool = in_pool & (positions == pos)
+            sizes = position_pool.sum(axis=1)
+            if pos in slot_positions and np.any(sizes != sizes[0]):
+                raise ValueError('Rule sets fill the {} slots with different numbers of players; lower minimum_games_played'.format(pos))
+            size = sizes[0] if len(sizes) else 0
+            pool_rows.append(np.nonzero(position_pool)[1].reshape(len(position_pool), size))
+            self.position_groups.append(np.arange(start, start + size, dtype=np.intp))
+            start += size
+        self.pool_rows = np.concatenate(pool_rows, axis=1)
+        rule_index = np.arange(len(self.pool_rows))[:, np.newaxis]
+        self.pool_scores = self.player_scores[rule_index, self.pool_rows]
+        self.pool_slots = self.pool_slots[rule_index, self.pool_rows]
+        self.openings = [eng.ROSTER_OPENINGS[pos] for pos in eng.ROSTER_POSITIONS]
+        self.row_ranks = np.argsort(np.argsort(self.pool_rows, axis=1), axis=1)
+
+    def get_block_task(self, block_index, season_offset, num_seasons):
+        return eng.BlockTask(block_index, season_offset, num_seasons, self.seed, self.pool_scores, self.position_groups, self.openings, self.league_size)
+
+    def simulate(self):
+        '''
+        Fold every block into one PlayerAccumulator whose "players" are rule set x pool column
+        (and whose slots are rule set x roster slot), so each block is one update for all rule sets.
+        '''
+        num_rules, num_pool = self.pool_rows.shape
+        num_slots = len(self.roster_slots)
+        slot_groups = [k*num_pool + np.flatnonzero(self.pool_slots[k] == s_index) for k in range(num_rules) for s_index in range(num_slots)]
+        self.accumulator = eng.PlayerAccumulator(num_rules*num_pool, self.league_size, num_rules*num_slots)
+        start = 0
+        for block_index, num_seasons in enumerate(eng.get_block_sizes(self.num_seasons, self.block_size)):
+            player_ranks = simulate_sweep_block(self.get_block_task(block_index, start, num_seasons), self.row_ranks)
+            self.accumulator.update(player_ranks.transpose(1, 0, 2).reshape(num_seasons, -1), slot_groups=slot_groups)
+            start += num_seasons
+
+    def get_slot_values(self):
+        'Rule sets x roster slots DataFrame of slot_value'
+        import pandas as pd
+        return pd.DataFrame(self.accumulator.slots.mean.reshape(len(self.rule_names), -1), index=self.rule_names, columns=self.roster_slots)
+
+    def get_player_values(self):
+        'One row per rule set and pool player: slot, champion_pct and average_team_ranking'
+        import pandas as pd
+        average, harmonic, champion = [values.reshape(self.pool_rows.shape) for values in self.accumulator.get_player_values()]
+        records = []
+        for k in range(len(self.rule_names)):
+            for j, row in enumerate(self.pool_rows[k]):
+                records.append((self.rule_names[k], self.names[row], self.positions[row], self.roster_slots[self.pool_slots[k, j]],
+                                champion[k, j], average[k, j], harmonic[k, j]))
+        return pd.DataFrame(records, columns=['rule', 'player', 'position', 'slot', 'champion_pct', 'average_team_ranking', 'harmonic_team_ranking'])
+
+###############
+## Functions ##
+###############
+
+def get_rosters(lineups, openings, league_size):
+    'Seasons x teams x roster spots of pool columns (-1 for an unfilled opening), from draw_lineups output'
+    num_seasons = len(lineups)
+    rosters = []
+    start = 0
+    for n in openings:
+        rosters.append(lineups[:, start:start+league_size*n].reshape(num_seasons, league_size, n))
+        start += league_size*n
+    return np.concatenate(rosters, axis=2)
+
+def calculate_team_scores(scores, rosters, row_ranks):
+    '''
+    engine3.calculate_team_scores for K x players x weeks scores: rule sets x seasons x teams x weeks.
+    Each team's players are gathered and added in row_ranks order (player row order of that rule
+    set's pool), so every sum matches the scatter-add of StreamingLeague on that pool.
+    '''
+    num_rules, num_players, num_weeks = scores.shape
+    # unfilled openings point at an extra all-zero player and sort last; adding 0.0 changes nothing
+    scores = np.concatenate([scores, np.zeros((num_rules, 1, num_weeks))], axis=1)
+    rosters = np.where(rosters >= 0, rosters, num_players)
+    row_ranks = np.concatenate([row_ranks, np.full((num_rules, 1), num_players)], axis=1)
+    rule_index = np.arange(num_rules)[:, np.newaxis, np.newaxis]
+    ranks = row_ranks[rule_index[..., np.newaxis], rosters]
+    ordered = np.take_along_axis(np.broadcast_to(rosters, ranks.shape), np.argsort(ranks, axis=-1), axis=-1)
+    flat_scores = scores.reshape(-1, num_weeks)
+    flat_index = ordered + rule_index[..., np.newaxis]*(num_players + 1)
+    team_scores = np.zeros(ordered.shape[:3] + (num_weeks,))
+    for spot in range(ordered.shape[3]):
+        team_scores += np.take(flat_scores, flat_index[..., spot], axis=0)
+    return team_scores
+
+def simulate_sweep_block(task, row_ranks):
+    'Rule sets x seasons x players final ranks for one block; rosters are drawn exactly like simulate_block'
+    rng = np.random.default_rng(eng.get_block_seed(task.seed, task.block_index))
+    num_players = task.player_scores.shape[1]
+    lineups = eng.draw_lineups(rng, task.position_groups, task.openings, task.league_size, task.num_seasons)
+    assignments = eng.get_assignments(lineups, eng.get_opening_teams(task.openings, task.league_size), num_players)
+    team_scores = calculate_team_scores(task.player_scores, get_rosters(lineups, task.openings, task.league_size), row_ranks)
+    win_pct, final_ranks = eng.calculate_final_ranks(eng.calculate_weekly_ranks(team_scores))
+    return eng.get_player_ranks(final_ranks, assignments)
@@ -0,0 +1,295 @@
+"""
+Columnar (struct-of-arrays) backend for Player_DB.
+PlayerTable keeps the scalar player stats as NumPy columns, every scoring
+array as one row of a 2D score matrix, and position/slot as integer codes.
+PlayerView is a two-slot handle onto one row that keeps the Player API
+(attributes, update_* methods and __str__) working for League and friends.
+"""
+
+from __future__ import print_function
+import numpy as np
+import models3 as fs
+import ingest3 as ingest
+
+METRICS = ['points_per_gp', 'utility', 'consistency']
+MEASUREMENTS = ['min', 'avg', 'std']
+COLUMNS = METRICS + [m + '_normalized' for m in METRICS] + [m + '_excess' for m in METRICS]
+HISTORY = {'team_assignments': dict, 'scoring_output': dict, 'average_points': dict, 'average_utility': dict, 'season_consistency': dict,
+           'team_rankings': dict, 'average_team_ranking': list, 'harmonic_team_ranking': list, 'champion_pct': list,
+           'h2h_champion_pct': list}
+
+class PlayerTable:
+    """
+    One row per player. Float columns: points, points_per_gp, utility,
+    consistency and their *_normalized / *_excess versions. Integer columns:
+    gp, position code, tier (0 = no tier, slot is just the position) and
+    position_rank. scores is players x season_length; historic holds each
+    player's real games, NaN after them (by default scores are the games as
+    played). Per-season League
+    history (team_assignments, scoring_output, ...) is only created for rows
+    that a League actually writes to.
+    """
+
+    def __init__(self, names, positions, scores, gp, points, historic=None):
+        num_players = len(names)
+        self.first_id = fs.Player.id
+        fs.Player.id += num_players
+        self.names = np.asarray(names, dtype=np.str_)
+        self.position_names = sorted(set(positions))
+        self.position_codes = np.array([self.position_names.index(pos) for pos in positions], dtype=np.int8)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.historic = self.scores if historic is None else np.asarray(historic, dtype=np.float64)
+        self.gp = np.asarray(gp, dtype=np.int16)
+        self.points = np.asarray(points, dtype=np.float64)
+        self.tiers = np.zeros(num_players, dtype=np.int16)
+        self.position_ranks = np.zeros(num_players, dtype=np.int32)
+        # one row per column, so all metrics of a set of players are gathered and scattered at once
+        self.values = np.full((len(COLUMNS), num_players), np.nan)
+        self.columns = dict(zip(COLUMNS, self.values))
+        self.measurements = np.full((len(self.position_names), len(METRICS)*len(MEASUREMENTS)), np.nan)
+        self.history = {}
+        self.update_metrics()
+
+    def __str__(self):
+        return '{}: {} player(s)'.format(self.__class__.__name__, len(self))
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_players(cls, players):
+        'Copy existing Player objects into a table'
+        table = cls([p.name for p in players], [p.position for p in players], [p.scoring_array for p in players],
+                    [p.gp for p in players], [p.points for p in players], _pad_games([p.historic_scoring_array for p in players]))
+        for row, p in enumerate(players):
+            if p.slot != p.position:
+                table.set_slot(row, p.slot)
+            table.position_ranks[row] = p.position_rank
+        return table
+
+    @classmethod
+    def from_pdb(cls, pdb, season_length, injury_handling):
+        'Same inputs as create_players_from_pdb'
+        names = list(pdb['player'])
+        positions = list(pdb['position'])
+        historic = list(pdb['scoring_array'])
+        gp = [len(a) for a in historic]
+        points = [sum(a) for a in historic]
+        # generate_scoring_array pads and shuffles its list in place
+        games = _pad_games(historic)
+        scores = [fs.generate_scoring_array(a, season_length, injury_handling) for a in historic]
+        return cls(names, positions, scores, gp, points, games)
+
+    @classmethod
+    def from_game_logs(cls, game_logs, scoring_categories, scoring_values, season_length, injury_handling, seed=None):
+        'Batched ingestion straight from game logs; missed games are filled from a Generator seeded with seed'
+        matrix = ingest.read_game_logs(game_logs, scoring_categories, scoring_values, season_length)
+        return cls.from_matrix(matrix, injury_handling, seed)
+
+    @classmethod
+    def from_matrix(cls, matrix, injury_handling, seed=None):
+        'From an ingest3.GameLogMatrix, e.g. a multi-season GameLogHistory'
+        scores = matrix.get_season_scores(injury_handling, seed)
+        return cls(matrix.names, matrix.positions, scores, matrix.gp, matrix.points, matrix.scores)
+
+    def copy(self):
+        'Same players over the same (shared, not copied) score matrices, without tiers or League history'
+        positions = np.array(self.position_names)[self.position_codes].tolist()
+        return PlayerTable(self.names, positions, self.scores, self.gp, self.points, self.historic)
+
+    def get_views(self, rows=None):
+        rows = range(len(self)) if rows is None else rows
+        return [PlayerView(self, row) for row in rows]
+
+    def get_player_id(self, row):
+        return 'P' + str(self.first_id + row).zfill(3)
+
+    def get_slot(self, row):
+        position = self.position_names[self.position_codes[row]]
+        tier = self.tiers[row]
+        return fs.convert_position_to_slot(position, tier) if tier else position
+
+    def get_slots(self):
+        positions = np.array(self.position_names)[self.position_codes]
+        return np.where(self.tiers > 0, np.char.add(positions, self.tiers.astype(np.str_)), positions)
+
+    def set_slot(self, row, slot):
+        position = self.position_names[self.position_codes[row]]
+        self.tiers[row] = 0 if slot == position else fs.convert_slot_to_position(slot)[1]
+
+    def update_metrics(self):
+        'points_per_gp, utility and consistency for every row from the score matrix, summed week by week like Player'
+        num_weeks = self.scores.shape[1]
+        columns = self.columns
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns['points_per_gp'][:] = _sum_weeks(self.scores)/num_weeks
+            columns['utility'][:] = np.expm1(_sum_weeks(np.log1p(self.scores))/num_weeks)
+            columns['consistency'][:] = columns['utility']/columns['points_per_gp']
+
+    def calculate_position_measurements(self, rows=None):
+        '''
+        calculate_position_measurements for every position among rows (default: all), as column operations:
+        every metric is gathered in one take, each position's min/mean/std is one reduction over its
+        members (kept in row order, so the sums match the object path) and normalized/excess are
+        computed for all rows at once.
+        '''
+        num_metrics = len(METRICS)
+        values = self.values[:num_metrics] if rows is None else self.values[:num_metrics].take(rows, axis=1)
+        codes = self.position_codes if rows is None else self.position_codes[rows]
+        order = np.argsort(codes, kind='stable')
+        grouped = values.take(order, axis=1)
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(codes) else np.zeros(0, dtype=np.intp)
+        stops = np.r_[starts[1:], len(codes)]
+        low, average, spread = [np.empty((num_metrics, len(starts))) for m in MEASUREMENTS]
+        for i, (start, stop) in enumerate(zip(starts, stops)):
+            members = grouped[:, start:stop]
+            count = stop - start
+            # the builtin min Player measures with only returns nan when the first value is nan
+            low[:, i] = np.where(np.isnan(members[:, 0]), np.nan, np.fmin.reduce(members, axis=1))
+            # mean and std as np.average/np.std compute them, without recomputing the mean for std
+            average[:, i] = np.add.reduce(members, axis=1)/count
+            deviations = members - average[:, i, np.newaxis]
+            spread[:, i] = np.sqrt(np.add.reduce(deviations*deviations, axis=1)/count)
+        position_codes = sorted_codes[starts]
+        segments = np.searchsorted(position_codes, codes)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = (values - average.take(segments, axis=1))/spread.take(segments, axis=1)
+        excess = values - low.take(segments, axis=1)
+        if rows is None:
+            self.values[num_metrics:2*num_metrics] = normalized
+            self.values[2*num_metrics:] = excess
+        else:
+            self.values[num_metrics:, rows] = np.concatenate([normalized, excess])
+        self.measurements[position_codes] = np.stack([low, average, spread], axis=1).reshape(-1, len(starts)).T
+
+    def get_position_averages(self, row):
+        names = [m + '_' + metric for metric in METRICS for m in MEASUREMENTS]
+        return dict(zip(names, self.measurements[self.position_codes[row]]))
+
+    def set_tiers(self, positions, league_size, minimum_games_played):
+        'Player_DB.set_tiers as column operations: rank qualified players by points_per_gp within position'
+        qualified = self.gp >= minimum_games_played
+        for pos in positions:
+            if pos not in self.position_names:
+                continue
+            members = np.flatnonzero(qualified & (self.position_codes == self.position_names.index(pos)))
+            ranked = members[np.argsort(-self.columns['points_per_gp'][members], kind='stable')]
+            self.tiers[ranked] = np.arange(len(ranked))//league_size + 1
+            self.position_ranks[ranked] = np.arange(1, len(ranked) + 1)
+
+    def get_pool_rows(self, roster_slots):
+        'Rows whose slot is one of roster_slots'
+        slots = self.get_slots()
+        return np.flatnonzero(np.isin(slots, roster_slots))
+
+    def get_history(self, row, name):
+        history = self.history.setdefault(row, {})
+        if name not in history:
+            history[name] = HISTORY[name]()
+        return history[name]
+
+class PlayerView:
+    """
+    Player-compatible handle onto one PlayerTable row.
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def player_id(self):
+        return self.table.get_player_id(self.row)
+
+    @property
+    def name(self):
+        return str(self.table.names[self.row])
+
+    @property
+    def position(self):
+        return self.table.position_names[self.table.position_codes[self.row]]
+
+    @property
+    def slot(self):
+        return self.table.get_slot(self.row)
+
+    @property
+    def gp(self):
+        return int(self.table.gp[self.row])
+
+    @property
+    def points(self):
+        return self.table.points[self.row]
+
+    @property
+    def scoring_array(self):
+        return self.table.scores[self.row]
+
+    @scoring_array.setter
+    def scoring_array(self, scoring_array):
+        'Writes into the score matrix, e.g. a new projection before League.update_players'
+        self.table.scores[self.row] = scoring_array
+
+    @property
+    def historic_scoring_array(self):
+        games = self.table.historic[self.row]
+        return games[~np.isnan(games)]
+
+    @property
+    def position_rank(self):
+        return int(self.table.position_ranks[self.row])
+
+    @property
+    def position_averages(self):
+        return self.table.get_position_averages(self.row)
+
+    def set_slot(self, slot):
+        self.table.set_slot(self.row, slot)
+
+    def set_position_rank(self, position_rank):
+        self.table.position_ranks[self.row] = position_rank
+
+    def update_position_averages(self, measurement_dict):
+        'Stores this row\'s normalized/excess values; the position averages themselves live per position'
+        columns = self.table.columns
+        for metric in METRICS:
+            value = columns[metric][self.row]
+            columns[metric + '_normalized'][self.row] = (value - measurement_dict['avg_' + metric])/measurement_dict['std_' + metric]
+            columns[metric + '_excess'][self.row] = value - measurement_dict['min_' + metric]
+        self.table.measurements[self.table.position_codes[self.row]] = [measurement_dict[m + '_' + metric] for metric in METRICS for m in MEASUREMENTS]
+
+    update_team_assignment = fs.Player.update_team_assignment
+    update_scoring_output = fs.Player.update_scoring_output
+    update_team_rankings = fs.Player.update_team_rankings
+    update_average_team_ranking = fs.Player.update_average_team_ranking
+    update_harmonic_team_ranking = fs.Player.update_harmonic_team_ranking
+    update_champion_pct = fs.Player.update_champion_pct
+    update_h2h_champion_pct = fs.Player.update_h2h_champion_pct
+    __str__ = fs.Player.__str__
+
+def _pad_games(games):
+    'Players x most games matrix of game lists, NaN after each player\'s games'
+    padded = np.full((len(games), max([len(a) for a in games] or [0])), np.nan)
+    for row, a in enumerate(games):
+        padded[row, :len(a)] = a
+    return padded
+
+def _sum_weeks(scores):
+    'Row sums added one week at a time from 0, as the builtin sum does for a Player\'s scoring_array'
+    total = np.zeros(len(scores))
+    for week in scores.T:
+        total += week
+    return total
+
+def _column_property(column):
+    return property(lambda self: self.table.columns[column][self.row])
+
+def _history_property(name):
+    return property(lambda self: self.table.get_history(self.row, name))
+
+for _column in COLUMNS:
+    setattr(PlayerView, _column, _column_property(_column))
+for _name in HISTORY:
+    setattr(PlayerView, _name, _history_property(_name))
@@ -0,0 +1,95 @@
+"""
+Shared fixtures: league settings from example3.py and leagues built from the
+bundled weekly stats with fixed seeds, so two engines can be compared on the
+same players, teams, seasons and roster draws.
+"""
+
+from __future__ import print_function
+import os
+import random
+import sys
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ingest3 as ingest
+import models3 as fs
+
+LEAGUE_SIZE = 12
+MINIMUM_GAMES_PLAYED = 10
+INJURY_HANDLING = 'zeros'
+SEASON_LENGTH = 16
+NUM_SEASONS = 20
+
+ROSTER_POSITIONS = ['qb', 'rb', 'wr', 'te']
+ROSTER_SLOTS = ['qb1', 'rb1', 'rb2', 'wr1', 'wr2', 'wr3', 'te1']
+DEEP_ROSTER_SLOTS = ['qb1', 'qb2', 'rb1', 'rb2', 'rb3', 'rb4', 'wr1', 'wr2', 'wr3', 'wr4', 'wr5', 'te1', 'te2']
+SCORING_CATEGORIES = ['pass_yards', 'pass_tds', 'pass_ints', 'rush_yards', 'rush_tds', 'recs', 'rec_yards', 'rec_tds']
+SCORING_VALUES = [0.04, 4.0, -2.0, 0.1, 6.0, 0.0, 0.1, 6.0]
+STATS_PATH = os.path.join(ROOT, '2014_nfl_weekly_stats.csv')
+CHANGED_PLAYERS = [3, 40, 77]
+
+PLAYER_FIELDS = ['average_team_ranking', 'harmonic_team_ranking', 'champion_pct', 'team_assignments', 'scoring_output', 'team_rankings',
+                 'average_points', 'average_utility', 'season_consistency']
+SEASON_FIELDS = ['rosters', 'team_rankings', 'final_team_ranks', 'team_win_pct']
+TEAM_FIELDS = ['player_assignments', 'scoring_output', 'average_points', 'average_utility', 'weekly_consistency']
+
+@pytest.fixture(scope='session')
+def game_logs():
+    return ingest.read_stats_csv(STATS_PATH)
+
+@pytest.fixture
+def build_league(game_logs):
+    '''
+    build_league(cls, **kwargs): cls over a fresh object-path Player_DB pool, teams and seasons. Ids and
+    both random modules are reset first, so every call sees the same players and the same roster draws.
+    '''
+    def build(cls, num_seasons=NUM_SEASONS, seed=2, roster_slots=ROSTER_SLOTS, **kwargs):
+        fs.Player.id = fs.Team.id = fs.Season.id = 1
+        random.seed(1)
+        np.random.seed(1)
+        player_db = fs.Player_DB(game_logs.copy(), 'game_logs', SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, INJURY_HANDLING)
+        player_db.set_tiers(ROSTER_POSITIONS, LEAGUE_SIZE, MINIMUM_GAMES_PLAYED)
+        players = player_db.get_player_pool(roster_slots)
+        teams = fs.create_teams(LEAGUE_SIZE, ['Team {}'.format(i+1) for i in range(LEAGUE_SIZE)])
+        seasons = fs.create_seasons(num_seasons, SEASON_LENGTH)
+        random.seed(seed)
+        np.random.seed(seed)
+        return cls(players, teams, seasons, roster_slots, SEASON_LENGTH, **kwargs)
+    return build
+
+def change_players(players):
+    'Scale the scoring_array of the players at CHANGED_PLAYERS, as a new projection would, and return them'
+    changed = [players[i] for i in CHANGED_PLAYERS]
+    for p in changed:
+        p.scoring_array = [points*1.25 for points in p.scoring_array]
+    return changed
+
+def normalize(value):
+    'value with NumPy scalars turned into Python ones, so repr() compares results bit for bit (nan included)'
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return normalize(value.tolist())
+    if isinstance(value, np.str_):
+        return str(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+def get_state(objects, fields):
+    return [repr({field: normalize(getattr(o, field)) for field in fields}) for o in objects]
+
+@pytest.fixture
+def league_state():
+    'league_state(league): every player, season and team result of a League, ready for ==, and a list per object'
+    def state(league):
+        return {'players': get_state(league.players, PLAYER_FIELDS), 'seasons': get_state(league.seasons, SEASON_FIELDS),
+                'teams': get_state(league.teams, TEAM_FIELDS)}
+    return state
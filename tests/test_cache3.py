@@ -0,0 +1,39 @@
+from __future__ import print_function
+import pytest
+import cache3
+import engine3 as eng
+from conftest import normalize
+
+BLOCK_SIZE = 40
+
+def build_streaming(build_league, num_seasons, seed=6, **kwargs):
+    def build(players, teams, seasons, *args):
+        return eng.StreamingLeague(players, teams, len(seasons), *args, seed=seed, block_size=BLOCK_SIZE, **kwargs)
+    return build_league(build, num_seasons=num_seasons)
+
+def get_results(league):
+    return repr(normalize([league.accumulator.get_state(), [p.champion_pct for p in league.players]]))
+
+@pytest.mark.parametrize('score_draw', ['replay', 'sample'])
+def test_topped_up_run_matches_uncached_run(build_league, score_draw):
+    result_cache = cache3.ResultCache()
+    build_streaming(build_league, 120, score_draw=score_draw, result_cache=result_cache)
+    topped_up = build_streaming(build_league, 200, score_draw=score_draw, result_cache=result_cache)
+    assert topped_up.cached_blocks == 3 and result_cache.top_ups == 1
+    assert get_results(topped_up) == get_results(build_streaming(build_league, 200, score_draw=score_draw))
+    # and the topped-up run is cached in full
+    cached = build_streaming(build_league, 200, score_draw=score_draw, result_cache=result_cache)
+    assert cached.cached_blocks == 5 and result_cache.hits == 1
+    assert get_results(cached) == get_results(topped_up)
+
+def test_memory_lru_evicts_to_disk(build_league, tmp_path):
+    result_cache = cache3.ResultCache(cache3.DataCache(str(tmp_path)), max_entries=1)
+    first = build_streaming(build_league, 80, seed=6, result_cache=result_cache)
+    second = build_streaming(build_league, 80, seed=7, result_cache=result_cache)
+    assert list(result_cache.memory) == [(second.fingerprint, 80)]
+    assert len(result_cache.disk.find(kind='result')) == 2
+    # read back from disk, which moves it to the front of memory
+    again = build_streaming(build_league, 80, seed=6, result_cache=result_cache)
+    assert again.cached_blocks == 2 and result_cache.hits == 1
+    assert list(result_cache.memory) == [(first.fingerprint, 80)]
+    assert get_results(again) == get_results(first)
@@ -0,0 +1,83 @@
+from __future__ import print_function
+import os
+import numpy as np
+import pandas as pd
+import draft3
+import engine3 as eng
+from conftest import DEEP_ROSTER_SLOTS, LEAGUE_SIZE, ROOT, ROSTER_SLOTS, SCORING_CATEGORIES, SCORING_VALUES
+
+STRATEGIES = ['random', 'clairvoyant', 'utility', 'adp']*3
+
+def get_player_pool(build_league):
+    return build_league(lambda players, *args: players)
+
+def test_drafts_fill_every_roster_with_eligible_players(build_league):
+    projections = pd.read_csv(os.path.join(ROOT, 'projections_v1.csv'))
+    def build(players, teams, seasons, roster_slots, season_length):
+        return draft3.DraftLeague(players, teams, seasons, roster_slots, season_length, STRATEGIES, projections, SCORING_CATEGORIES, SCORING_VALUES,
+                                  seed=9, block_size=7)
+    league = build_league(build)
+    assert (league.lineups >= 0).all()
+    # group-major openings: every one holds a player of its position, and nobody is drafted twice
+    opening_positions = np.repeat(eng.ROSTER_POSITIONS, [LEAGUE_SIZE*n for n in league.openings])
+    assert (np.array([p.position for p in league.players])[league.lineups] == opening_positions).all()
+    for lineup in league.lineups:
+        assert len(set(lineup)) == len(lineup)
+    for season in league.seasons:
+        assert sorted(len(roster) for roster in season.rosters.values()) == [len(ROSTER_SLOTS)]*LEAGUE_SIZE
+
+def test_snake_order_reverses_every_other_round():
+    rng = np.random.default_rng(0)
+    num_seasons, league_size, num_rounds = 5, 4, 3
+    draft_order = draft3.get_draft_order(rng, num_seasons, league_size)
+    # every team ranks the players the same way, so pick k takes player k
+    keys = np.tile(np.arange(league_size*num_rounds, 0, -1, dtype=np.float64), (num_seasons, league_size, 1))
+    lineups = draft3.run_drafts(keys, np.zeros(league_size*num_rounds, dtype=np.intp), [num_rounds, 0, 0, 0], draft_order)
+    picks = lineups.reshape(num_seasons, league_size, num_rounds)
+    season_index = np.arange(num_seasons)[:, np.newaxis]
+    for r in range(num_rounds):
+        order = draft_order if r % 2 == 0 else draft_order[:, ::-1]
+        assert (picks[season_index, order, r] == r*league_size + np.arange(league_size)).all()
+
+def test_drafts_only_take_players_a_team_has_room_for():
+    rng = np.random.default_rng(1)
+    num_seasons, league_size = 6, 4
+    # the best keys go to players at no roster position, then to qbs, then to too few rbs for two each
+    position_index = np.array([-1]*4 + [0]*6 + [1]*6, dtype=np.intp)
+    keys = np.tile(np.arange(len(position_index), 0, -1, dtype=np.float64), (num_seasons, league_size, 1))
+    lineups = draft3.run_drafts(keys, position_index, [1, 2, 0, 0], draft3.get_draft_order(rng, num_seasons, league_size))
+    qbs, rbs = lineups[:, :league_size], lineups[:, league_size:]
+    assert (position_index[qbs] == 0).all()
+    assert (position_index[rbs[rbs >= 0]] == 1).all() and ((rbs < 0).sum(axis=1) == 2).all()
+    assert not np.isin(lineups, np.flatnonzero(position_index < 0)).any()
+
+def test_adp_matches_projection_names(build_league):
+    players = get_player_pool(build_league)[:4]
+    points = np.arange(1., 5.)
+    projections = pd.DataFrame({'player': [players[0].name.upper(), players[1].name + ' Jr.', players[2].name.replace(' ', '. ') + ' III', players[3].name],
+                                'position': [p.position for p in players[:3]] + ['k'], 'points': points})
+    projected = draft3.get_projected_points(players, projections, ['points'], [2.])
+    assert projected[:3].tolist() == (2*points[:3]).tolist() and np.isnan(projected[3])
+    # a name listed twice keeps its first projection
+    doubled = pd.concat([projections, projections.assign(points=points + 10.)])
+    assert np.array_equal(draft3.get_projected_points(players, doubled, ['points'], [2.]), projected, equal_nan=True)
+    # players without a projection are drafted after everyone with one
+    assert draft3.get_draft_keys(players, 'adp', projections, ['points'], [2.])[3] == -np.inf
+
+def test_drafts_follow_roster_openings_and_slots(build_league):
+    def build(players, teams, seasons, roster_slots, season_length):
+        return draft3.DraftLeague(players, teams, seasons, roster_slots, season_length, 'clairvoyant', seed=9, roster_openings={'rb': 3, 'wr': 1})
+    league = build_league(build)
+    assert league.openings == [3, 1]
+    # the pool only has two rbs per team, so a third of the rb openings stay empty
+    opening_positions = np.broadcast_to(np.repeat(['rb', 'wr'], [3*LEAGUE_SIZE, LEAGUE_SIZE]), league.lineups.shape)
+    drafted = league.lineups >= 0
+    assert (drafted.sum(axis=1) == 3*LEAGUE_SIZE).all()
+    assert (np.array([p.position for p in league.players])[league.lineups[drafted]] == opening_positions[drafted]).all()
+    def build_slots(players, teams, seasons, roster_slots, season_length):
+        return draft3.DraftLeague(players, teams, seasons, roster_slots, season_length, 'utility', seed=9, assignment='slot')
+    league = build_league(build_slots, roster_slots=DEEP_ROSTER_SLOTS)
+    # one opening per slot, each taken by a player of that slot
+    opening_slots = np.repeat(DEEP_ROSTER_SLOTS, LEAGUE_SIZE)
+    drafted = league.lineups >= 0
+    assert (np.array([p.slot for p in league.players])[league.lineups[drafted]] == np.broadcast_to(opening_slots, league.lineups.shape)[drafted]).all()
@@ -0,0 +1,106 @@
+from __future__ import print_function
+import numpy as np
+import engine3 as eng
+import models3 as fs
+from conftest import DEEP_ROSTER_SLOTS, LEAGUE_SIZE, change_players
+
+SAMPLING_SEASONS = 20000
+
+def test_array_league_matches_league(build_league, league_state):
+    league = build_league(fs.League)
+    array_league = build_league(eng.ArrayLeague)
+    assert league_state(array_league) == league_state(league)
+
+def test_array_league_without_populate_sets_values(build_league):
+    league = build_league(fs.League)
+    array_league = build_league(eng.ArrayLeague, populate=False)
+    for p, q in zip(league.players, array_league.players):
+        assert repr(q.champion_pct) == repr(p.champion_pct)
+        assert repr(q.average_team_ranking) == repr(p.average_team_ranking)
+        assert repr(q.harmonic_team_ranking) == repr(p.harmonic_team_ranking)
+        assert q.season_consistency == {}
+
+def build_changed_league(players, *args, **kwargs):
+    change_players(players)
+    return eng.ArrayLeague(players, *args, **kwargs)
+
+def test_update_players_matches_rebuild(build_league, league_state):
+    # the default openings leave part of the deep pool unrostered every season
+    league = build_league(eng.ArrayLeague, roster_slots=DEEP_ROSTER_SLOTS)
+    changed = change_players(league.players)
+    assert any(len(p.team_assignments) < len(league.seasons) for p in changed)
+    league.update_players(changed)
+    rebuilt = build_league(build_changed_league, roster_slots=DEEP_ROSTER_SLOTS)
+    assert league_state(league) == league_state(rebuilt)
+    assert [p.champion_pct for p in league.players] == [p.champion_pct for p in rebuilt.players]
+
+def get_sampled_values(build_league, sampling):
+    'champion_pct and its standard error from a StreamingLeague drawn with sampling'
+    def build(players, teams, seasons, *args):
+        return eng.StreamingLeague(players, teams, SAMPLING_SEASONS, *args, seed=7, block_size=5000, sampling=sampling)
+    accumulator = build_league(build).accumulator
+    return accumulator.get_player_values()[2], accumulator.get_standard_errors()[0]
+
+def test_sampling_schemes_agree(build_league):
+    plain, plain_se = get_sampled_values(build_league, 'plain')
+    for sampling in ['antithetic', 'stratified']:
+        champion, champion_se = get_sampled_values(build_league, sampling)
+        z = (champion - plain)/np.sqrt(champion_se**2 + plain_se**2)
+        # never-champions have a standard error of 0 under both schemes
+        assert np.all(np.abs(z[np.isfinite(z)]) < 4.5), sampling
+        assert np.array_equal(champion[~np.isfinite(z)], plain[~np.isfinite(z)])
+
+def test_stratified_lineups_give_every_team_every_rank(build_league):
+    players = build_league(lambda players, *args: players)
+    groups = eng.get_position_groups(players, eng.ROSTER_POSITIONS)
+    openings = [eng.ROSTER_OPENINGS[pos] for pos in eng.ROSTER_POSITIONS]
+    strength = np.array([np.mean(p.scoring_array) for p in players])
+    num_seasons = 3*LEAGUE_SIZE
+    lineups = eng.draw_lineups(np.random.default_rng(3), groups, openings, LEAGUE_SIZE, num_seasons, 'stratified', strength)
+    start = 0
+    for n in openings:
+        block_strength = strength[lineups[:, start:start+LEAGUE_SIZE*n]].reshape(num_seasons, LEAGUE_SIZE, n).sum(axis=2)
+        ranks = np.argsort(np.argsort(block_strength, axis=1, kind='stable'), axis=1, kind='stable')
+        for stratum in ranks.reshape(-1, LEAGUE_SIZE, LEAGUE_SIZE):
+            assert (np.sort(stratum, axis=0) == np.arange(LEAGUE_SIZE)[:, np.newaxis]).all()
+        start += LEAGUE_SIZE*n
+
+def get_resimulated_changes(league, replacements):
+    '''
+    Per player_id: (championship share lost, final rank lost) in every season they were rostered,
+    from summing and ranking that season's teams again with their scores swapped for the replacement's
+    '''
+    num_weeks = league.season_length
+    replacement_scores = {slot: eng.get_score_matrix([p], num_weeks)[0] for slot, p in replacements.items()}
+    def get_outcomes(player_scores, assignments, team):
+        team_scores = np.zeros((LEAGUE_SIZE, num_weeks))
+        for i in np.flatnonzero(assignments >= 0):
+            team_scores[assignments[i]] += player_scores[i]
+        wins = [sum((a > b).sum() + .5*(a == b).sum() for b in team_scores) - .5*num_weeks for a in team_scores]
+        champion = 1./wins.count(max(wins)) if wins[team] == max(wins) else 0.
+        return champion, 1 + sum(w > wins[team] for w in wins) + .5*(wins.count(wins[team]) - 1)
+    changes = {p.player_id: [] for p in league.players}
+    for assignments in league.assignments:
+        for i in np.flatnonzero(assignments >= 0):
+            p = league.players[i]
+            swapped = league.player_scores.copy()
+            swapped[i] = replacement_scores[p.slot]
+            champion, rank = get_outcomes(league.player_scores, assignments, assignments[i])
+            swapped_champion, swapped_rank = get_outcomes(swapped, assignments, assignments[i])
+            changes[p.player_id].append((champion - swapped_champion, swapped_rank - rank))
+    return changes
+
+def test_marginal_values_match_resimulated_swaps(build_league):
+    league = build_league(eng.ArrayLeague, populate=False)
+    replacements = {slot: min([p for p in league.players if p.slot == slot], key=lambda p: p.points_per_gp) for slot in league.roster_slots}
+    values = league.get_marginal_values(replacements, confidence=0.95)
+    changes = get_resimulated_changes(league, replacements)
+    z = 1.959963984540054
+    assert sum(len(c) for c in changes.values()) == league.assignments.size - (league.assignments < 0).sum()
+    for player_id, player_changes in changes.items():
+        value = values[player_id]
+        champion, rank = np.array(player_changes).reshape(-1, 2).T
+        assert value['seasons'] == len(player_changes)
+        assert np.isclose(value['championships_above_replacement'], champion.mean())
+        assert np.isclose(value['rank_gain'], rank.mean())
+        assert np.isclose(value['car_high'] - value['car_low'], 2*z*champion.std(ddof=1)/np.sqrt(len(champion)))
@@ -0,0 +1,27 @@
+from __future__ import print_function
+import numpy as np
+import ingest3 as ingest
+from conftest import INJURY_HANDLING, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, STATS_PATH
+
+def get_matrix_state(matrix):
+    return matrix.names, matrix.positions, matrix.gp.tolist(), matrix.scores, matrix.points
+
+def assert_same_matrix(a, b):
+    for x, y in zip(get_matrix_state(a), get_matrix_state(b)):
+        if isinstance(x, np.ndarray):
+            assert np.array_equal(x, y, equal_nan=True)
+        else:
+            assert list(x) == list(y)
+
+def test_history_of_one_file_matches_read_game_logs(game_logs):
+    matrix = ingest.read_game_logs(game_logs, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH)
+    history = ingest.read_game_log_history(STATS_PATH, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH)
+    assert_same_matrix(history, matrix)
+    assert np.array_equal(history.get_season_scores(INJURY_HANDLING, 5), matrix.get_season_scores(INJURY_HANDLING, 5))
+
+def test_history_does_not_depend_on_chunk_size():
+    history = ingest.read_game_log_history(STATS_PATH, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, recency_half_life=2.)
+    chunked = ingest.read_game_log_history(STATS_PATH, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, recency_half_life=2., chunksize=999)
+    assert_same_matrix(chunked, history)
+    assert np.array_equal(chunked.seasons, history.seasons)
+    assert np.array_equal(chunked.weights, history.weights)
@@ -0,0 +1,35 @@
+from __future__ import print_function
+import numpy as np
+import cache3
+import engine3 as eng
+import montecarlo3 as mc
+from conftest import normalize
+
+# no te openings, so the te players are never rostered and their error bars stay nan
+ROSTER_OPENINGS = {'qb': 1, 'rb': 2, 'wr': 3}
+MAX_SEASONS = 5000
+
+def build_adaptive(**kwargs):
+    def build(players, teams, seasons, roster_slots, season_length):
+        return mc.AdaptiveLeague(players, teams, roster_slots, season_length, half_width=.05, rank_half_width=.5, max_seasons=MAX_SEASONS,
+                                 min_seasons=200, batch_size=200, seed=5, block_size=100, roster_openings=ROSTER_OPENINGS, **kwargs)
+    return build
+
+def get_values(league):
+    return repr(normalize([league.accumulator.get_player_values(), league.get_slot_values()]))
+
+def test_adaptive_league_stops_early_and_matches_streaming_league(build_league):
+    league = build_league(build_adaptive())
+    assert not league.accumulator.counts[[p.position == 'te' for p in league.players]].any()
+    assert league.converged and league.num_seasons < MAX_SEASONS
+    def build(players, teams, seasons, *args):
+        return eng.StreamingLeague(players, teams, seasons, *args, seed=5, block_size=100, roster_openings=ROSTER_OPENINGS)
+    streaming = build_league(build, num_seasons=league.num_seasons)
+    assert get_values(league) == get_values(streaming)
+
+def test_adaptive_league_picks_up_a_cached_run(build_league):
+    result_cache = cache3.ResultCache()
+    league = build_league(build_adaptive(result_cache=result_cache))
+    cached = build_league(build_adaptive(result_cache=result_cache))
+    assert cached.cached_blocks == league.num_seasons//100 and result_cache.top_ups == 1
+    assert cached.num_seasons == league.num_seasons and get_values(cached) == get_values(league)
@@ -0,0 +1,16 @@
+from __future__ import print_function
+import parallel3
+
+def build_parallel_league(players, teams, seasons, roster_slots, season_length, count=False, **kwargs):
+    return parallel3.ParallelLeague(players, teams, len(seasons) if count else seasons, roster_slots, season_length, seed=1, block_size=8, **kwargs)
+
+def test_season_count_matches_season_list(build_league):
+    by_list = build_league(build_parallel_league, workers=1)
+    by_count = build_league(build_parallel_league, count=True, workers=1)
+    assert by_count.trace.assignments.shape == by_list.trace.assignments.shape
+    assert [p.champion_pct for p in by_count.players] == [p.champion_pct for p in by_list.players]
+
+def test_workers_do_not_change_results(build_league):
+    serial = build_league(build_parallel_league, workers=1, populate=False)
+    pooled = build_league(build_parallel_league, workers=2, populate=False)
+    assert [p.champion_pct for p in pooled.players] == [p.champion_pct for p in serial.players]
@@ -0,0 +1,45 @@
+from __future__ import print_function
+import numpy as np
+import engine3 as eng
+import schedule3
+from conftest import CHANGED_PLAYERS, DEEP_ROSTER_SLOTS, change_players, get_state
+
+H2H_SEASON_FIELDS = ['h2h_wins', 'points_for', 'playoff_seeds', 'champion']
+
+def build_changed_league(players, *args, **kwargs):
+    change_players(players)
+    return schedule3.H2HLeague(players, *args, **kwargs)
+
+def test_update_players_matches_rebuild(build_league, league_state):
+    league = build_league(schedule3.H2HLeague, roster_slots=DEEP_ROSTER_SLOTS)
+    before = get_state(league.seasons, H2H_SEASON_FIELDS)
+    changed = change_players(league.players)
+    league.update_players(changed)
+    rebuilt = build_league(build_changed_league, roster_slots=DEEP_ROSTER_SLOTS)
+    assert league_state(league) == league_state(rebuilt)
+    after = get_state(league.seasons, H2H_SEASON_FIELDS)
+    assert after == get_state(rebuilt.seasons, H2H_SEASON_FIELDS)
+    assert after != before
+    assert [p.h2h_champion_pct for p in league.players] == [p.h2h_champion_pct for p in rebuilt.players]
+
+class RecordingH2HLeague(schedule3.H2HLeague):
+    'H2HLeague that records every season whose head-to-head results are written to its Season'
+
+    def populate_h2h(self, season_indices):
+        self.populated.extend(season_indices)
+        schedule3.H2HLeague.populate_h2h(self, season_indices)
+
+def test_update_players_only_repopulates_affected_seasons(build_league):
+    RecordingH2HLeague.populated = []
+    league = build_league(RecordingH2HLeague, roster_slots=DEEP_ROSTER_SLOTS)
+    league.populated = []
+    league.update_players(change_players(league.players))
+    rostered = np.flatnonzero((league.assignments[:, CHANGED_PLAYERS] >= 0).any(axis=1))
+    assert 0 < len(rostered) < len(league.seasons)
+    assert league.populated == rostered.tolist()
+
+def test_roster_openings_and_assignment_reach_the_league(build_league, league_state):
+    options = {'roster_slots': DEEP_ROSTER_SLOTS, 'roster_openings': {'qb1': 1, 'rb1': 2, 'wr1': 2}, 'assignment': 'slot'}
+    league = build_league(schedule3.H2HLeague, **options)
+    assert league.roster_assignment.assignment == 'slot' and league.roster_assignment.openings[:4] == [1, 1, 2, 1]
+    assert league_state(league) == league_state(build_league(eng.ArrayLeague, **options))
@@ -0,0 +1,101 @@
+from __future__ import print_function
+import asyncio
+import numpy as np
+import pytest
+import engine3 as eng
+import models3 as fs
+import service3
+from conftest import INJURY_HANDLING, LEAGUE_SIZE, MINIMUM_GAMES_PLAYED, ROSTER_POSITIONS, ROSTER_SLOTS, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH
+
+@pytest.fixture(scope='module')
+def valuator(game_logs):
+    player_db = fs.Player_DB(game_logs.copy(), 'game_logs', SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, INJURY_HANDLING)
+    player_db.set_tiers(ROSTER_POSITIONS, LEAGUE_SIZE, MINIMUM_GAMES_PLAYED)
+    pool = player_db.get_player_pool(ROSTER_SLOTS)
+    return service3.RosterValuator(player_db.players, pool, ROSTER_SLOTS, LEAGUE_SIZE, SEASON_LENGTH, num_seasons=100, seed=3)
+
+def get_roster(valuator, skip=0):
+    'player_ids of the skip-th pool player of every roster slot'
+    pool = [valuator.players[row] for row in valuator.pool_rows]
+    return [[p for p in pool if p.slot == slot][skip].player_id for slot in ROSTER_SLOTS]
+
+def test_opponents_leave_out_roster_players(valuator):
+    rows = valuator.get_rows(get_roster(valuator, 1))
+    columns = valuator.pool_columns[rows]
+    teams, replacements, on_opponent = valuator.get_replacements(columns)
+    assert on_opponent.any()
+    # the lineups the swaps stand for
+    lineups = valuator.lineups.copy()
+    season_index, column_index = np.nonzero(on_opponent)
+    spares = np.concatenate([valuator.spares, np.full((valuator.num_seasons, 1), -1)], axis=1)
+    lineups[season_index, valuator.opening_index[season_index, columns[column_index]]] = spares[season_index, replacements[season_index, column_index]]
+    opponents = lineups[:, valuator.team_openings[:-1].ravel()]
+    assert not np.isin(opponents, columns).any()
+    for season in opponents:
+        drawn = season[season >= 0]
+        assert len(drawn) == len(set(drawn))
+    # added up from scratch, without the spares left on the last team
+    lineups[:, valuator.team_openings[-1]] = -1
+    assignments = eng.get_assignments(lineups, valuator.opening_teams, len(valuator.pool_rows))
+    team_scores = eng.calculate_team_scores(valuator.scores[valuator.pool_rows].transpose(2, 0, 1), assignments, LEAGUE_SIZE)[:, :-1]
+    opponent_scores, opponent_wins = valuator.get_opponents(rows)
+    assert np.allclose(opponent_scores, team_scores.transpose(1, 2, 0))
+    pairs = opponent_scores[:, np.newaxis], opponent_scores[np.newaxis]
+    expected = ((pairs[0] > pairs[1]).sum(axis=2) + .5*(pairs[0] == pairs[1]).sum(axis=2)).sum(axis=1) - .5*SEASON_LENGTH
+    assert np.array_equal(opponent_wins, expected.T)
+
+def test_all_play_wins_split_ties():
+    # one season, two weeks: teams 0 and 1 tie in the first
+    team_scores = np.array([[[10.], [1.]], [[10.], [2.]], [[5.], [3.]]])
+    assert service3.calculate_all_play_wins(team_scores).tolist() == [[1.5, 2.5, 2.]]
+
+def test_roster_games_count_ties_like_opponent_games(valuator):
+    rows = valuator.get_rows(get_roster(valuator))
+    opponent_scores, opponent_wins = valuator.get_opponents(rows)
+    league_scores = np.concatenate([opponent_scores, valuator.scores[rows].sum(axis=0)[np.newaxis]])
+    wins = service3.calculate_all_play_wins(league_scores)
+    assert np.array_equal(wins[:, :-1] - opponent_wins, (league_scores[:-1] > league_scores[-1]).sum(axis=1).T
+                          + .5*(league_scores[:-1] == league_scores[-1]).sum(axis=1).T)
+    result, = valuator.evaluate([rows])
+    num_games = SEASON_LENGTH*(LEAGUE_SIZE - 1)
+    assert result['win_pct'] == float(wins[:, -1].mean()/num_games)
+    above = (wins[:, :-1] > wins[:, -1:]).sum(axis=1) + .5*(wins[:, :-1] == wins[:, -1:]).sum(axis=1)
+    assert result['average_team_ranking'] == float(1 + above.mean())
+
+def test_get_rows_rejects_bad_rosters(valuator):
+    roster = get_roster(valuator)
+    with pytest.raises(ValueError):
+        valuator.get_rows(roster[:-1])
+    with pytest.raises(ValueError):
+        valuator.get_rows(roster[:-1] + roster[:1])
+    with pytest.raises(ValueError):
+        valuator.get_rows(roster[0])
+    with pytest.raises(KeyError):
+        valuator.get_rows(roster[:-1] + ['Nobody'])
+
+def test_service_replies_with_errors(valuator):
+    async def run():
+        service = service3.ValuationService(valuator)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            responses = [await service3.query(request, port=port) for request in
+                         [['roster'], {'type': 'roster', 'players': get_roster(valuator)[:3]}, {'type': 'roster', 'players': get_roster(valuator)}]]
+            # too deeply nested for json.loads, which raises RecursionError
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'['*30000 + b']'*30000 + b'\n')
+            responses.append(service3.json.loads(await reader.readline()))
+            writer.close()
+            return responses
+        finally:
+            server.close()
+            service.batcher.cancel()
+    not_object, short, served, nested = asyncio.run(run())
+    assert not_object == {'error': 'A request must be a JSON object, not list'}
+    assert 'error' in short and 'error' in nested
+    assert served == valuator.evaluate([valuator.get_rows(get_roster(valuator))])[0]
+
+def test_batched_rosters_match_one_at_a_time(valuator):
+    rosters = [valuator.get_rows(get_roster(valuator, skip)) for skip in range(3)]
+    rosters.append(rosters[0][:1] + valuator.get_rows(get_roster(valuator, 4))[1:])
+    assert valuator.evaluate(rosters) == [valuator.evaluate([rows])[0] for rows in rosters]
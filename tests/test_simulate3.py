@@ -0,0 +1,13 @@
+from __future__ import print_function
+import simulate3
+
+def test_run_without_a_simulated_season_reports_none(tmp_path):
+    path = str(tmp_path / 'results.json')
+    results, = simulate3.main(['--seasons', '0', '--seed', '1', '--top', '0', '--json', path])
+    assert results['first_season_s'] is None
+    assert results['startup_s'] is None
+    assert simulate3.format_ms(results['startup_s']) == 'n/a'
+
+def test_run_reports_its_first_season():
+    results, = simulate3.main(['--seasons', '20', '--seed', '1', '--top', '0', '--engine', 'array'])
+    assert 0 < results['first_season_s'] <= results['startup_s']
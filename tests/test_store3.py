@@ -0,0 +1,72 @@
+from __future__ import print_function
+import numpy as np
+import pytest
+import engine3 as eng
+import models3 as fs
+import store3
+from conftest import SEASON_LENGTH, normalize
+
+VALUE_FIELDS = ['average_team_ranking', 'harmonic_team_ranking', 'champion_pct']
+
+def create_store(directory, league):
+    return store3.SeasonStore(str(directory), [p.player_id for p in league.players], [t.team_id for t in league.teams], SEASON_LENGTH)
+
+def get_stored_values(store, players):
+    return repr(normalize([store.get_player(p.player_id).get_player_values() for p in players]))
+
+def test_store_matches_array_league(build_league, tmp_path):
+    league = build_league(eng.ArrayLeague)
+    store = create_store(tmp_path, league)
+    store.append_league(league)
+    assert [s.season_id for s in store.get_seasons()] == [s.season_id for s in league.seasons]
+    for season, stored in zip(league.seasons, store.get_seasons()):
+        assert {team: sorted(roster) for team, roster in stored.rosters.items()} == {team: sorted(roster) for team, roster in season.rosters.items()}
+        assert normalize(stored.team_rankings) == normalize(season.team_rankings)
+        assert normalize(stored.final_team_ranks) == normalize(season.final_team_ranks)
+        # stored as float32
+        assert stored.team_win_pct == {team: float(np.float32(pct)) for team, pct in season.team_win_pct.items()}
+    for p in league.players:
+        stored = store.get_player(p.player_id)
+        assert normalize(dict(stored.team_assignments)) == normalize(p.team_assignments)
+        assert normalize(dict(stored.team_rankings)) == normalize(p.team_rankings)
+    for t in league.teams:
+        assert {s: sorted(roster) for s, roster in store.get_team(t.team_id).player_assignments.items()} == {s: sorted(roster) for s, roster in t.player_assignments.items()}
+    assert get_stored_values(store, league.players) == repr(normalize([[getattr(p, field)[-1] for field in VALUE_FIELDS] for p in league.players]))
+
+def test_store_matches_streaming_league_blocks(build_league, tmp_path):
+    store = []
+    def build(players, teams, seasons, *args):
+        store.append(store3.SeasonStore(str(tmp_path), [p.player_id for p in players], [t.team_id for t in teams], SEASON_LENGTH))
+        return eng.StreamingLeague(players, teams, len(seasons), *args, seed=4, block_size=15, season_store=store[0])
+    league = build_league(build, num_seasons=50)
+    store, = store
+    assert store.manifest['chunks'] == [15, 15, 15, 5]
+    assert get_stored_values(store, league.players) == repr(normalize([[getattr(p, field)[-1] for field in VALUE_FIELDS] for p in league.players]))
+
+def test_store_keeps_season_ids(build_league, tmp_path):
+    # as a league built after 20 other seasons would number them
+    fs.Season.id = 21
+    seasons = fs.create_seasons(10, SEASON_LENGTH)
+    league = build_league(lambda players, teams, s, *args: eng.ArrayLeague(players, teams, seasons, *args))
+    season_ids = [s.season_id for s in league.seasons]
+    assert season_ids[0] == 'S0021'
+    store = create_store(tmp_path, league)
+    store.append_league(league)
+    assert [s.season_id for s in store.get_seasons()] == season_ids
+    assert store.get_season('S0025').final_team_ranks == store.get_seasons()[4].final_team_ranks
+    # a crashed writer's arrays are dropped, and appended seasons without ids carry on from the last one
+    with open(store.get_path('season_numbers'), 'ab') as f:
+        f.write(np.arange(5, dtype=np.int64).tobytes())
+    reopened = store3.SeasonStore(str(tmp_path))
+    first = slice(0, 3)
+    reopened.append(league.assignments[first], league.team_scores[first], league.weekly_ranks[first], league.final_ranks[first], league.win_pct[first])
+    reopened = store3.SeasonStore(str(tmp_path))
+    assert [s.season_id for s in reopened.get_seasons()] == season_ids + ['S0031', 'S0032', 'S0033']
+    for p in league.players[:10]:
+        stored = dict(reopened.get_player(p.player_id).team_assignments)
+        assert {s: team for s, team in stored.items() if s in season_ids} == p.team_assignments
+    assert reopened.get_season_index('S0032') == 11 and reopened.get_season_id(11) == 'S0032'
+    with pytest.raises(KeyError):
+        reopened.get_season('S0001')
+    with pytest.raises(ValueError):
+        reopened.append_league(league)
@@ -0,0 +1,40 @@
+from __future__ import print_function
+import numpy as np
+import pandas as pd
+import engine3 as eng
+import models3 as fs
+import sweep3
+from conftest import (INJURY_HANDLING, LEAGUE_SIZE, MINIMUM_GAMES_PLAYED, ROSTER_POSITIONS, ROSTER_SLOTS, SCORING_CATEGORIES, SCORING_VALUES,
+                      SEASON_LENGTH)
+
+NUM_SEASONS = 120
+BLOCK_SIZE = 50
+
+def get_scoring_rules():
+    rules = pd.DataFrame([SCORING_VALUES]*3, columns=SCORING_CATEGORIES, index=['standard', 'ppr', 'six_point_pass_tds'])
+    rules.loc['ppr', 'recs'] = 1.
+    rules.loc['six_point_pass_tds', 'pass_tds'] = 6.
+    return rules
+
+def run_streaming_league(game_logs, scoring_values, teams):
+    player_db = fs.Player_DB(game_logs.copy(), 'game_logs', SCORING_CATEGORIES, list(scoring_values), SEASON_LENGTH, INJURY_HANDLING, columnar=True, seed=0)
+    player_db.set_tiers(ROSTER_POSITIONS, LEAGUE_SIZE, MINIMUM_GAMES_PLAYED)
+    pool = player_db.get_player_pool(ROSTER_SLOTS)
+    return pool, eng.StreamingLeague(pool, teams, NUM_SEASONS, ROSTER_SLOTS, SEASON_LENGTH, seed=0, block_size=BLOCK_SIZE)
+
+def test_sweep_matches_streaming_league_per_rule(game_logs):
+    rules = get_scoring_rules()
+    teams = fs.create_teams(LEAGUE_SIZE, ['Team {}'.format(i+1) for i in range(LEAGUE_SIZE)])
+    sweep = sweep3.ScoringSweep(game_logs.copy(), SCORING_CATEGORIES, rules, teams, ROSTER_SLOTS, SEASON_LENGTH, NUM_SEASONS, INJURY_HANDLING,
+                                MINIMUM_GAMES_PLAYED, seed=0, block_size=BLOCK_SIZE)
+    slot_values = sweep.get_slot_values()
+    player_values = sweep.get_player_values()
+    for name, scoring_values in rules.iterrows():
+        pool, league = run_streaming_league(game_logs, scoring_values, teams)
+        assert np.array_equal(slot_values.loc[name].to_numpy(), league.accumulator.slots.mean)
+        swept = player_values[player_values['rule'] == name].set_index('player')
+        assert sorted(swept.index) == sorted(p.name for p in pool)
+        for p in pool:
+            assert swept.loc[p.name, 'slot'] == p.slot
+            assert swept.loc[p.name, 'champion_pct'] == p.champion_pct[-1]
+            assert swept.loc[p.name, 'average_team_ranking'] == p.average_team_ranking[-1]
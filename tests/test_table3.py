@@ -0,0 +1,56 @@
+from __future__ import print_function
+import numpy as np
+import engine3 as eng
+import models3 as fs
+from conftest import CHANGED_PLAYERS, DEEP_ROSTER_SLOTS, INJURY_HANDLING, SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, change_players
+from table3 import METRICS, PlayerTable
+
+def get_players_and_table(game_logs):
+    pdb = fs.analyze_game_logs(game_logs.copy(), SCORING_CATEGORIES, SCORING_VALUES)
+    players = fs.create_players_from_pdb(pdb, SEASON_LENGTH, INJURY_HANDLING)
+    return players, PlayerTable.from_players(players)
+
+def test_metrics_match_players(game_logs):
+    players, table = get_players_and_table(game_logs)
+    for metric in METRICS:
+        assert np.array_equal(table.columns[metric], [getattr(p, metric) for p in players], equal_nan=True)
+
+def test_position_measurements_match_players(game_logs):
+    players, table = get_players_and_table(game_logs)
+    table.calculate_position_measurements()
+    for pos in sorted(set(p.position for p in players)):
+        fs.calculate_position_measurements([p for p in players if p.position == pos])
+    for metric in METRICS:
+        for column in [metric + '_normalized', metric + '_excess']:
+            assert np.array_equal(table.columns[column], [getattr(p, column) for p in players], equal_nan=True)
+    rows = np.flatnonzero(table.position_codes == table.position_names.index('rb'))[::2]
+    table.calculate_position_measurements(rows[::-1])
+    fs.calculate_position_measurements([players[row] for row in rows[::-1]])
+    for column in ['points_per_gp_normalized', 'utility_excess']:
+        assert np.array_equal(table.columns[column], [getattr(p, column) for p in players], equal_nan=True)
+
+def test_historic_scoring_array_is_the_games_played(game_logs):
+    pdb = fs.analyze_game_logs(game_logs.copy(), SCORING_CATEGORIES, SCORING_VALUES)
+    games = [list(a) for a in pdb['scoring_array']]
+    table = PlayerTable.from_pdb(pdb, SEASON_LENGTH, INJURY_HANDLING)
+    for p, played in zip(table.get_views(), games):
+        assert p.historic_scoring_array.tolist() == played and p.gp == len(played)
+    matrix_table = PlayerTable.from_game_logs(game_logs.copy(), SCORING_CATEGORIES, SCORING_VALUES, SEASON_LENGTH, INJURY_HANDLING, seed=0)
+    assert [len(p.historic_scoring_array) for p in matrix_table.get_views()] == matrix_table.gp.tolist()
+    assert np.allclose([p.historic_scoring_array.sum() for p in matrix_table.get_views()], matrix_table.points)
+
+def build_columnar_league(players, *args, **kwargs):
+    return eng.ArrayLeague(PlayerTable.from_players(players).get_views(), *args, **kwargs)
+
+def build_changed_columnar_league(players, *args, **kwargs):
+    views = PlayerTable.from_players(players).get_views()
+    change_players(views)
+    return eng.ArrayLeague(views, *args, **kwargs)
+
+def test_update_players_on_views_matches_rebuild(build_league, league_state):
+    league = build_league(build_columnar_league, roster_slots=DEEP_ROSTER_SLOTS)
+    changed = change_players(league.players)
+    assert league.players[0].table.scores[CHANGED_PLAYERS].tolist() == [p.scoring_array.tolist() for p in changed]
+    league.update_players(changed)
+    rebuilt = build_league(build_changed_columnar_league, roster_slots=DEEP_ROSTER_SLOTS)
+    assert league_state(league) == league_state(rebuilt)